@@ -4,10 +4,17 @@ algorithm.py
 This is base class for all algorithms
 """
 
+import os
+import pickle
+import random
+
+import numpy as np
+
 from .problem import Problem
+from .individual import Individual
 from .utils import ConfigDictionary
 from abc import ABCMeta
-from .operators import Evaluator, GradientEvaluator, WorstCaseEvaluator
+from .operators import Evaluator, GradientEvaluator, WorstCaseEvaluator, ProcessEvaluator
 
 from enum import Enum
 from uuid import uuid1
@@ -17,21 +24,21 @@ class EvaluatorType(Enum):
     SIMPLE = 0
     GRADIENT = 1
     WORST_CASE = 2
+    PROCESS = 3
 
 
 class Algorithm(metaclass=ABCMeta):
     """ Base class for optimization algorithms. """
 
+    # attributes carrying the state of the run (archives, operators with their schedules, ...), they are stored in the
+    # checkpoint together with the current population
+    _checkpoint_attributes = ()
+
     def __init__(self, problem: Problem, name="Algorithm", evaluator_type=EvaluatorType.SIMPLE):
         self.uuid = uuid1().hex
         self.name = name
         self.problem = problem
-        if evaluator_type == EvaluatorType.SIMPLE or evaluator_type is None:
-            self.evaluator = Evaluator(self)
-        elif evaluator_type == EvaluatorType.GRADIENT:
-            self.evaluator = GradientEvaluator(self)
-        elif evaluator_type == EvaluatorType.WORST_CASE:
-            self.evaluator = WorstCaseEvaluator(self)
+        self.set_evaluator(evaluator_type)
 
         self.parameters = problem.parameters
         self.options = ConfigDictionary()
@@ -47,8 +54,28 @@ class Algorithm(metaclass=ABCMeta):
         self.options.declare(name='n_iterations', default=10,
                              desc='Max number of iterations')
 
+        self.options.declare(name='checkpoint', default=None, allow_none=True,
+                             desc='File name of the checkpoint, the state of the run is saved after the generations')
+        self.options.declare(name='checkpoint_interval', default=1, lower=1,
+                             desc='Number of generations between two checkpoints')
+
         self.individual_features = dict()
 
+    def set_evaluator(self, evaluator_type):
+        """
+        Sets the evaluator of the individuals, e.g. EvaluatorType.PROCESS evaluates them in worker processes.
+
+        :param evaluator_type: EvaluatorType
+        """
+        if evaluator_type == EvaluatorType.SIMPLE or evaluator_type is None:
+            self.evaluator = Evaluator(self)
+        elif evaluator_type == EvaluatorType.GRADIENT:
+            self.evaluator = GradientEvaluator(self)
+        elif evaluator_type == EvaluatorType.WORST_CASE:
+            self.evaluator = WorstCaseEvaluator(self)
+        elif evaluator_type == EvaluatorType.PROCESS:
+            self.evaluator = ProcessEvaluator(self)
+
     def evaluate(self, individuals):
         # set algorithm id
         for individual in individuals:
@@ -56,6 +83,85 @@ class Algorithm(metaclass=ABCMeta):
 
         self.evaluator.evaluate(individuals)
 
+    def save_checkpoint(self, iteration, individuals):
+        """
+        Saves the state of the run after the complete generation (every checkpoint_interval generations and after the
+        last one). The file is replaced atomically, so the checkpoint is never left half-written.
+
+        :param iteration: number of the completed generations
+        :param individuals: current population
+        """
+        file_name = self.options['checkpoint']
+        if file_name is None:
+            return
+        last = 'max_population_number' in self.options and iteration >= self.options['max_population_number']
+        if iteration % self.options['checkpoint_interval'] != 0 and not last:
+            return
+
+        # the generation has to be stored before the checkpoint refers to it
+        self.problem.data_store.flush()
+
+        state = {"name": self.name,
+                 "uuid": self.uuid,
+                 "iteration": iteration,
+                 "individuals": individuals,
+                 "individual_counter": Individual.counter,
+                 "random": random.getstate(),
+                 "numpy_random": np.random.get_state(),
+                 "attributes": {name: getattr(self, name) for name in self._checkpoint_attributes}}
+
+        with open(file_name + ".tmp", "wb") as file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(file_name + ".tmp", file_name)
+
+    def check_checkpoint(self):
+        """
+        Checks that the run can be stored in the checkpoint and resumed, i.e. the algorithm implements
+        run_generations(individuals, iteration) evolving the population from the given generation.
+
+        :raise ValueError: the checkpoint is not supported
+        """
+        if not hasattr(self, 'run_generations'):
+            raise ValueError("{} does not support the checkpoint.".format(self.name))
+
+    def load_checkpoint(self, file_name=None):
+        """
+        Restores the state of the run from the checkpoint.
+
+        :param file_name: file name of the checkpoint, the option checkpoint is used by default
+        :return: number of the completed generations, population
+        """
+        self.check_checkpoint()
+        if file_name is None:
+            file_name = self.options['checkpoint']
+
+        with open(file_name, "rb") as file:
+            state = pickle.load(file)
+
+        if state["name"] != self.name:
+            raise ValueError("Checkpoint '{}' belongs to the algorithm '{}'.".format(file_name, state["name"]))
+
+        self.uuid = state["uuid"]
+        for name, value in state["attributes"].items():
+            setattr(self, name, value)
+
+        # the new individuals must not reuse the ids of the stored ones
+        Individual.counter = max(Individual.counter, state["individual_counter"])
+        random.setstate(state["random"])
+        np.random.set_state(state["numpy_random"])
+
+        return state["iteration"], state["individuals"]
+
+    def resume(self, file_name=None):
+        """
+        Restarts the run from the last complete generation stored in the checkpoint, nothing is evaluated again.
+        The run continues up to the option max_population_number, it can be raised to extend a finished run.
+
+        :param file_name: file name of the checkpoint, the option checkpoint is used by default
+        """
+        iteration, individuals = self.load_checkpoint(file_name)
+        self.run_generations(individuals, iteration)
+
     def evaluate_scalar(self, individual):
         # set algorithm id
         individual.algorithm_id = self.uuid
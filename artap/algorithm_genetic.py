@@ -1,11 +1,17 @@
 import time
+import numpy as np
 from copy import deepcopy
+from concurrent.futures import wait, FIRST_COMPLETED
 
 from .algorithm import Algorithm
 from .operators import RandomGenerator, SimulatedBinaryCrossover, \
-    PmMutator, TournamentSelector, EpsilonDominance, nondominated_truncate, crowding_distance
+    PmMutator, TournamentSelector, EpsilonDominance, nondominated_truncate, crowding_distance, DuplicateFilter, \
+    nondominated_sorting, crowding_distances
 from .problem import Problem
 from .archive import Archive
+from .individual import Individual
+from .population import Population
+from .surrogate import SurrogateModelPredict
 
 
 class GeneralEvolutionaryAlgorithm(Algorithm):
@@ -40,34 +46,42 @@ class GeneticAlgorithm(GeneralEvolutionaryAlgorithm):
     def __init__(self, problem: Problem, name="General Genetic-based Algorithm", evaluator_type=None):
         super().__init__(problem, name, evaluator_type)
 
+        self.options.declare(name='max_redraws', default=100, lower=1,
+                             desc='Maximal number of repeated draws when only duplicate offsprings are generated')
+        self.options.declare(name='asynchronous', default=False,
+                             desc='Steady-state mode, every evaluated offspring is incorporated as soon as it arrives')
+        self.options.declare(name='prescreening', default=1, lower=1,
+                             desc='Number of the candidate offsprings for every evaluated offspring, the candidates '
+                                  'are ranked by the trained surrogate model (SurrogateModelPredict)')
+        self.options.declare(name='prescreening_bonus', default=1.0, lower=0.0,
+                             desc='Weight of the uncertainty (standard deviation) of the predictions in the ranking')
+
         self.generator = None
         self.selector = None
         self.mutator = None
         self.crossover = None
+        # hash set of all vectors generated in the run
+        self.duplicates = DuplicateFilter(self.problem.parameters)
 
     def generate(self, parents, archive=None):
+        # columnar population - the whole mating pool is created at once
+        if isinstance(parents, Population) and archive is None and self._batch_operators():
+            return self.generate_batch(parents)
+
+        size = self._offsprings_size(len(parents))
+
         offsprings = []
         # deepcopy of parents
         for offspring in parents:
             offspring_copy = deepcopy(offspring)
             offspring_copy.population_id = -1
             offsprings.append(offspring_copy)
+            self.duplicates.add(offspring.vector)
 
-        while len(offsprings) < 2 * self.options['max_population_size']:
+        redraws = 0
+        while len(offsprings) < size and redraws < self.options['max_redraws']:
             parent1 = self.selector.select(parents)
-
-            repeat = True
-            while repeat:
-                if archive:
-                    if len(archive) <= 1:
-                        parent2 = self.selector.select(parents)
-                    else:
-                        parent2 = archive.rand_choice()
-                else:
-                    parent2 = self.selector.select(parents)
-
-                if parent1 is not parent2:
-                    repeat = False
+            parent2 = self._select_mate(parents, parent1, archive)
 
             # crossover
             child1, child2 = self.crossover.cross(parent1, parent2)
@@ -76,23 +90,231 @@ class GeneticAlgorithm(GeneralEvolutionaryAlgorithm):
             child1 = self.mutator.mutate(child1)
             child2 = self.mutator.mutate(child2)
 
-            # always create new individual
-            if not any(child1 == item for item in offsprings) and len(offsprings) < 2 * self.options['max_population_size']:
-                child_copy = deepcopy(child1)
-                child_copy.population_id = -1
-                offsprings.append(child_copy)
-            if not any(child2 == item for item in offsprings) and len(offsprings) < 2 * self.options['max_population_size']:
-                child_copy = deepcopy(child2)
-                child_copy.population_id = -1
-                offsprings.append(child_copy)
+            # always create new individual (the duplicates of already generated individuals are drawn again)
+            redraws += 1
+            for child in [child1, child2]:
+                if len(offsprings) < size and self.duplicates.add(child.vector):
+                    child_copy = deepcopy(child)
+                    child_copy.population_id = -1
+                    offsprings.append(child_copy)
+                    redraws = 0
+
+        if len(offsprings) < size:
+            self.problem.logger.warning("{}: the design space is exhausted, only {} new offsprings were generated."
+                                        .format(self.name, len(offsprings) - len(parents)))
+
+        return self.prescreen(offsprings, len(parents))
+
+    def _prescreening(self):
+        return self.options['prescreening'] > 1 and isinstance(self.problem.surrogate, SurrogateModelPredict) \
+               and self.problem.surrogate.trained
+
+    def _offsprings_size(self, parents):
+        size = 2 * self.options['max_population_size']
+        if self._prescreening():
+            # more candidates, only 2 * max_population_size - parents are kept
+            size = parents + self.options['prescreening'] * (size - parents)
+        return size
+
+    def prescreen(self, offsprings, parents):
+        """
+        Ranks the candidate offsprings by the surrogate model and keeps only the most promising ones
+        (2 * max_population_size offsprings in total). The candidates are ranked by the non-dominated sorting and the
+        crowding distance of the predicted signed costs lowered by the uncertainty bonus
+        (prescreening_bonus * standard deviation), the feasibility is not predicted. The rejected candidates are not
+        evaluated, they can be generated again.
+
+        :param offsprings: copies of parents followed by the candidates
+        :param parents: number of the copies of parents
+        :return: offsprings
+        """
+        count = 2 * self.options['max_population_size'] - parents
+        if not self._prescreening() or len(offsprings) - parents <= count:
+            return offsprings
+
+        candidates = offsprings[parents:]
+        matrix = np.array([candidate.vector for candidate in candidates], dtype=float)
+        means, stds = self.problem.surrogate.predict_batch(matrix)
+
+        costs = np.reshape(means, (len(candidates), -1)) * np.array(self.problem.signs, dtype=float)
+        if stds is not None:
+            costs = costs - self.options['prescreening_bonus'] * np.reshape(stds, costs.shape)
+
+        front_number = nondominated_sorting(np.hstack([costs, np.zeros((len(candidates), 1))]))
+        distance = crowding_distances(costs, front_number)
+        order = np.lexsort((-distance, front_number))
+        selected = np.sort(order[:count])
+        self.duplicates.discard(matrix[np.sort(order[count:])])
+
+        screened = offsprings[:parents]
+        screened.extend([candidates[i] for i in selected.tolist()])
+        return screened
+
+    def _select_mate(self, parents, parent1, archive=None):
+        while True:
+            if archive:
+                if len(archive) <= 1:
+                    parent2 = self.selector.select(parents)
+                else:
+                    parent2 = archive.rand_choice()
+            else:
+                parent2 = self.selector.select(parents)
+
+            if parent1 is not parent2:
+                return parent2
+
+    def _select_mates(self, parents, parents1):
+        """
+        Batch variant of _select_mate: the second parents are selected by the tournaments, which are repeated for the
+        pairs of the same parents (at most max_redraws times, then a random other parent is taken).
+
+        :param parents: Population
+        :param parents1: array of indices of the first parents
+        :return: array of indices of the second parents
+        """
+        parents2 = self.selector.select_indices(parents, len(parents1))
+        n = len(parents)
+        if n <= 1:
+            return parents2
+
+        same = np.flatnonzero(parents2 == parents1)
+        for redraw in range(self.options['max_redraws']):
+            if len(same) == 0:
+                return parents2
+            parents2[same] = self.selector.select_indices(parents, len(same))
+            same = same[parents2[same] == parents1[same]]
+
+        parents2[same] = (parents1[same] + np.random.randint(1, n, len(same))) % n
+        return parents2
+
+    def generate_offspring(self, parents, archive=None):
+        """
+        Creates one new offspring, it is used by the asynchronous (steady-state) mode.
+
+        :param parents: list of individuals
+        :param archive: Archive, the second parent is selected from the archive if it is given
+        :return: Individual or None if the design space is exhausted
+        """
+        for redraw in range(self.options['max_redraws']):
+            parent1 = self.selector.select(parents)
+            parent2 = self._select_mate(parents, parent1, archive)
+
+            for child in self.crossover.cross(parent1, parent2):
+                child = self.mutator.mutate(child)
+                if self.duplicates.add(child.vector):
+                    child_copy = deepcopy(child)
+                    child_copy.population_id = -1
+                    return child_copy
+
+        return None
+
+    def check_checkpoint(self):
+        super().check_checkpoint()
+        # the offsprings being evaluated are not part of any generation
+        if self.options['asynchronous']:
+            raise ValueError("{}: the checkpoint is not supported in the asynchronous mode.".format(self.name))
+
+    def run_asynchronous(self, individuals, accept, archive=None):
+        """
+        Steady-state loop: max_processes offsprings are evaluated at once, every evaluated offspring is incorporated by
+        accept(individuals, offspring) and a new offspring is created from the updated population immediately. The
+        evaluation budget is max_population_number * max_population_size offsprings.
+
+        :param individuals: evaluated initial population
+        :param accept: function returning the population with the incorporated offspring
+        :param archive: Archive used by the selection of parents
+        :return: final population
+        """
+        size = self.options['max_population_size']
+        budget = self.options['max_population_number'] * size
+
+        submitted = 0
+        pending = set()
+        while submitted < budget or pending:
+            while submitted < budget and len(pending) < self.options['max_processes']:
+                offspring = self.generate_offspring(individuals, archive)
+                if offspring is None:
+                    self.problem.logger.warning("{}: the design space is exhausted, only {} new offsprings were "
+                                                "generated.".format(self.name, submitted))
+                    budget = submitted
+                    break
+
+                offspring.algorithm_id = self.uuid
+                # the number of the generation with the same number of evaluations
+                offspring.population_id = submitted // size + 1
+                pending.add(self.evaluator.submit(offspring))
+                submitted += 1
+
+            if pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    offspring = future.result()
+                    individuals = accept(individuals, offspring)
+
+                    # append to problem
+                    self.problem.individuals.append(offspring)
+                    # sync to datastore
+                    self.problem.data_store.sync_individual(offspring)
+
+        return individuals
+
+    def _batch_operators(self):
+        return hasattr(self.selector, 'select_indices') and hasattr(self.crossover, 'cross_batch') \
+               and hasattr(self.mutator, 'mutate_batch')
+
+    def generate_batch(self, parents: Population):
+        """
+        Creates the offsprings of the columnar population, the selection, crossover and mutation are applied on the
+        whole mating pool at once.
+
+        :param parents: Population
+        :return: Population
+        """
+        size = self._offsprings_size(len(parents))
+
+        offsprings = Population()
+        # deepcopy of parents
+        for offspring in parents:
+            offspring_copy = deepcopy(offspring)
+            offspring_copy.population_id = -1
+            offsprings.append(offspring_copy)
+        vectors = parents.vectors
+        self.duplicates.extend(vectors)
 
-        return offsprings
+        redraws = 0
+        while len(offsprings) < size and redraws < self.options['max_redraws']:
+            pairs = (size - len(offsprings) + 1) // 2
+            parents1 = self.selector.select_indices(parents, pairs)
+            parents2 = self._select_mates(parents, parents1)
+
+            # crossover and mutation
+            children = self.crossover.cross_batch(vectors, parents1, parents2)
+            children = self.mutator.mutate_batch(children)
+
+            # always create new individual (the duplicates of already generated individuals are drawn again)
+            redraws += 1
+            selected = self.duplicates.new(children, size - len(offsprings))
+            if selected:
+                redraws = 0
+
+            parents_index = np.concatenate((parents1, parents2))
+            for i in selected:
+                child = Individual(children[i].tolist(), parents[int(parents_index[i])].features)
+                child.population_id = -1
+                offsprings.append(child)
+
+        if len(offsprings) < size:
+            self.problem.logger.warning("{}: the design space is exhausted, only {} new offsprings were generated."
+                                        .format(self.name, len(offsprings) - len(parents)))
+
+        return self.prescreen(offsprings, len(parents))
 
     def run(self):
         pass
 
 
 class NSGAII(GeneticAlgorithm):
+    _checkpoint_attributes = ('generator', 'crossover', 'mutator', 'selector', 'duplicates')
 
     def __init__(self, problem: Problem, name="NSGA_II Evolutionary Algorithm", evaluator_type=None):
         """
@@ -111,12 +333,13 @@ class NSGAII(GeneticAlgorithm):
                              desc='prob_mutation')
 
         # set random generator
-        self.individual_features['dominate'] = []
         self.individual_features['crowding_distance'] = 0
-        self.individual_features['domination_counter'] = 0
         self.individual_features['front_number'] = 0
 
     def run(self):
+        if self.options['checkpoint'] is not None:
+            self.check_checkpoint()
+
         self.generator = RandomGenerator(self.problem.parameters, self.individual_features)
         self.generator.init(self.options['max_population_size'])
         self.crossover = SimulatedBinaryCrossover(self.problem.parameters, self.options['prob_cross'])
@@ -124,7 +347,9 @@ class NSGAII(GeneticAlgorithm):
         self.selector = TournamentSelector(self.problem.parameters)
 
         # create initial population
-        individuals = self.generator.generate()
+        individuals = Population(self.generator.generate())
+        self.duplicates.clear()
+        self.duplicates.extend(individuals.vectors)
 
         for individual in individuals:
             # append to problem
@@ -142,39 +367,63 @@ class NSGAII(GeneticAlgorithm):
         for individual in individuals:
             self.problem.data_store.sync_individual(individual)
 
+        self.save_checkpoint(0, individuals)
+        self.run_generations(individuals)
+
+    def run_generations(self, individuals, iteration=0):
         t_s = time.time()
         self.problem.logger.info(
             "NSGA_II: {}/{}".format(self.options['max_population_number'],
                                     self.options['max_population_number'] * self.options['max_population_size']))
 
         # optimization
-        for it in range(self.options['max_population_number']):
-            # generate new offsprings
-            offsprings = self.generate(individuals)
+        if self.options['asynchronous']:
+            self.run_asynchronous(individuals, self.steady_state_truncate)
+        else:
+            for it in range(iteration, self.options['max_population_number']):
+                # generate new offsprings
+                offsprings = self.generate(individuals)
+
+                # evaluate the offsprings
+                self.evaluate(offsprings)
 
-            # evaluate the offsprings
-            self.evaluate(offsprings)
+                # make the pareto dominance calculation and calculating the crowding distance
+                self.selector.fast_nondominated_sorting(offsprings)
 
-            # make the pareto dominance calculation and calculating the crowding distance
-            self.selector.fast_nondominated_sorting(offsprings)
+                # truncate
+                individuals = nondominated_truncate(offsprings, self.options['max_population_size'])
 
-            # truncate
-            individuals = nondominated_truncate(offsprings, self.options['max_population_size'])
+                for individual in individuals:
+                    # add to population
+                    individual.population_id = it + 1
+                    # append to problem
+                    self.problem.individuals.append(individual)
+                    # sync to datastore
+                    self.problem.data_store.sync_individual(individual)
 
-            for individual in individuals:
-                # add to population
-                individual.population_id = it + 1
-                # append to problem
-                self.problem.individuals.append(individual)
-                # sync to datastore
-                self.problem.data_store.sync_individual(individual)
+                self.save_checkpoint(it + 1, individuals)
 
         t = time.time() - t_s
         self.problem.logger.info("NSGA_II: elapsed time: {} s".format(t))
+        self.problem.logger.info("NSGA_II: evaluation cache: {} hits, {} misses".format(self.evaluator.job.cache.hits,
+                                                                                         self.evaluator.job.cache.misses))
 
         # sync changed individual informations
         self.problem.data_store.sync_all()
 
+    def steady_state_truncate(self, individuals, offspring):
+        """
+        Incorporates one evaluated offspring into the population (asynchronous mode), the worst individual of the
+        extended population is removed by the non-dominated sorting and the crowding distance.
+
+        :param individuals: population
+        :param offspring: evaluated individual
+        :return: Population
+        """
+        population = Population(list(individuals) + [offspring])
+        self.selector.fast_nondominated_sorting(population)
+        return nondominated_truncate(population, self.options['max_population_size'])
+
 
 class EpsMOEA(GeneticAlgorithm):
     """
@@ -191,6 +440,8 @@ class EpsMOEA(GeneticAlgorithm):
                                  Minimum Reduce Hypervolume
     """
 
+    _checkpoint_attributes = ('generator', 'crossover', 'mutator', 'selector', 'duplicates', 'archive')
+
     def __init__(self, problem: Problem, name="EpsMOEA Algorithm", evaluator_type=None):
         super().__init__(problem, name, evaluator_type)
 
@@ -204,12 +455,13 @@ class EpsMOEA(GeneticAlgorithm):
         self.archive = None
 
         # set random generator
-        self.individual_features['dominate'] = []
         self.individual_features['crowding_distance'] = 0
-        self.individual_features['domination_counter'] = 0
         self.individual_features['front_number'] = 0
 
     def run(self):
+        if self.options['checkpoint'] is not None:
+            self.check_checkpoint()
+
         # set random generator
         self.generator = RandomGenerator(self.problem.parameters, self.individual_features)
         self.generator.init(self.options['max_population_size'])
@@ -221,6 +473,8 @@ class EpsMOEA(GeneticAlgorithm):
 
         # create initial population
         individuals = self.generator.generate()
+        self.duplicates.clear()
+        self.duplicates.extend([individual.vector for individual in individuals])
 
         for individual in individuals:
             # append to problem
@@ -242,36 +496,62 @@ class EpsMOEA(GeneticAlgorithm):
         for individual in individuals:
             self.problem.data_store.sync_individual(individual)
 
+        self.save_checkpoint(0, individuals)
+        self.run_generations(individuals)
+
+    def run_generations(self, individuals, iteration=0):
         t_s = time.time()
         self.problem.logger.info(
             "Eps-MOEA: {}/{}".format(self.options['max_population_number'], self.options['max_population_size']))
 
-        for it in range(self.options['max_population_number']):
-            # generate and evaluate the next generation
-            offsprings = self.generate(individuals, archive=self.archive)
+        if self.options['asynchronous']:
+            self.run_asynchronous(individuals, self.steady_state_acceptance, archive=self.archive)
+        else:
+            for it in range(iteration, self.options['max_population_number']):
+                # generate and evaluate the next generation
+                offsprings = self.generate(individuals, archive=self.archive)
 
-            self.evaluator.evaluate(offsprings)
+                self.evaluator.evaluate(offsprings)
 
-            # pop-acceptance procedure, the dominating offsprings will be preserved in the population and  in the archive
-            for individual in offsprings:
-                # pareto dominated solutions
-                self.selector.pop_acceptance(individuals, individual)
-                # archived solutions
-                self.archive.add(individual)
+                # pop-acceptance procedure, the dominating offsprings will be preserved in the population and  in the
+                # archive
+                for individual in offsprings:
+                    # pareto dominated solutions
+                    self.selector.pop_acceptance(individuals, individual)
+                    # archived solutions
+                    self.archive.add(individual)
 
-                # add to population
-                individual.population_id = it + 1
-                # append to problem
-                self.problem.individuals.append(individual)
-                # sync to datastore
-                self.problem.data_store.sync_individual(individual)
+                    # add to population
+                    individual.population_id = it + 1
+                    # append to problem
+                    self.problem.individuals.append(individual)
+                    # sync to datastore
+                    self.problem.data_store.sync_individual(individual)
 
-            # make a new population from the previous population
-            # individuals = offsprings
+                # make a new population from the previous population
+                # individuals = offsprings
+
+                self.save_checkpoint(it + 1, individuals)
 
         t = time.time() - t_s
         self.problem.logger.info("Eps-MOEA: {} s".format(t))
+        self.problem.logger.info("Eps-MOEA: evaluation cache: {} hits, {} misses".format(self.evaluator.job.cache.hits,
+                                                                                          self.evaluator.job.cache.misses))
 
         # sync changed individual informations
         self.problem.data_store.sync_all()
 
+    def steady_state_acceptance(self, individuals, offspring):
+        """
+        Incorporates one evaluated offspring into the population and into the archive (asynchronous mode).
+
+        :param individuals: list of individuals
+        :param offspring: evaluated individual
+        :return: list of individuals
+        """
+        # pareto dominated solutions
+        self.selector.pop_acceptance(individuals, offspring)
+        # archived solutions
+        self.archive.add(offspring)
+
+        return individuals
@@ -109,6 +109,8 @@ class OMOPSO(SwarmAlgorithm):
         Evolutionary Multi-Criterion Optimization, pp. 495-509
     """
 
+    _checkpoint_attributes = ('leaders', 'archive', 'non_uniform_mutator', 'uniform_mutator')
+
     def __init__(self, problem: Problem, name="OMOPSO"):
         super().__init__(problem, name)
         self.options.declare(name='prob_mutation', default=0.1, lower=0,
@@ -256,7 +258,9 @@ class OMOPSO(SwarmAlgorithm):
         return best_global
 
     def run(self):
-        t_s = time.time()
+        if self.options['checkpoint'] is not None:
+            self.check_checkpoint()
+
         self.problem.logger.info("PSO: {}/{}".format(self.options['max_population_number'],
                                                      self.options['max_population_size']))
         # update mutators
@@ -284,7 +288,14 @@ class OMOPSO(SwarmAlgorithm):
         for individual in individuals:
             self.problem.data_store.sync_individual(individual)
 
-        it = 0
+        self.save_checkpoint(0, individuals)
+        self.run_generations(individuals)
+
+    def run_generations(self, individuals, iteration=0):
+        t_s = time.time()
+        it = iteration
+        # the schedule of the non-uniform mutation follows the (possibly extended) length of the run
+        self.non_uniform_mutator.max_iterations = self.options['max_population_number']
         while it < self.options['max_population_number']:
             offsprings = self.selector.select(individuals)
 
@@ -309,6 +320,7 @@ class OMOPSO(SwarmAlgorithm):
                 self.problem.data_store.sync_individual(individual)
 
             it += 1
+            self.save_checkpoint(it, individuals)
 
         t = time.time() - t_s
         self.problem.logger.info("PSO: elapsed time: {} s".format(t))
@@ -340,6 +352,8 @@ class SMPSO(SwarmAlgorithm):
         Evolutionary Multi-Criterion Optimization, pp. 495-509
     """
 
+    _checkpoint_attributes = ('leaders', 'mutator')
+
     def __init__(self, problem: Problem, name="SMPSO Algorithm"):
         super().__init__(problem, name)
         self.options.declare(name='prob_mutation', default=0.1, lower=0,
@@ -473,7 +487,9 @@ class SMPSO(SwarmAlgorithm):
         return best_global
 
     def run(self):
-        t_s = time.time()
+        if self.options['checkpoint'] is not None:
+            self.check_checkpoint()
+
         self.problem.logger.info("PSO: {}/{}".format(self.options['max_population_number'],
                                                      self.options['max_population_size']))
         # initialize the swarm
@@ -496,7 +512,12 @@ class SMPSO(SwarmAlgorithm):
         for individual in individuals:
             self.problem.data_store.sync_individual(individual)
 
-        it = 0
+        self.save_checkpoint(0, individuals)
+        self.run_generations(individuals)
+
+    def run_generations(self, individuals, iteration=0):
+        t_s = time.time()
+        it = iteration
         while it < self.options['max_population_number']:
             offsprings = self.selector.select(individuals)
 
@@ -521,6 +542,7 @@ class SMPSO(SwarmAlgorithm):
                 self.problem.data_store.sync_individual(individual)
 
             it += 1
+            self.save_checkpoint(it, individuals)
 
         t = time.time() - t_s
         self.problem.logger.info("PSO: elapsed time: {} s".format(t))
@@ -1,6 +1,7 @@
 import itertools, operator
 from .operators import ParetoDominance, EpsilonDominance
 from random import choice, sample
+import numpy as np
 
 
 class Archive(object):
@@ -67,12 +68,13 @@ class Archive(object):
         """ Truncates the contents to the given value, which is usually the number of particles/individuals in a
             population. """
 
-        result = sorted(self._contents, key=lambda x: x.features[getter])
-
+        values = np.array([individual.features[getter] for individual in self._contents], dtype=float)
+        order = np.argsort(values, kind='stable')
         if larger_preferred:
-            result.reverse()
+            # the newest entries win the ties
+            order = order[::-1]
 
-        self._contents = result[:size]
+        self._contents = [self._contents[i] for i in order[:size].tolist()]
         return
 
     def append(self, individual):
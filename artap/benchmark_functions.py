@@ -22,7 +22,8 @@ class BenchmarkFunction(Problem):
      - some references for the origin
 
     The functions should defined by the eval and the eval constraints functions, which mimics the structure of a
-    standardized artap problem.
+    standardized artap problem. The vectorized evaluate_batch functions evaluate the whole population (n, dimension)
+    at once and return the (n, costs) array.
 
     """
 
@@ -208,6 +209,11 @@ class Rosenbrock(BenchmarkFunction):
             scores += (a * a + b * b * 100.0)
         return [scores]
 
+    def evaluate_batch(self, x):
+        a = 1. - x[:, :self.dimension - 1]
+        b = x[:, 1:self.dimension] - x[:, :self.dimension - 1] ** 2.
+        return np.sum(a * a + b * b * 100.0, axis=1)[:, np.newaxis]
+
 
 class Ackley(BenchmarkFunction):
     """
@@ -250,6 +256,12 @@ class Ackley(BenchmarkFunction):
         n = float(len(x))
         return [-20.0 * np.exp(-0.2 * np.sqrt(firstSum / n)) - np.exp(secondSum / n) + 20.0 + np.e]
 
+    def evaluate_batch(self, x):
+        n = float(x.shape[1])
+        first_sum = np.sum(x ** 2.0, axis=1)
+        second_sum = np.sum(np.cos(2.0 * np.pi * x), axis=1)
+        return (-20.0 * np.exp(-0.2 * np.sqrt(first_sum / n)) - np.exp(second_sum / n) + 20.0 + np.e)[:, np.newaxis]
+
 
 # class Ackley4Modified:
 #     """
@@ -326,6 +338,9 @@ class Sphere(BenchmarkFunction):
 
         return [sum]
 
+    def evaluate_batch(self, x):
+        return np.sum(x ** 2.0, axis=1)[:, np.newaxis]
+
 
 class Schwefel(BenchmarkFunction):
     """
@@ -368,6 +383,10 @@ class Schwefel(BenchmarkFunction):
             fitness += alpha
         return [fitness]
 
+    def evaluate_batch(self, x):
+        alpha = 418.982887
+        return np.sum(alpha - x * np.sin(np.sqrt(np.abs(x))), axis=1)[:, np.newaxis]
+
 
 class ModifiedEasom(BenchmarkFunction):
     """
@@ -404,6 +423,11 @@ class ModifiedEasom(BenchmarkFunction):
             summa += (c - np.pi) ** 2.
         return [product * np.exp(-summa)]
 
+    def evaluate_batch(self, x):
+        product = -1.0 * np.prod(-1. * np.cos(x) ** 2., axis=1)
+        summa = np.sum((x - np.pi) ** 2., axis=1)
+        return (product * np.exp(-summa))[:, np.newaxis]
+
 
 class EqualityConstr(BenchmarkFunction):
     """
@@ -441,6 +465,11 @@ class EqualityConstr(BenchmarkFunction):
         else:
             return [0.]
 
+    def evaluate_batch(self, x):
+        product = np.prod(x * np.sqrt(self.dimension), axis=1)
+        summa = np.sum(x * x, axis=1)
+        return np.where(summa != 0., -1.0 * product, 0.)[:, np.newaxis]
+
 
 class Griewank(BenchmarkFunction):
     """
@@ -484,6 +513,11 @@ class Griewank(BenchmarkFunction):
             produkt *= np.cos(c / np.sqrt(i + 1))
         return [summa - produkt + 1.]
 
+    def evaluate_batch(self, x):
+        summa = np.sum(x ** 2 / 4000.0, axis=1)
+        produkt = np.prod(np.cos(x / np.sqrt(np.arange(1, x.shape[1] + 1))), axis=1)
+        return (summa - produkt + 1.)[:, np.newaxis]
+
 
 class Michaelwicz(BenchmarkFunction):
     """
@@ -529,6 +563,11 @@ class Michaelwicz(BenchmarkFunction):
             f += np.sin(c) * np.sin((i + 1) * c * c / np.pi) ** (2. * m)
         return [-f]
 
+    def evaluate_batch(self, x):
+        m = 10  # m is generally selected to 10
+        i = np.arange(1, x.shape[1] + 1)
+        return -np.sum(np.sin(x) * np.sin(i * x * x / np.pi) ** (2. * m), axis=1)[:, np.newaxis]
+
 
 class Perm(BenchmarkFunction):
     """
@@ -563,6 +602,14 @@ class Perm(BenchmarkFunction):
                 f += (j + 1 + b) * (d ** i - 1. / ((j + 1.) ** i)) ** 2.
         return [f]
 
+    def evaluate_batch(self, x):
+        b = 10  # optional, with the default value of 10
+        j = np.arange(1., x.shape[1] + 1.)
+        f = np.zeros(x.shape[0])
+        for i in range(1, self.dimension + 1):
+            f += np.sum((j + b) * (x ** i - 1. / (j ** i)) ** 2., axis=1)
+        return f[:, np.newaxis]
+
 
 class Rastrigin(BenchmarkFunction):
     """
@@ -601,6 +648,9 @@ class Rastrigin(BenchmarkFunction):
             fitness += c ** 2 - (10 * np.cos(2 * np.pi * c))
         return [fitness]
 
+    def evaluate_batch(self, x):
+        return (10 * self.dimension + np.sum(x ** 2 - (10 * np.cos(2 * np.pi * x)), axis=1))[:, np.newaxis]
+
 
 class SixHump(BenchmarkFunction):
     """
@@ -632,6 +682,10 @@ class SixHump(BenchmarkFunction):
         return [((4 - 2.1 * x[0] ** 2 + x[0] ** 4 / 3.) * x[0] ** 2 + x[0] * x[1]
                  - 4 * x[1] ** 2 + 4 * x[1] ** 4)]
 
+    def evaluate_batch(self, x):
+        return ((4 - 2.1 * x[:, 0] ** 2 + x[:, 0] ** 4 / 3.) * x[:, 0] ** 2 + x[:, 0] * x[:, 1]
+                - 4 * x[:, 1] ** 2 + 4 * x[:, 1] ** 4)[:, np.newaxis]
+
 
 class Schubert(BenchmarkFunction):
     """
@@ -666,6 +720,12 @@ class Schubert(BenchmarkFunction):
             f2 += i * np.cos(i + (i + 1) * x[1])
         return [f1 * f2]
 
+    def evaluate_batch(self, x):
+        i = np.arange(1, 6)[:, np.newaxis]
+        f1 = np.sum(i * np.cos(i + (i + 1) * x[:, 0]), axis=0)
+        f2 = np.sum(i * np.cos(i + (i + 1) * x[:, 1]), axis=0)
+        return (f1 * f2)[:, np.newaxis]
+
 
 class Zakharov(BenchmarkFunction):
     """
@@ -707,6 +767,11 @@ class Zakharov(BenchmarkFunction):
             f3 += 0.5 * (i + 1) * c
         return [f1 + f2 ** 2. + f3 ** 2.]
 
+    def evaluate_batch(self, x):
+        f1 = np.sum(x ** 2, axis=1)
+        f2 = np.sum(0.5 * np.arange(1, x.shape[1] + 1) * x, axis=1)
+        return (f1 + 2. * f2 ** 2.)[:, np.newaxis]
+
 
 class XinSheYang(BenchmarkFunction):
     """
@@ -744,6 +809,12 @@ class XinSheYang(BenchmarkFunction):
             f2 = np.sin(c ** 2.)
         return [f1 * np.exp(-f2)]
 
+    def evaluate_batch(self, x):
+        # only the last coordinate contributes (as in evaluate)
+        f1 = np.fabs(x[:, -1])
+        f2 = np.sin(x[:, -1] ** 2.)
+        return (f1 * np.exp(-f2))[:, np.newaxis]
+
 
 class XinSheYang2(BenchmarkFunction):
     """
@@ -786,6 +857,15 @@ class XinSheYang2(BenchmarkFunction):
             f3 = np.cos(c) ** 2.
         return [(np.exp(f1) - 2. * np.exp(f2)) * f3]
 
+    def evaluate_batch(self, x):
+        beta = 15.
+        m = 5.
+        # only the last coordinate contributes (as in evaluate)
+        f1 = -1. * (x[:, -1] / beta) ** (2. * m)
+        f2 = -1. * x[:, -1] ** 2.
+        f3 = np.cos(x[:, -1]) ** 2.
+        return ((np.exp(f1) - 2. * np.exp(f2)) * f3)[:, np.newaxis]
+
 
 class XinSheYang3(BenchmarkFunction):
     """
@@ -823,6 +903,11 @@ class XinSheYang3(BenchmarkFunction):
             f1 = eps * np.fabs(c - 1. / (i + 1.))
         return [f1]
 
+    def evaluate_batch(self, x):
+        # only the last coordinate contributes (as in evaluate)
+        eps = np.random.uniform(0, 1, x.shape[0])
+        return (eps * np.fabs(x[:, -1] - 1. / x.shape[1]))[:, np.newaxis]
+
 
 class BinhAndKorn:
     """
@@ -920,6 +1005,9 @@ class Booth(BenchmarkFunction):
         x = x.vector
         return [(x[0] + 2 * x[1] - 7) ** 2 + (2 * x[0] + x[1] - 5) ** 2]
 
+    def evaluate_batch(self, x):
+        return ((x[:, 0] + 2 * x[:, 1] - 7) ** 2 + (2 * x[:, 0] + x[:, 1] - 5) ** 2)[:, np.newaxis]
+
 
 class GramacyLee(BenchmarkFunction):
     """
@@ -946,6 +1034,9 @@ class GramacyLee(BenchmarkFunction):
         f = np.sin(10.0 * np.pi * x[0]) / (2. * x[0]) + (x[0] - 1.) ** 4
         return [f]
 
+    def evaluate_batch(self, x):
+        return (np.sin(10.0 * np.pi * x[:, 0]) / (2. * x[:, 0]) + (x[:, 0] - 1.) ** 4)[:, np.newaxis]
+
 
 class AlpineFunction(BenchmarkFunction):
     """
@@ -982,6 +1073,9 @@ class AlpineFunction(BenchmarkFunction):
             f1 += np.abs(c * np.sin(c) + 0.1 * c)
         return [f1]
 
+    def evaluate_batch(self, x):
+        return np.sum(np.abs(x * np.sin(x) + 0.1 * x), axis=1)[:, np.newaxis]
+
 
 class SurrogateBenchmarkData:
     def __init__(self, n_test=5, n_train=None, verbose=1):
@@ -4,6 +4,41 @@ from math import cos, pi, sin, sqrt
 import numpy as np
 
 
+def _pareto_positions(n, m):
+    """
+    Regular grid of the position variables of the DTLZ problems.
+
+    :param n: number of points in every direction
+    :param m: number of objectives
+    :return: array (n ** (m - 1), m - 1)
+    """
+    axis = np.linspace(0.0, 1.0, n)
+    grid = np.meshgrid(*[axis] * (m - 1), indexing='ij')
+    return np.column_stack([coordinate.ravel() for coordinate in grid])
+
+
+def _linear_front(positions):
+    """ Points of the hyperplane sum(f) = 0.5 (DTLZ1). """
+    m = positions.shape[1] + 1
+    front = np.full((positions.shape[0], m), 0.5)
+    for i in range(m):
+        front[:, i] *= np.prod(positions[:, :m - i - 1], axis=1)
+        if i > 0:
+            front[:, i] *= 1. - positions[:, m - i - 1]
+    return front
+
+
+def _spherical_front(positions):
+    """ Points of the unit hypersphere in the positive orthant (DTLZ2 - DTLZ4). """
+    m = positions.shape[1] + 1
+    front = np.ones((positions.shape[0], m))
+    for i in range(m):
+        front[:, i] *= np.prod(np.cos(0.5 * np.pi * positions[:, :m - i - 1]), axis=1)
+        if i > 0:
+            front[:, i] *= np.sin(0.5 * np.pi * positions[:, m - i - 1])
+    return front
+
+
 class BiObjectiveTestProblem(BenchmarkFunction):
     """
     The goal of this example to show, how we can use Artap to solve a simple,
@@ -49,6 +84,17 @@ class BiObjectiveTestProblem(BenchmarkFunction):
         f2 = (1 + individual.vector[1]) / individual.vector[0]
         return [f1, f2]
 
+    def evaluate_batch(self, x):
+        return np.column_stack((x[:, 0], (1 + x[:, 1]) / x[:, 0]))
+
+    def pareto_front_sample(self, n=100):
+        """
+        :param n: number of points
+        :return: array (n, 2) of the points of the Pareto front
+        """
+        f1 = np.linspace(0.1, 1., n)
+        return np.column_stack((f1, 1. / f1))
+
 
 class PoloniFunction(BenchmarkFunction):
     """
@@ -95,6 +141,21 @@ class PoloniFunction(BenchmarkFunction):
 
         return [f1, f2]
 
+    def evaluate_batch(self, x):
+        x1 = x[:, 0]
+        x2 = x[:, 1]
+
+        A1 = 0.5 * np.sin(1.) - 2. * np.cos(1.) + np.sin(2.) - 1.5 * np.cos(2.)
+        A2 = 1.5 * np.sin(1.) - np.cos(1.) + 2. * np.sin(2.) - 0.5 * np.cos(2.)
+
+        B1 = 0.5 * np.sin(x1) - 2. * np.cos(x1) + np.sin(x2) - 1.5 * np.cos(x2)
+        B2 = 1.5 * np.sin(x1) - np.cos(x1) + 2. * np.sin(x2) - 0.5 * np.cos(x2)
+
+        f1 = 1. + (A1 - B1) ** 2. + (A2 - B2) ** 2.
+        f2 = (x1 + 3.) ** 2. + (x2 + 1.) ** 2.
+
+        return np.column_stack((f1, f2))
+
 
 class DTLZI(BenchmarkFunction):
     """
@@ -168,6 +229,30 @@ class DTLZI(BenchmarkFunction):
 
         return scores
 
+    def evaluate_batch(self, x):
+        m = len(self.costs)
+        nvar = x.shape[1]
+        k = nvar - m + 1
+
+        y = x[:, nvar - k:]
+        g = 100 * (k + np.sum((y - 0.5) * (y - 0.5) - np.cos(20.0 * np.pi * (y - 0.5)), axis=1))
+
+        factor = 0.5 * (1 + g)
+        scores = np.empty((x.shape[0], m))
+        for i in range(0, m):
+            scores[:, i] = factor * np.prod(x[:, :m - i - 1], axis=1)
+            if i > 0:
+                scores[:, i] *= (1. - x[:, m - i - 1])
+
+        return scores
+
+    def pareto_front_sample(self, n=100):
+        """
+        :param n: number of points in the direction of every position variable
+        :return: array (n ** (m - 1), m) of the points of the Pareto front (the hyperplane sum(f) = 0.5)
+        """
+        return _linear_front(_pareto_positions(n, len(self.costs)))
+
 
 class DTLZII(BenchmarkFunction):
     """
@@ -213,10 +298,10 @@ class DTLZII(BenchmarkFunction):
 
     def evaluate(self, x):
 
-        k = 10  # k >= 1, it can be k = 5 is the offered value,
-
         m = len(self.costs)
         x = x.vector
+        # the distance variables x_M
+        k = len(x) - m + 1
         scores = []
         for i in range(0, m):
             fi = 1.0
@@ -224,7 +309,7 @@ class DTLZII(BenchmarkFunction):
                 fi *= cos(0.5 * x[j] * pi)
 
             if i > 0:
-                fi *= sin(x[m - i] * pi / 2.)
+                fi *= sin(x[m - i - 1] * pi / 2.)
             gm = 0.
             for i in range(0, k):
                 gm += (x[len(x) - i - 1] - 0.5) ** 2.
@@ -233,6 +318,28 @@ class DTLZII(BenchmarkFunction):
 
         return scores
 
+    def evaluate_batch(self, x):
+        m = len(self.costs)
+        nvar = x.shape[1]
+        k = nvar - m + 1
+        gm = np.sum((x[:, [nvar - i - 1 for i in range(0, k)]] - 0.5) ** 2., axis=1)
+
+        scores = np.empty((x.shape[0], m))
+        for i in range(0, m):
+            scores[:, i] = np.prod(np.cos(0.5 * x[:, :m - i - 1] * np.pi), axis=1)
+            if i > 0:
+                scores[:, i] *= np.sin(x[:, m - i - 1] * np.pi / 2.)
+            scores[:, i] *= (1. + gm)
+
+        return scores
+
+    def pareto_front_sample(self, n=100):
+        """
+        :param n: number of points in the direction of every position variable
+        :return: array (n ** (m - 1), m) of the points of the Pareto front (the unit hypersphere)
+        """
+        return _spherical_front(_pareto_positions(n, len(self.costs)))
+
 
 class DTLZIII(BenchmarkFunction):
     """
@@ -273,10 +380,10 @@ class DTLZIII(BenchmarkFunction):
 
     def evaluate(self, x):
 
-        k = 10  # k >= 1, it can be k = 5 is the offered value,
-
         m = len(self.costs)
         x = x.vector
+        # the distance variables x_M
+        k = len(x) - m + 1
         scores = []
         for i in range(0, m):
             fi = 1.0
@@ -284,7 +391,7 @@ class DTLZIII(BenchmarkFunction):
                 fi *= cos(0.5 * x[j] * pi)
 
             if i > 0:
-                fi *= sin(x[m - i] * pi / 2.)
+                fi *= sin(x[m - i - 1] * pi / 2.)
             # gm = 0.
             # for i in range(0, k):
             #     gm += (x[len(x) - i-1] - 0.5) ** 2.
@@ -299,6 +406,29 @@ class DTLZIII(BenchmarkFunction):
 
         return scores
 
+    def evaluate_batch(self, x):
+        m = len(self.costs)
+        nvar = x.shape[1]
+        k = nvar - m + 1
+        y = x[:, [nvar - i - 1 for i in range(0, k)]]
+        gm = float(k) + np.sum((y - 0.5) ** 2. - np.cos(20. * np.pi * (y - 0.5)), axis=1)
+
+        scores = np.empty((x.shape[0], m))
+        for i in range(0, m):
+            scores[:, i] = np.prod(np.cos(0.5 * x[:, :m - i - 1] * np.pi), axis=1)
+            if i > 0:
+                scores[:, i] *= np.sin(x[:, m - i - 1] * np.pi / 2.)
+            scores[:, i] *= (1 + 100. * gm)
+
+        return scores
+
+    def pareto_front_sample(self, n=100):
+        """
+        :param n: number of points in the direction of every position variable
+        :return: array (n ** (m - 1), m) of the points of the Pareto front (the unit hypersphere)
+        """
+        return _spherical_front(_pareto_positions(n, len(self.costs)))
+
 
 class DTLZIV(BenchmarkFunction):
     """
@@ -335,11 +465,11 @@ class DTLZIV(BenchmarkFunction):
 
     def evaluate(self, x):
 
-        k = 10  # k >= 1, it can be k = 5 is the offered value,
-
         alpha = 100
         m = len(self.costs)
         x = x.vector
+        # the distance variables x_M
+        k = len(x) - m + 1
         scores = []
         for i in range(0, m):
             fi = 1.0
@@ -347,7 +477,7 @@ class DTLZIV(BenchmarkFunction):
                 fi *= cos(0.5 * x[j] ** alpha * pi)
 
             if i > 0:
-                fi *= sin(x[m - i] ** alpha * pi / 2.)
+                fi *= sin(x[m - i - 1] ** alpha * pi / 2.)
             gm = 0.
             for i in range(0, k):
                 gm += (x[len(x) - i - 1] - 0.5) ** 2.
@@ -356,6 +486,29 @@ class DTLZIV(BenchmarkFunction):
 
         return scores
 
+    def evaluate_batch(self, x):
+        alpha = 100
+        m = len(self.costs)
+        nvar = x.shape[1]
+        k = nvar - m + 1
+        gm = np.sum((x[:, [nvar - i - 1 for i in range(0, k)]] - 0.5) ** 2., axis=1)
+
+        scores = np.empty((x.shape[0], m))
+        for i in range(0, m):
+            scores[:, i] = np.prod(np.cos(0.5 * x[:, :m - i - 1] ** alpha * np.pi), axis=1)
+            if i > 0:
+                scores[:, i] *= np.sin(x[:, m - i - 1] ** alpha * np.pi / 2.)
+            scores[:, i] *= (1. + gm)
+
+        return scores
+
+    def pareto_front_sample(self, n=100):
+        """
+        :param n: number of points in the direction of every position variable
+        :return: array (n ** (m - 1), m) of the points of the Pareto front (the unit hypersphere)
+        """
+        return _spherical_front(_pareto_positions(n, len(self.costs)))
+
 
 # TODO : finish the dtlz 5-7 problems and the dtlz test problems https://deap.readthedocs.io/en/master/api/benchmarks.html#deap.benchmarks.zdt1
 
@@ -410,6 +563,23 @@ class CEC2020MMF1(BenchmarkFunction):
         f2 = 1 - np.abs(x1 - 2) ** 0.5 + 2. * (x2 - (a ** x1) * np.sin(6. * np.pi * np.abs(x1 - 2.) + np.pi)) ** 2.
         return [f1, f2]
 
+    def evaluate_batch(self, x):
+        x1 = x[:, 0]
+        x2 = x[:, 1]
+
+        a = np.where(x1 < 2., 1., np.e)
+        f1 = np.abs(x1 - 2)
+        f2 = 1 - np.abs(x1 - 2) ** 0.5 + 2. * (x2 - (a ** x1) * np.sin(6. * np.pi * np.abs(x1 - 2.) + np.pi)) ** 2.
+        return np.column_stack((f1, f2))
+
+    def pareto_front_sample(self, n=100):
+        """
+        :param n: number of points
+        :return: array (n, 2) of the points of the Pareto front
+        """
+        f1 = np.linspace(0., 1., n)
+        return np.column_stack((f1, 1. - np.sqrt(f1)))
+
 
 class CEC2020MMF2(BenchmarkFunction):
     """
@@ -468,6 +638,29 @@ class CEC2020MMF2(BenchmarkFunction):
 
         return [f1, f2]
 
+    def evaluate_batch(self, x):
+        x1 = x[:, 0]
+        x2 = x[:, 1]
+
+        f1 = np.abs(x1)
+
+        a = x1 ** 0.5
+
+        f2a = 1 - a + 2. * (4. * (x2 - a)) ** 2. - 2. * np.cos(20.0 * np.pi / (2.0 ** 0.5) * (x2 - a)) + 2.
+        f2b = 1 - a + 2. * (4. * (x2 - 1.0 - a)) ** 2. - 2. * np.cos(20.0 * np.pi / (2.0 ** 0.5) * (x2 - 1.0 - a)) + 2.
+
+        f2 = np.where(x2 < 1., f2a, f2b)
+
+        return np.column_stack((f1, f2))
+
+    def pareto_front_sample(self, n=100):
+        """
+        :param n: number of points
+        :return: array (n, 2) of the points of the Pareto front
+        """
+        f1 = np.linspace(0., 1., n)
+        return np.column_stack((f1, 1. - np.sqrt(f1)))
+
 
 class ZDT1(BenchmarkFunction):
     """
@@ -519,6 +712,18 @@ class ZDT1(BenchmarkFunction):
     def eval_h(self, f: float, g: float) -> float:
         return 1.0 - sqrt(f / g)
 
+    def evaluate_batch(self, x):
+        g = 9.0 / (x.shape[1] - 1) * np.sum(x[:, 1:], axis=1) + 1.0
+        return np.column_stack((x[:, 0], g * (1.0 - np.sqrt(x[:, 0] / g))))
+
+    def pareto_front_sample(self, n=100):
+        """
+        :param n: number of points
+        :return: array (n, 2) of the points of the Pareto front
+        """
+        f1 = np.linspace(0., 1., n)
+        return np.column_stack((f1, 1. - np.sqrt(f1)))
+
 
 if __name__ == '__main__':
     # visualcheck
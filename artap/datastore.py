@@ -2,13 +2,61 @@ import sqlite3
 
 import os
 import json
+import array
+import time
+import queue
+import pathlib
+import hashlib
+import threading
+import weakref
 
 from .individual import Individual
+from .utils import VectorAndNumbers
+import numpy as np
+
+
+def problem_fingerprint(parameters, costs, model_version=''):
+    """
+    Identifies the evaluated model, the results of two problems with the same fingerprint are interchangeable.
+
+    :param parameters: list (or dictionary) of the problem parameters
+    :param costs: list of the problem costs
+    :param model_version: user supplied version of the model
+    :return: hex digest
+    """
+    if isinstance(parameters, dict):
+        parameters = [dict(value, name=name) for name, value in parameters.items()]
+
+    data = {'parameters': [[parameter.get('name'), parameter.get('bounds'), parameter.get('precision')]
+                           for parameter in parameters],
+            'costs': [cost.get('name') if isinstance(cost, dict) else cost for cost in costs],
+            'model_version': str(model_version)}
+
+    return hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()
 
 
 class DummyDataStore:
     def __init__(self):
-        pass
+        # the checksum of every individual at the last sync (the unchanged individuals are not written again)
+        self._synced = {}
+
+    def _changed(self, individuals):
+        """
+        Selects the individuals which have been changed since the last sync and marks them as synced.
+
+        :param individuals: list of individuals (in the order of writing, more individuals can share one id)
+        :return: list of the changed individuals
+        """
+        changed = []
+        for individual in individuals:
+            checksum = individual.checksum()
+            if self._synced.get(individual.id) != checksum:
+                self._synced[individual.id] = checksum
+                changed.append(individual)
+        return changed
+
+    def _mark_synced(self, individual):
+        self._synced[individual.id] = individual.checksum()
 
     def sync_individual(self, individuals):
         pass
@@ -16,35 +64,213 @@ class DummyDataStore:
     def sync_all(self):
         pass
 
+    def flush(self):
+        pass
+
     def destroy(self):
         pass
 
 
+class SqliteWriterError(RuntimeError):
+    """ The rows of the individuals ids have not been written by the SqliteWriter. """
+
+    def __init__(self, ids, error):
+        super().__init__("SqliteWriter: {} rows (ids {}) have not been written: {}".format(len(ids), ids, error))
+        self.ids = ids
+
+
+class SqliteWriter:
+    """
+    Background writer of the write-behind SqliteDataStore.
+
+    The rows are queued by the evaluation threads and written by one thread with executemany. The transaction is
+    committed every batch_size rows or batch_interval seconds after the first uncommitted row (group commit).
+    Every queued item is a tuple with one row for each of the statements in sql (the first item of the first row is
+    the id of the individual). The failed batches are logged and reported by SqliteWriterError from flush and close.
+    """
+
+    _STOP = object()
+
+    def __init__(self, database_name, sql, batch_size=1000, batch_interval=0.1, timeout=30.0, logger=None):
+        self.database_name = database_name
+        self.sql = sql
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.timeout = timeout
+        self.logger = logger
+
+        self.rows = 0  # committed rows
+        self.commits = 0
+
+        # ids of the lost rows and the last error, raised by flush or close
+        self._lost = []
+        self._error = None
+        self._lock = threading.Lock()
+
+        self._queue = queue.Queue()
+        # daemon - the interpreter does not wait for the thread, the data are flushed by close (atexit)
+        self._thread = threading.Thread(target=self._run, name="SqliteWriter", daemon=True)
+        self._thread.start()
+
+    def put(self, rows):
+        self._queue.put(rows)
+
+    def flush(self):
+        """ Blocks until all queued rows are committed, raises SqliteWriterError if some rows have been lost. """
+        if self._thread.is_alive():
+            event = threading.Event()
+            self._queue.put(event)
+            event.wait()
+        self._raise()
+
+    def close(self):
+        """ Commits the queued rows and stops the writer thread, raises SqliteWriterError if rows have been lost. """
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+        self._raise()
+
+    def _raise(self):
+        with self._lock:
+            lost, error = self._lost, self._error
+            self._lost, self._error = [], None
+        if error is not None:
+            raise SqliteWriterError(lost, error) from error
+
+    def _fail(self, rows, error):
+        ids = [row[0][0] for row in rows]
+        with self._lock:
+            self._lost.extend(ids)
+            self._error = error
+        if self.logger is not None:
+            self.logger.error("SqliteWriter: {} rows (ids {}) have not been written: {}".format(len(ids), ids, error))
+
+    def _run(self):
+        conn = sqlite3.connect(self.database_name, timeout=self.timeout)
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+
+        pending = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None  # batch interval elapsed
+
+            if isinstance(item, tuple):
+                pending.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.batch_interval
+                if len(pending) < self.batch_size:
+                    continue
+
+            if pending:
+                self._commit(conn, pending)
+                pending = []
+            deadline = None
+
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is self._STOP:
+                break
+
+        conn.close()
+
+    def _commit(self, conn, rows):
+        error = None
+        for i in range(10):
+            try:
+                for sql, statement_rows in zip(self.sql, zip(*rows)):
+                    conn.executemany(sql, statement_rows)
+                conn.commit()
+                self.rows += len(rows)
+                self.commits += 1
+                return
+            except sqlite3.OperationalError as e:
+                # database is locked - try again
+                error = e
+                conn.rollback()
+                time.sleep(0.01 * (i + 1))
+            except sqlite3.Error as e:
+                error = e
+                conn.rollback()
+                break
+
+        self._fail(rows, error)
+
+
 class SqliteDataStore(DummyDataStore):
+    """
+    Stores the problem and the individuals into the SQLite database.
+
+    The individuals are stored in typed columns (schema version 2): one row of the table 'individuals' with
+    population_id, algorithm_id, state, feasibility and the REAL columns parameter_<i> and cost_<i> for every
+    individual, the features are stored in the table 'features'. The population_id and the cost columns are indexed,
+    so the filtered reads do not need to parse the whole table. The databases with the JSON documents (schema
+    version 1) are migrated when they are opened for writing, the read only databases are migrated in memory.
+    """
+
+    schema_version = 2
+
     sql_main_table = "CREATE TABLE IF NOT EXISTS main (name text NOT NULL, description text NOT NULL);"
     sql_parameters_table = "CREATE TABLE IF NOT EXISTS parameters (name text PRIMARY KEY, parameter json not null);"
     sql_costs_table = "CREATE TABLE IF NOT EXISTS costs (name text PRIMARY KEY, cost json not null);"
-    sql_individuals_table = "CREATE TABLE IF NOT EXISTS individuals (id int PRIMARY KEY, individual json not null);"
+    sql_features_table = "CREATE TABLE IF NOT EXISTS features (id INTEGER PRIMARY KEY, features json NOT NULL);"
+    sql_fingerprint_table = "CREATE TABLE IF NOT EXISTS fingerprint (fingerprint text NOT NULL);"
+    sql_schema_table = "CREATE TABLE IF NOT EXISTS schema (version INTEGER NOT NULL);"
 
     sql_main_insert = "INSERT INTO main(name, description) VALUES (?,?)"
     sql_parameters_insert = "INSERT INTO parameters(name, parameter) VALUES (?,?)"
     sql_costs_insert = "INSERT INTO costs(name, cost) VALUES (?,?)"
+    sql_costs_insert_missing = "INSERT OR IGNORE INTO costs(name, cost) VALUES (?,?)"
+    sql_fingerprint_insert = "INSERT INTO fingerprint(fingerprint) VALUES (?)"
+    sql_schema_insert = "INSERT INTO schema(version) VALUES (?)"
 
-    sql_individuals_upsert = "INSERT INTO individuals (id, individual) VALUES(?,?) ON CONFLICT(id) DO UPDATE SET individual=excluded.individual;"
+    sql_features_upsert = "INSERT OR REPLACE INTO features (id, features) VALUES(?,?);"
 
     sql_main_select = "SELECT * FROM main;"
     sql_parameters_select = "SELECT * FROM parameters;"
     sql_costs_select = "SELECT * FROM costs;"
-    sql_individuals_select = "SELECT * FROM individuals;"
-    # SELECT json_extract(individual, '$.costs[0]') as cost FROM individuals where cost>10;
+    sql_schema_select = "SELECT version FROM schema;"
+    sql_tables_select = "SELECT name FROM sqlite_master WHERE type='table';"
+    sql_individuals_columns_select = "PRAGMA table_info(individuals);"
+
+    # schema version 1 - one JSON document (Individual.to_dict) for every individual
+    sql_individuals_json_select = "SELECT * FROM individuals;"
+
+    individual_columns = ["id", "population_id", "algorithm_id", "state", "feasible", "costs_signed", "parents",
+                          "children", "custom"]
 
-    def __init__(self, problem, database_name, mode="write", thread_safe=True):
+    # attempts to write the individual into the locked database
+    max_attempts = 10
+
+    def __init__(self, problem, database_name, mode="write", thread_safe=True, write_behind=False, batch_size=1000,
+                 batch_interval=0.1, lazy=False):
+        """
+        :param problem: Problem
+        :param database_name: file name of the database
+        :param mode: 'write' (append to an existing database), 'rewrite' or 'read'
+        :param thread_safe: new connection for every write
+        :param write_behind: the individuals are queued and written by a background thread in batches (WAL journal),
+                             the queue is flushed by sync_all (at the end of the algorithm), flush and destroy
+        :param batch_size: maximum number of rows of one commit (write_behind)
+        :param batch_interval: maximum delay of the commit in seconds (write_behind)
+        :param lazy: only the problem (name, parameters and costs) is read, the individuals are not loaded into
+                     problem.individuals, they are queried by read_individuals, iterate, read_vectors and read_costs
+        """
+        super().__init__()
         self.problem = problem
         self.database_name = database_name
         self.mode = mode
         self.thread_safe = thread_safe
+        self.lazy = lazy
         # cache
         self._conn = None
+        self._writer = None
+        # number of the cost columns of the table individuals (the costs can be added during the run)
+        self._cost_columns = None
 
         if not self.database_name:
             raise RuntimeError("SqliteDataStoreCacheThread: database name is empty.")
@@ -55,6 +281,7 @@ class SqliteDataStore(DummyDataStore):
                 if statinfo.st_size == 0:
                     self._create_structure()
                 else:
+                    self.migrate()
                     self.read_from_datastore()
             else:
                 self._create_structure()
@@ -65,7 +292,26 @@ class SqliteDataStore(DummyDataStore):
         elif self.mode == "read":
             self.read_from_datastore()
 
+        if write_behind and self.mode in ["write", "rewrite"]:
+            self._writer = SqliteWriter(self.database_name, [self.sql_individuals_upsert(), self.sql_features_upsert],
+                                        batch_size, batch_interval, logger=self.problem.logger)
+            # the queue is flushed also when the data store is not destroyed explicitly (at exit)
+            self._finalizer = weakref.finalize(self, self._writer.close)
+
     def conn(self):
+        if self.mode == "read":
+            # one connection, the databases with old schema are migrated in memory
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.database_name, check_same_thread=False)
+                if self._version(self._conn.cursor()) < self.schema_version:
+                    conn = sqlite3.connect(":memory:", check_same_thread=False)
+                    self._conn.backup(conn)
+                    self._conn.close()
+                    self._conn = conn
+                    self._migrate(conn)
+
+            return self._conn
+
         if self.thread_safe:
             try:
                 if self.mode == "write":
@@ -96,6 +342,47 @@ class SqliteDataStore(DummyDataStore):
 
             return self._conn
 
+    def parameter_columns(self):
+        return ["parameter_{}".format(i) for i in range(len(self.problem.parameters))]
+
+    def cost_columns(self):
+        return ["cost_{}".format(i) for i in range(len(self.problem.costs))]
+
+    def sql_individuals_table(self):
+        columns = ["id INTEGER PRIMARY KEY", "population_id INTEGER NOT NULL", "algorithm_id NOT NULL",
+                   "state text", "feasible REAL", "costs_signed BLOB", "parents json", "children json",
+                   "custom json"]
+        columns += ["{} REAL".format(column) for column in self.parameter_columns() + self.cost_columns()]
+        return "CREATE TABLE IF NOT EXISTS individuals ({});".format(", ".join(columns))
+
+    def sql_individuals_indexes(self):
+        indexes = ["CREATE INDEX IF NOT EXISTS individuals_population_id ON individuals (population_id);"]
+        for column in self.cost_columns():
+            indexes.append("CREATE INDEX IF NOT EXISTS individuals_{0} ON individuals ({0});".format(column))
+        return indexes
+
+    def sql_individuals_upsert(self):
+        columns = self.individual_columns + self.parameter_columns() + self.cost_columns()
+        return "INSERT OR REPLACE INTO individuals ({}) VALUES ({});".format(", ".join(columns),
+                                                                            ",".join("?" * len(columns)))
+
+    def sql_individuals_select(self, where=""):
+        columns = self.individual_columns + self.parameter_columns() + self.cost_columns()
+        return "SELECT {}, features.features FROM individuals LEFT JOIN features ON individuals.id = features.id " \
+               "{} ORDER BY individuals.id".format(", ".join("individuals." + column for column in columns), where)
+
+    @classmethod
+    def _version(cls, c):
+        c.execute(cls.sql_tables_select)
+        tables = [row[0] for row in c.fetchall()]
+        if "schema" in tables:
+            c.execute(cls.sql_schema_select)
+            return c.fetchone()[0]
+        elif "individuals" in tables:
+            return 1
+        else:
+            return cls.schema_version
+
     def _create_structure(self):
         conn = self.conn()
         c = conn.cursor()
@@ -104,7 +391,8 @@ class SqliteDataStore(DummyDataStore):
         c.execute(self.sql_main_table)
         c.execute(self.sql_costs_table)
         c.execute(self.sql_parameters_table)
-        c.execute(self.sql_individuals_table)
+        c.execute(self.sql_fingerprint_table)
+        self._create_individuals_structure(c)
         conn.commit()
 
         # data
@@ -113,12 +401,74 @@ class SqliteDataStore(DummyDataStore):
             c.execute(self.sql_parameters_insert, [parameter["name"], json.dumps(parameter)])
         for cost in self.problem.costs:
             c.execute(self.sql_costs_insert, [cost["name"], json.dumps(cost)])
+        c.execute(self.sql_fingerprint_insert, [problem_fingerprint(self.problem.parameters, self.problem.costs,
+                                                                    self.problem.options['model_version'])])
         conn.commit()
 
-    def read_from_datastore(self):
-        conn = self.conn()
+    def _create_individuals_structure(self, c):
+        c.execute(self.sql_schema_table)
+        c.execute(self.sql_individuals_table())
+        c.execute(self.sql_features_table)
+        for sql in self.sql_individuals_indexes():
+            c.execute(sql)
+        c.execute(self.sql_schema_insert, [self.schema_version])
+
+    def migrate(self):
+        """ Converts the database with the JSON documents (schema version 1) to the typed tables. """
+        conn = sqlite3.connect(self.database_name)
+        if self._version(conn.cursor()) < self.schema_version:
+            self._migrate(conn)
+        conn.close()
+
+    def _migrate(self, conn):
         c = conn.cursor()
+        self._read_structure(c)
+
+        c.execute("ALTER TABLE individuals RENAME TO individuals_json;")
+        self._create_individuals_structure(c)
+        rows = [self._rows(json.loads(row[1])) for row in c.execute("SELECT * FROM individuals_json;").fetchall()]
+        c.executemany(self.sql_individuals_upsert(), [row[0] for row in rows])
+        c.executemany(self.sql_features_upsert, [row[1] for row in rows])
+        c.execute("DROP TABLE individuals_json;")
+        conn.commit()
+
+    def _rows(self, dictionary):
+        """
+        :param dictionary: Individual.to_dict()
+        :return: rows of the tables individuals and features
+        """
+        parameters = len(self.problem.parameters)
+        costs = len(self.problem.costs)
+        vector = list(dictionary['vector'])[:parameters]
+        values = list(dictionary['costs'])[:costs]
+        costs_signed = dictionary['costs_signed']
+
+        row = [dictionary['id'], dictionary['population_id'], dictionary['algorithm_id'], dictionary['state'],
+               dictionary['features'].get('feasible'),
+               sqlite3.Binary(array.array('d', costs_signed).tobytes()) if costs_signed else None,
+               json.dumps(dictionary['parents']), json.dumps(dictionary['children']),
+               json.dumps(dictionary['custom'])]
+        row += vector + [None] * (parameters - len(vector))
+        row += values + [None] * (costs - len(values))
+
+        return tuple(row), (dictionary['id'], json.dumps(dictionary['features']))
 
+    def _individual(self, row):
+        """ Creates the individual from the row of sql_individuals_select. """
+        parameters = len(self.problem.parameters)
+        start = len(self.individual_columns)
+
+        costs = [value for value in row[start + parameters:-1] if value is not None]
+        costs_signed = list(array.array('d', row[5])) if row[5] is not None else []
+        dictionary = {'id': row[0], 'population_id': row[1], 'algorithm_id': row[2], 'state': row[3],
+                      'costs_signed': costs_signed, 'parents': json.loads(row[6]), 'children': json.loads(row[7]),
+                      'custom': json.loads(row[8]),
+                      'vector': list(row[start:start + parameters]), 'costs': costs,
+                      'features': json.loads(row[-1]) if row[-1] is not None else {}}
+
+        return Individual.from_dict(dictionary)
+
+    def _read_structure(self, c):
         c.execute(self.sql_main_select)
         rows = c.fetchall()
 
@@ -142,37 +492,766 @@ class SqliteDataStore(DummyDataStore):
             cost = json.loads(row[1])
             self.problem.costs.append(cost)
 
-        # individuals
+    def read_from_datastore(self):
+        conn = self.conn()
+        c = conn.cursor()
+
+        self._read_structure(c)
+
+        # individuals (not read in lazy mode, they are queried on demand)
         self.problem.individuals.clear()
-        c.execute(self.sql_individuals_select)
-        rows = c.fetchall()
-        for row in rows:
-            individual = Individual.from_dict(json.loads(row[1]))
-            self.problem.individuals.append(individual)
+        if not self.lazy:
+            c.execute(self.sql_individuals_select())
+            for row in c.fetchall():
+                individual = self._individual(row)
+                self._mark_synced(individual)
+                self.problem.individuals.append(individual)
+
+    def _where(self, population_id=None, algorithm_id=None, state=None, costs=None, after_id=None):
+        """
+        Builds the condition of the filtered queries.
+
+        :param population_id: id (or list of ids) of the populations
+        :param algorithm_id: id of the algorithm
+        :param state: Individual.State or its string
+        :param costs: dictionary {cost name or index: (lower, upper)}, None means the open interval
+        :param after_id: only the individuals with greater id (paging)
+        :return: condition, values
+        """
+        conditions = []
+        values = []
+        if population_id is not None:
+            if isinstance(population_id, (list, tuple, range)):
+                conditions.append("individuals.population_id IN ({})".format(",".join("?" * len(population_id))))
+                values += list(population_id)
+            else:
+                conditions.append("individuals.population_id = ?")
+                values.append(population_id)
+        if algorithm_id is not None:
+            conditions.append("individuals.algorithm_id = ?")
+            values.append(algorithm_id)
+        if state is not None:
+            conditions.append("individuals.state = ?")
+            values.append(state if isinstance(state, str) else Individual.to_string(state))
+        if costs is not None:
+            names = [cost["name"] for cost in self.problem.costs]
+            for key, (lower, upper) in costs.items():
+                column = "individuals.cost_{}".format(names.index(key) if isinstance(key, str) else key)
+                if lower is not None:
+                    conditions.append("{} >= ?".format(column))
+                    values.append(lower)
+                if upper is not None:
+                    conditions.append("{} <= ?".format(column))
+                    values.append(upper)
+        if after_id is not None:
+            conditions.append("individuals.id > ?")
+            values.append(after_id)
+
+        return ("WHERE " + " AND ".join(conditions)) if conditions else "", values
+
+    @staticmethod
+    def _limit(limit=None, offset=0):
+        if limit is None:
+            return " LIMIT -1 OFFSET {:d}".format(offset) if offset else ""
+        return " LIMIT {:d} OFFSET {:d}".format(limit, offset)
+
+    def population_ids(self):
+        """ :return: sorted list of the population ids """
+        c = self.conn().cursor()
+        c.execute("SELECT DISTINCT population_id FROM individuals ORDER BY population_id;")
+        return [row[0] for row in c.fetchall()]
+
+    def count(self, **filters):
+        """
+        :param filters: population_id, algorithm_id, state, costs (see read_individuals)
+        :return: number of the individuals
+        """
+        where, values = self._where(**filters)
+        c = self.conn().cursor()
+        c.execute("SELECT COUNT(*) FROM individuals {};".format(where), values)
+        return c.fetchone()[0]
+
+    def read_individuals(self, population_id=None, limit=None, offset=0, **filters):
+        """
+        Reads the individuals from the database (the individuals of the problem are not changed).
+
+        :param population_id: reads only the individuals of the given population (or list of populations)
+        :param limit: maximum number of individuals (page size)
+        :param offset: number of skipped individuals
+        :param filters: algorithm_id, state (Individual.State), costs ({cost name or index: (lower, upper)})
+        :return: list of individuals ordered by id
+        """
+        where, values = self._where(population_id=population_id, **filters)
+        c = self.conn().cursor()
+        c.execute(self.sql_individuals_select(where) + self._limit(limit, offset), values)
+
+        return [self._individual(row) for row in c.fetchall()]
+
+    def iterate(self, page_size=1000, **filters):
+        """
+        Iterates over the individuals, the database is read in pages.
+
+        :param page_size: number of individuals read at once
+        :param filters: population_id, algorithm_id, state, costs (see read_individuals)
+        """
+        last_id = None
+        while True:
+            # keyset paging - the pages are found by the primary key, not skipped row by row
+            where, values = self._where(after_id=last_id, **filters)
+            c = self.conn().cursor()
+            c.execute(self.sql_individuals_select(where) + self._limit(page_size), values)
+            rows = c.fetchall()
+            for row in rows:
+                yield self._individual(row)
+
+            if len(rows) < page_size:
+                break
+            last_id = rows[-1][0]
+
+    def _read_columns(self, columns, limit=None, offset=0, **filters):
+        where, values = self._where(**filters)
+        c = self.conn().cursor()
+        c.execute("SELECT {} FROM individuals {} ORDER BY individuals.id{};".format(
+            ", ".join(columns), where, self._limit(limit, offset)), values)
+
+        return np.array(c.fetchall(), dtype=float).reshape(-1, len(columns))
+
+    def read_vectors(self, population_id=None, limit=None, offset=0, **filters):
+        """
+        :param population_id: reads only the individuals of the given population (or list of populations)
+        :param limit: maximum number of individuals (page size)
+        :param offset: number of skipped individuals
+        :param filters: algorithm_id, state, costs (see read_individuals)
+        :return: array (n, parameters)
+        """
+        return self._read_columns(self.parameter_columns(), population_id=population_id, limit=limit, offset=offset,
+                                  **filters)
+
+    def read_costs(self, population_id=None, limit=None, offset=0, **filters):
+        """
+        :param population_id: reads only the individuals of the given population (or list of populations)
+        :param limit: maximum number of individuals (page size)
+        :param offset: number of skipped individuals
+        :param filters: algorithm_id, state, costs (see read_individuals)
+        :return: array (n, costs), the costs of the individuals which have not been evaluated are NaN
+        """
+        return self._read_columns(self.cost_columns(), population_id=population_id, limit=limit, offset=offset,
+                                  **filters)
 
     def destroy(self):
+        if self._writer is not None:
+            self._finalizer()
         if self._conn is not None:
             self._conn.close()
 
-    def sync_individual(self, individual):
-        if self.mode == "write" or self.mode == "rewrite":
-            conn = self.conn()
-            c = conn.cursor()
+    def flush(self):
+        """ Waits until the queued individuals are written (write-behind mode). """
+        if self._writer is not None:
+            try:
+                self._writer.flush()
+            except SqliteWriterError as e:
+                # the lost individuals are written again by the next sync
+                for individual_id in e.ids:
+                    self._synced.pop(individual_id, None)
+                raise
+
+    def _add_cost_columns(self):
+        """
+        Adds the columns of the costs appended to the problem after the table has been created (e.g. the sensitivity
+        of GradientEvaluator and WorstCaseEvaluator).
+        """
+        if self._cost_columns == len(self.problem.costs):
+            return
+
+        if self._writer is not None:
+            # the queued rows are written by the previous statement
+            self._writer.flush()
+
+        conn = sqlite3.connect(self.database_name, timeout=30.0)
+        c = conn.cursor()
+        c.execute(self.sql_individuals_columns_select)
+        columns = [row[1] for row in c.fetchall()]
+        for column in self.cost_columns():
+            if column not in columns:
+                c.execute("ALTER TABLE individuals ADD COLUMN {} REAL;".format(column))
+        for sql in self.sql_individuals_indexes():
+            c.execute(sql)
+        for cost in self.problem.costs:
+            c.execute(self.sql_costs_insert_missing, [cost["name"], json.dumps(cost)])
+        conn.commit()
+        conn.close()
 
-            # data
+        if self._writer is not None:
+            self._writer.sql = [self.sql_individuals_upsert(), self.sql_features_upsert]
+        self._cost_columns = len(self.problem.costs)
+
+    def _write(self, individuals):
+        """ Writes the individuals, the locked database is tried again max_attempts times. """
+        conn = self.conn()
+        rows = [self._rows(individual.to_dict()) for individual in individuals]
+        for attempt in range(self.max_attempts):
             try:
-                c.execute(self.sql_individuals_upsert, [individual.id, json.dumps(individual.to_dict())])
+                c = conn.cursor()
+                c.executemany(self.sql_individuals_upsert(), [row[0] for row in rows])
+                c.executemany(self.sql_features_upsert, [row[1] for row in rows])
                 conn.commit()
+                return
             except sqlite3.OperationalError as e:
-                # try again
-                self.sync_individual(individual)
+                conn.rollback()
+                message = str(e).lower()
+                if ("locked" not in message and "busy" not in message) or attempt == self.max_attempts - 1:
+                    # the individuals are written again by the next sync
+                    for individual in individuals:
+                        self._synced.pop(individual.id, None)
+                    raise
+                time.sleep(0.01 * (attempt + 1))
+
+    def sync_individual(self, individual):
+        if self.mode not in ["write", "rewrite"]:
+            return
+
+        changed = self._changed([individual])
+        if not changed:
+            return
+
+        self._add_cost_columns()
+        if self._writer is not None:
+            # the individual is serialized immediately, later changes are written by the next sync
+            self._writer.put(self._rows(individual.to_dict()))
+        else:
+            self._write(changed)
+
+    def sync_all(self):
+        if self.mode not in ["write", "rewrite"]:
+            return
+
+        changed = self._changed(self.problem.individuals)
+        self._add_cost_columns()
+        if self._writer is not None:
+            for individual in changed:
+                self._writer.put(self._rows(individual.to_dict()))
+            self.flush()
+        else:
+            self._write(changed)
+
+
+class BinaryLogWriter:
+    """
+    Buffered writer of the BinaryDataStore, the records and the feature lines are appended to the files in chunks.
+    """
+
+    def __init__(self, records_name, features_name, dtype, buffer_size=1000):
+        self.records_name = records_name
+        self.features_name = features_name
+        self.dtype = dtype
+        self.buffer_size = buffer_size
+
+        self._records = []
+        self._features = []
+        self._lock = threading.Lock()
+
+    def append(self, record, features):
+        with self._lock:
+            self._records.append(record)
+            self._features.append(features)
+            if len(self._records) >= self.buffer_size:
+                self._write()
+
+    def flush(self):
+        with self._lock:
+            self._write()
+
+    def _write(self):
+        if not self._records:
+            return
+
+        # the feature lines are written first, the record is valid only if its features are complete, the record
+        # refers to its line by the offset and length (the lines without record are never read)
+        lines = [line.encode() for line in self._features]
+        records = np.array(self._records, dtype=self.dtype)
+        records['features_length'] = [len(line) for line in lines]
+        with open(self.features_name, "ab") as file:
+            offset = file.seek(0, os.SEEK_END)
+            records['features_offset'] = offset + np.concatenate(([0], np.cumsum(records['features_length'] + 1)[:-1]))
+            file.write(b"".join(line + b"\n" for line in lines))
+        with open(self.records_name, "ab") as file:
+            file.write(records.tobytes())
+
+        self._records = []
+        self._features = []
+
+
+class BinaryDataStore(DummyDataStore):
+    """
+    Append-only binary run log.
+
+    Every sync appends one fixed width record (id, population_id, hash of the algorithm_id, state, feasibility,
+    offset and length of the feature line, vector, costs and signed costs as float64) to the file database_name.
+    The variable length data (algorithm_id, features, custom data, parents and children) are appended as one JSON
+    line to the sidecar database_name.features, the problem is described by the header database_name.json. The
+    records are read back by numpy.memmap without any parsing, the last record of every id is valid (an individual
+    synced more times is stored more times).
+
+    Usage: problem.data_store = BinaryDataStore(problem, "run.bin"),
+           view = ProblemViewDataStore("run.bin", lazy=True)
+    """
+
+    version = 1
+
+    _states = list(Individual.State)
+
+    def __init__(self, problem, database_name, mode="write", buffer_size=1000, lazy=False):
+        """
+        :param problem: Problem
+        :param database_name: file name of the records
+        :param mode: 'write' (append to an existing log), 'rewrite' or 'read'
+        :param buffer_size: number of the records written at once
+        :param lazy: the individuals are not loaded into problem.individuals, they are queried by read_individuals,
+                     iterate, read_vectors and read_costs
+        """
+        super().__init__()
+        self.problem = problem
+        self.database_name = database_name
+        self.header_name = database_name + ".json"
+        self.features_name = database_name + ".features"
+        self.mode = mode
+        self.lazy = lazy
+        self._writer = None
+
+        if not self.database_name:
+            raise RuntimeError("BinaryDataStore: database name is empty.")
+
+        if self.mode == "write" and os.path.exists(self.header_name):
+            self.read_from_datastore()
+        elif self.mode in ["write", "rewrite"]:
+            self._create_structure()
+        elif self.mode == "read":
+            self.read_from_datastore()
+
+        if self.mode in ["write", "rewrite"]:
+            self._writer = BinaryLogWriter(self.database_name, self.features_name, self.dtype(), buffer_size)
+            # the buffer is written also when the data store is not destroyed explicitly (at exit)
+            self._finalizer = weakref.finalize(self, self._writer.flush)
+
+    @staticmethod
+    def is_binary(database_name):
+        """ :return: True if the database_name is the BinaryDataStore log """
+        return os.path.exists(database_name + ".json")
+
+    def dtype(self):
+        """ :return: numpy dtype of the record """
+        parameters = len(self.problem.parameters)
+        costs = len(self.problem.costs)
+        return np.dtype([('id', '<i8'), ('population_id', '<i8'), ('algorithm', '<i8'), ('state', '<i8'),
+                         ('feasible', '<f8'), ('features_offset', '<i8'), ('features_length', '<i8'),
+                         ('vector', '<f8', (parameters,)), ('costs', '<f8', (costs,)),
+                         ('costs_signed', '<f8', (costs + 1,))])
+
+    @staticmethod
+    def algorithm_key(algorithm_id):
+        """ :return: 64-bit hash of the algorithm_id (stored in the record) """
+        return int.from_bytes(hashlib.blake2b(str(algorithm_id).encode(), digest_size=8).digest(), "little",
+                              signed=True)
+
+    def _create_structure(self):
+        for name in [self.database_name, self.features_name]:
+            if os.path.exists(name):
+                os.remove(name)
+            open(name, "wb").close()
+
+        header = {'version': self.version,
+                  'name': self.problem.name,
+                  'description': self.problem.description,
+                  'parameters': self.problem.parameters,
+                  'costs': self.problem.costs,
+                  'fingerprint': problem_fingerprint(self.problem.parameters, self.problem.costs,
+                                                     self.problem.options['model_version'])}
+        with open(self.header_name, "w") as file:
+            json.dump(header, file)
+
+    def read_from_datastore(self):
+        with open(self.header_name) as file:
+            header = json.load(file)
+
+        if header['version'] > self.version:
+            raise RuntimeError("BinaryDataStore: unsupported version {} of '{}'.".format(header['version'],
+                                                                                        self.database_name))
+
+        self.problem.name = header['name']
+        self.problem.description = header['description']
+        self.problem.parameters.clear()
+        self.problem.parameters.extend(header['parameters'])
+        self.problem.costs.clear()
+        self.problem.costs.extend(header['costs'])
+
+        self.problem.individuals.clear()
+        if not self.lazy:
+            for individual in self.read_individuals():
+                self._mark_synced(individual)
+                self.problem.individuals.append(individual)
+
+    def destroy(self):
+        if self._writer is not None:
+            self._finalizer()
+
+    def flush(self):
+        if self._writer is not None:
+            self._writer.flush()
+
+    def _record(self, individual):
+        parameters = len(self.problem.parameters)
+        costs = len(self.problem.costs)
+        vector = list(individual.vector)[:parameters]
+        values = list(individual.costs)[:costs]
+        costs_signed = list(individual.costs_signed)[:costs + 1]
+
+        state = self._states.index(individual.state) if isinstance(individual.state, Individual.State) else -1
+        # the offset and length of the feature line are set by the writer
+        record = (individual.id, individual.population_id, self.algorithm_key(individual.algorithm_id), state,
+                  individual.features.get('feasible', np.nan), 0, 0, vector + [np.nan] * (parameters - len(vector)),
+                  values + [np.nan] * (costs - len(values)),
+                  costs_signed + [np.nan] * (costs + 1 - len(costs_signed)))
+
+        dictionary = individual.to_dict()
+        features = json.dumps([dictionary['algorithm_id'], dictionary['features'], dictionary['custom'],
+                               dictionary['parents'], dictionary['children'], len(values), len(costs_signed)])
+
+        return record, features
+
+    def sync_individual(self, individual):
+        if self._writer is not None:
+            for individual in self._changed([individual]):
+                self._writer.append(*self._record(individual))
 
     def sync_all(self):
-        if self.mode == "write" or self.mode == "rewrite":
-            conn = self.conn()
-            c = conn.cursor()
+        if self._writer is not None:
+            for individual in self._changed(self.problem.individuals):
+                self._writer.append(*self._record(individual))
+            self._writer.flush()
 
-            for individual in self.problem.individuals:
-                c.execute(self.sql_individuals_upsert, [individual.id, json.dumps(individual.to_dict())])
+    def records(self):
+        """
+        :return: memory mapped array of all records (the individuals synced more times are included more times)
+        """
+        self.flush()
 
+        dtype = self.dtype()
+        size = os.path.getsize(self.database_name) // dtype.itemsize if os.path.exists(self.database_name) else 0
+        if size == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self.database_name, dtype=dtype, mode='r', shape=(size,))
+
+    def _select(self, population_id=None, algorithm_id=None, state=None, costs=None):
+        """ :return: records (the last record of every id, ordered by id) and their positions in the log """
+        records = self.records()
+        ids = records['id']
+
+        # the last record of every id
+        unique, index = np.unique(ids[::-1], return_index=True)
+        index = len(ids) - 1 - index
+
+        mask = np.ones(len(index), dtype=bool)
+        if population_id is not None:
+            mask &= np.isin(records['population_id'][index], np.atleast_1d(population_id))
+        if algorithm_id is not None:
+            mask &= records['algorithm'][index] == self.algorithm_key(algorithm_id)
+        if state is not None:
+            mask &= records['state'][index] == self._states.index(state if isinstance(state, Individual.State)
+                                                                   else Individual.from_string(state))
+        if costs is not None:
+            names = [cost["name"] for cost in self.problem.costs]
+            values = records['costs'][index]
+            for key, (lower, upper) in costs.items():
+                column = values[:, names.index(key) if isinstance(key, str) else key]
+                if lower is not None:
+                    mask &= column >= lower
+                if upper is not None:
+                    mask &= column <= upper
+
+        index = index[mask]
+        return records[index], index
+
+    def population_ids(self):
+        """ :return: sorted list of the population ids """
+        return np.unique(self._select()[0]['population_id']).tolist()
+
+    def count(self, **filters):
+        """
+        :param filters: population_id, algorithm_id, state, costs (see read_individuals)
+        :return: number of the individuals
+        """
+        return len(self._select(**filters)[1])
+
+    def read_vectors(self, population_id=None, limit=None, offset=0, **filters):
+        """
+        :param population_id: reads only the individuals of the given population (or list of populations)
+        :param limit: maximum number of individuals (page size)
+        :param offset: number of skipped individuals
+        :param filters: algorithm_id, state, costs (see read_individuals)
+        :return: array (n, parameters)
+        """
+        records = self._select(population_id=population_id, **filters)[0]
+        return np.array(records['vector'][offset:None if limit is None else offset + limit])
+
+    def read_costs(self, population_id=None, limit=None, offset=0, **filters):
+        """
+        :param population_id: reads only the individuals of the given population (or list of populations)
+        :param limit: maximum number of individuals (page size)
+        :param offset: number of skipped individuals
+        :param filters: algorithm_id, state, costs (see read_individuals)
+        :return: array (n, costs), the costs of the individuals which have not been evaluated are NaN
+        """
+        records = self._select(population_id=population_id, **filters)[0]
+        return np.array(records['costs'][offset:None if limit is None else offset + limit])
+
+    def read_individuals(self, population_id=None, limit=None, offset=0, **filters):
+        """
+        Reads the individuals from the log (the individuals of the problem are not changed).
+
+        :param population_id: reads only the individuals of the given population (or list of populations)
+        :param limit: maximum number of individuals (page size)
+        :param offset: number of skipped individuals
+        :param filters: algorithm_id, state (Individual.State), costs ({cost name or index: (lower, upper)})
+        :return: list of individuals ordered by id
+        """
+        records = self._select(population_id=population_id, **filters)[0]
+        end = None if limit is None else offset + limit
+        return self._individuals(records[offset:end])
+
+    def iterate(self, page_size=1000, **filters):
+        """
+        Iterates over the individuals, the features are parsed in pages.
+
+        :param page_size: number of individuals read at once
+        :param filters: population_id, algorithm_id, state, costs (see read_individuals)
+        """
+        records = self._select(**filters)[0]
+        for start in range(0, len(records), page_size):
+            yield from self._individuals(records[start:start + page_size])
+
+    def _individuals(self, records):
+        lines = self._feature_lines(records)
+
+        individuals = []
+        for record, line in zip(records.tolist(), lines):
+            algorithm_id, features, custom, parents, children, costs, costs_signed = json.loads(line)
+            individual = Individual()
+            individual.id = record[0]
+            individual.population_id = record[1]
+            individual.state = self._states[record[3]] if record[3] >= 0 else None
+            individual.vector = list(record[7])
+            individual.costs = list(record[8])[:costs]
+            individual.costs_signed = list(record[9])[:costs_signed]
+            individual.algorithm_id = algorithm_id
+            individual.features = features
+            individual.custom = custom
+            individual.parents = parents
+            individual.children = children
+            individuals.append(individual)
+
+        return individuals
+
+    def _feature_lines(self, records):
+        """ :return: the feature lines of the records (read directly by their offsets) """
+        if len(records) == 0:
+            return []
+
+        lines = []
+        with open(self.features_name, "rb") as file:
+            for offset, length in zip(records['features_offset'].tolist(), records['features_length'].tolist()):
+                file.seek(offset)
+                lines.append(file.read(length))
+
+        return lines
+
+
+class SqliteEvaluationCache:
+    """
+    Persistent evaluation cache shared between runs of the same problem.
+
+    The cache indexes the evaluated individuals of previous SqliteDataStore databases and dedicated cache files
+    by the quantised vector. Only the records with the same problem fingerprint (parameters, costs and the option
+    'model_version') are used. The cache files are created if they do not exist, the new evaluations are stored into
+    the first cache file (not into the data store databases) unless the cache is read only. The databases are opened
+    in read-only mode, so one cache can be shared by concurrent runs. The predictions of the surrogate model (feature
+    'predicted') are neither indexed nor stored. The connections to the cache files are kept open until close.
+
+    Usage: problem.evaluation_cache = SqliteEvaluationCache(problem, ["run_1.sqlite", "cache.sqlite"])
+    """
+
+    sql_cache_table = "CREATE TABLE IF NOT EXISTS cache (fingerprint text NOT NULL, key text NOT NULL, " \
+                      "record json NOT NULL, PRIMARY KEY (fingerprint, key));"
+    sql_cache_insert = "INSERT OR IGNORE INTO cache(fingerprint, key, record) VALUES (?,?,?)"
+    sql_cache_select = "SELECT key, record FROM cache WHERE fingerprint=?;"
+    sql_cache_select_key = "SELECT record FROM cache WHERE fingerprint=? AND key=?;"
+    sql_tables_select = "SELECT name FROM sqlite_master WHERE type='table';"
+    sql_individuals_columns_select = "PRAGMA table_info(individuals);"
+
+    def __init__(self, problem, database_names, read_only=False, timeout=30.0):
+        self.problem = problem
+        self.database_names = [database_names] if isinstance(database_names, str) else list(database_names)
+        self.read_only = read_only
+        self.timeout = timeout
+        self.fingerprint = problem_fingerprint(problem.parameters, problem.costs, problem.options['model_version'])
+
+        self.records = {}
+        self.hits = 0
+        self.misses = 0
+
+        self._cache_names = []  # dedicated cache files, searched for the records stored by concurrent runs
+        self._write_name = None
+        self._connections = {}
+        self._lock = threading.Lock()
+        self._finalizer = weakref.finalize(self, self._close, self._connections)
+
+        for database_name in self.database_names:
+            self._index(database_name)
+
+    def __len__(self):
+        return len(self.records)
+
+    @staticmethod
+    def _close(connections):
+        for conn in connections.values():
+            conn.close()
+        connections.clear()
+
+    def close(self):
+        """ Closes the connections to the cache files. """
+        with self._lock:
+            self._close(self._connections)
+
+    def _connection(self, database_name, read_only):
+        """ Returns the open connection (created on the first use), the caller holds the lock. """
+        conn = self._connections.get((database_name, read_only))
+        if conn is None:
+            conn = self._connect(database_name, read_only, check_same_thread=False)
+            self._connections[(database_name, read_only)] = conn
+        return conn
+
+    def key(self, vector):
+        return json.dumps(VectorAndNumbers.quantize(vector, self.problem.parameters))
+
+    def _connect(self, database_name, read_only, check_same_thread=True):
+        if read_only:
+            return sqlite3.connect(pathlib.Path(database_name).absolute().as_uri() + "?mode=ro", uri=True,
+                                   timeout=self.timeout, check_same_thread=check_same_thread)
+        return sqlite3.connect(database_name, timeout=self.timeout, check_same_thread=check_same_thread)
+
+    def _index(self, database_name):
+        if not os.path.exists(database_name) or os.stat(database_name).st_size == 0:
+            if self.read_only:
+                raise RuntimeError("SqliteEvaluationCache: database '{}' does not exist.".format(database_name))
+            conn = self._connect(database_name, read_only=False)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute(self.sql_cache_table)
             conn.commit()
+            conn.close()
+
+        conn = self._connect(database_name, read_only=True)
+        c = conn.cursor()
+        c.execute(self.sql_tables_select)
+        tables = [row[0] for row in c.fetchall()]
+
+        if "cache" in tables:
+            c.execute(self.sql_cache_select, [self.fingerprint])
+            for key, record in c.fetchall():
+                self.records[key] = json.loads(record)
+
+            self._cache_names.append(database_name)
+            if self._write_name is None and not self.read_only:
+                self._write_name = database_name
+        elif "individuals" in tables:
+            if self._datastore_fingerprint(c, tables) == self.fingerprint:
+                self._index_datastore(c)
+        else:
+            conn.close()
+            raise RuntimeError("SqliteEvaluationCache: '{}' is not a cache or data store.".format(database_name))
+
+        conn.close()
+
+    def _index_datastore(self, c):
+        evaluated = Individual.to_string(Individual.State.EVALUATED)
+        if SqliteDataStore._version(c) == 1:
+            c.execute(SqliteDataStore.sql_individuals_json_select)
+            for row in c.fetchall():
+                individual = json.loads(row[1])
+                if individual['state'] == evaluated and not individual['features'].get('predicted'):
+                    self.records[self.key(individual['vector'])] = {
+                        "costs": individual['costs'],
+                        "feasible": individual['features'].get('feasible', 0.0),
+                        "custom": individual['custom']}
+        else:
+            parameters = ["parameter_{}".format(i) for i in range(len(self.problem.parameters))]
+            costs = ["cost_{}".format(i) for i in range(len(self.problem.costs))]
+            c.execute("SELECT features.features, individuals.feasible, individuals.custom, {} FROM individuals "
+                      "LEFT JOIN features ON individuals.id = features.id WHERE individuals.state = ?;".format(
+                          ", ".join("individuals." + column for column in parameters + costs)), [evaluated])
+            for row in c.fetchall():
+                # the predictions of the surrogate model are not the results of the problem
+                if row[0] is not None and json.loads(row[0]).get('predicted'):
+                    continue
+                self.records[self.key(row[3:3 + len(parameters)])] = {
+                    "costs": list(row[3 + len(parameters):]),
+                    "feasible": row[1] if row[1] is not None else 0.0,
+                    "custom": json.loads(row[2])}
+
+    @staticmethod
+    def _datastore_fingerprint(c, tables):
+        if "fingerprint" in tables:
+            c.execute("SELECT fingerprint FROM fingerprint;")
+            row = c.fetchone()
+            if row is not None:
+                return row[0]
+
+        # databases without fingerprint - model version is unknown
+        c.execute(SqliteDataStore.sql_parameters_select)
+        parameters = [json.loads(row[1]) for row in c.fetchall()]
+        c.execute(SqliteDataStore.sql_costs_select)
+        costs = [json.loads(row[1]) for row in c.fetchall()]
+        return problem_fingerprint(parameters, costs)
+
+    def get(self, individual):
+        """
+        Finds the record of already evaluated vector.
+
+        :param individual: Individual
+        :return: dictionary with costs, feasibility and custom data or None
+        """
+        key = self.key(individual.vector)
+        record = self.records.get(key)
+
+        with self._lock:
+            if record is None:
+                # the record can be stored by a concurrent run
+                for database_name in self._cache_names:
+                    row = self._connection(database_name, read_only=True).execute(
+                        self.sql_cache_select_key, [self.fingerprint, key]).fetchone()
+                    if row is not None:
+                        record = json.loads(row[0])
+                        self.records[key] = record
+                        break
+
+            if record is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return record
+
+    def put(self, individual):
+        """ Stores the costs, feasibility and custom data of the evaluated individual (not of the prediction). """
+        if individual.features.get("predicted"):
+            return
+
+        key = self.key(individual.vector)
+        record = {"costs": list(individual.costs),
+                  "feasible": individual.features["feasible"],
+                  "custom": individual.custom}
+        self.records[key] = record
+
+        if self._write_name is not None:
+            with self._lock:
+                conn = self._connection(self._write_name, read_only=False)
+                conn.execute(self.sql_cache_insert, [self.fingerprint, key, json.dumps(record)])
+                conn.commit()
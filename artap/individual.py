@@ -23,6 +23,12 @@ class Individual(metaclass=ABCMeta):
         if state == cls.State.FAILED:
             return 'failed'
 
+    @classmethod
+    def from_string(cls, state):
+        for value in cls.State:
+            if cls.to_string(value) == state:
+                return value
+
     counter: int = 0
 
     def __init__(self, vector: list = [], features=dict()):
@@ -50,6 +56,17 @@ class Individual(metaclass=ABCMeta):
 
         self.custom = {}
 
+    def checksum(self):
+        """
+        Hash of the persisted data (vector, costs, state, features, custom data, ...). The data stores compare it with
+        the checksum of the last sync and skip the unchanged individuals. It is computed from the data, so the lists
+        and dictionaries changed in place are detected as well.
+        """
+        return hash((tuple(self.vector), tuple(self.costs), tuple(self.costs_signed), self.state, self.population_id,
+                     self.algorithm_id, tuple(getattr(parent, 'id', parent) for parent in self.parents),
+                     tuple(getattr(child, 'id', child) for child in self.children), repr(self.features),
+                     repr(self.custom)))
+
     def calc_signed_costs(self, p_signs):
         """
         This function calculates the signed costs for every vector and insert the feasibility after
@@ -170,7 +187,7 @@ class Individual(metaclass=ABCMeta):
 
         individual.vector = dictionary['vector']
         individual.costs = dictionary['costs']
-        individual.state = dictionary['state']
+        individual.state = Individual.from_string(dictionary['state'])
         individual.costs_signed = dictionary['costs_signed']
         individual.population_id = dictionary['population_id']
         individual.algorithm_id = dictionary['algorithm_id']
@@ -1,18 +1,264 @@
 import time
 import sys
+import threading
 from abc import ABCMeta
+from collections import OrderedDict
+from copy import deepcopy
 from .individual import Individual
+from .problem import Problem
+from .surrogate import SurrogateModelEval, SurrogateModelPredict
 from .utils import VectorAndNumbers
 from math import inf
+import numpy as np
+
+
+class EvaluationCache:
+    """
+    Memoizes the evaluated design points, the key is the vector quantised to the precision of the parameters.
+    The least recently used records are evicted when the cache is full, size 0 disables the cache.
+    """
+
+    def __init__(self, parameters, size=10000):
+        self.parameters = parameters
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+
+        self._records = OrderedDict()
+        self._lock = threading.Lock()  # jobs are evaluated in threads by the parallel evaluator
+
+    def __len__(self):
+        return len(self._records)
+
+    def __repr__(self):
+        return "EvaluationCache: {} records, {} hits, {} misses".format(len(self._records), self.hits, self.misses)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def key(self, vector):
+        return VectorAndNumbers.quantize(vector, self.parameters)
+
+    def get(self, individual):
+        """
+        Finds the record of already evaluated vector.
+
+        :param individual: Individual
+        :return: dictionary with costs, feasibility and custom data or None
+        """
+        if self.size <= 0:
+            return None
+
+        key = self.key(individual.vector)
+        with self._lock:
+            record = self._records.get(key)
+            if record is None:
+                self.misses += 1
+            else:
+                self._records.move_to_end(key)
+                self.hits += 1
+
+        return record
+
+    def put(self, individual):
+        """ Stores the costs, feasibility and custom data of the evaluated individual. """
+        if self.size <= 0:
+            return
+
+        key = self.key(individual.vector)
+        record = {"costs": list(individual.costs),
+                  "feasible": individual.features["feasible"],
+                  "custom": deepcopy(individual.custom)}
+
+        with self._lock:
+            self._records[key] = record
+            self._records.move_to_end(key)
+            while len(self._records) > self.size:
+                self._records.popitem(last=False)
 
 
 class Job(metaclass=ABCMeta):
     def __init__(self, problem):
         self.problem = problem
+        self.cache = EvaluationCache(problem.parameters, problem.options['cache_size'])
+
+    def lookup(self, individual):
+        """
+        Fills the individual from the in-run cache or from the persistent cache of the problem.
+
+        :param individual: Individual
+        :return: True if the individual has been found (and is evaluated)
+        """
+        record = self.cache.get(individual)
+        persistent = record is None and self.problem.evaluation_cache is not None
+        if persistent:
+            record = self.problem.evaluation_cache.get(individual)
+        if record is None:
+            return False
+
+        individual.costs = list(record["costs"])
+        individual.features["feasible"] = record["feasible"]
+        individual.custom = deepcopy(record["custom"])
+        if "predicted" in individual.features:
+            del individual.features["predicted"]
+        individual.calc_signed_costs(self.problem.signs)
+
+        individual.state = individual.State.EVALUATED
+        individual.features["finish_time"] = time.time()
+        if persistent:
+            self.cache.put(individual)
+        self.problem.data_store.sync_individual(individual)
+        return True
+
+    def pending(self, individuals):
+        """
+        Looks up the individuals in the caches (once per evaluation).
+
+        :param individuals: list of individuals
+        :return: list of the individuals which have to be evaluated
+        """
+        return [individual for individual in individuals
+                if individual.state != individual.State.EVALUATED and not self.lookup(individual)]
+
+    def store(self, individual):
+        """
+        Stores the evaluated individual to the in-run and persistent caches, the predictions of the surrogate model
+        (feature 'predicted') are not the results of the problem and they are not stored.
+        """
+        if individual.features.get("predicted"):
+            return
+
+        self.cache.put(individual)
+        if self.problem.evaluation_cache is not None:
+            self.problem.evaluation_cache.put(individual)
 
-    def evaluate(self, individual):
+    def evaluate_batch(self, individuals):
+        """
+        Evaluates the individuals at once by Problem.evaluate_batch (and Problem.evaluate_constraints_batch).
+        The individuals are not looked up in the caches, see pending.
+
+        :param individuals: list of individuals
+        :return: False if the problem does not provide the batch evaluation, the individuals have to be evaluated
+                 one by one
+        """
+        if isinstance(self.problem.surrogate, SurrogateModelPredict) and self.problem.surrogate.batch_prediction:
+            return self.predict_batch(individuals)
+
+        # the surrogate models predict the individuals one by one
+        if type(self.problem).evaluate_batch is Problem.evaluate_batch or \
+                not isinstance(self.problem.surrogate, SurrogateModelEval):
+            return False
+
+        individuals = [individual for individual in individuals if individual.state != individual.State.EVALUATED]
+        if not individuals:
+            return True
+
+        start_time = time.time()
+        matrix = np.array([individual.vector for individual in individuals], dtype=float)
+        try:
+            costs = self.problem.evaluate_batch(matrix)
+        except (TimeoutError, RuntimeError) as e:
+            # the failures are handled by the evaluation of the individuals
+            self.problem.logger.warning("Job: batch error: {}".format(e), exc_info=True)
+            return False
+        if costs is None:
+            return False
+
+        constraints = self.problem.evaluate_constraints_batch(matrix)
+        if constraints is not None:
+            feasible = np.sum(np.abs(np.reshape(constraints, (len(individuals), -1))), axis=1).tolist()
+        else:
+            feasible = [None] * len(individuals)
+
+        self.problem.surrogate.eval_counter += len(individuals)
+        finish_time = time.time()
+        for individual, values, distance in zip(individuals, np.reshape(costs, (len(individuals), -1)).tolist(),
+                                                feasible):
+            individual.features["start_time"] = start_time
+            if distance is None:
+                constraints = self.problem.evaluate_constraints(individual)
+                if constraints:
+                    individual.features["feasible"] = sum(map(abs, constraints))
+            else:
+                individual.features["feasible"] = distance
+
+            individual.costs = values
+            individual.calc_signed_costs(self.problem.signs)
+
+            # set evaluated
+            individual.state = individual.State.EVALUATED
+            self.store(individual)
+            # info
+            individual.features["finish_time"] = finish_time
+            # write to store
+            self.problem.data_store.sync_individual(individual)
+
+        return True
+
+    def predict_batch(self, individuals):
+        """
+        Predicts the individuals by the surrogate model at once (SurrogateModelPredict.evaluate_batch), the rejected
+        predictions are left to the evaluation.
+
+        :param individuals: list of individuals
+        :return: True if all individuals have been predicted, False if the rest has to be evaluated
+        """
+        individuals = [individual for individual in individuals if individual.state != individual.State.EVALUATED]
+        if not individuals:
+            return True
+
+        start_time = time.time()
+        predictions = self.problem.surrogate.evaluate_batch(individuals)
+        finish_time = time.time()
+        for individual, values in zip(individuals, predictions):
+            if values is not None:
+                self._set_prediction(individual, values, start_time, finish_time)
+
+        return all(values is not None for values in predictions)
+
+    def predict(self, individual):
+        """
+        Predicts the individual by the surrogate model (SurrogateModelPredict.predict_individual), it is used by the
+        evaluators which evaluate the problem outside of the surrogate model.
+
+        :param individual: Individual
+        :return: True if the individual has been predicted, False if it has to be evaluated
+        """
+        if self.problem.surrogate.batch_prediction:
+            return self.predict_batch([individual])
+
+        start_time = time.time()
+        values = self.problem.surrogate.predict_individual(individual)
+        if values is None:
+            return False
+
+        self._set_prediction(individual, values, start_time, time.time())
+        return True
+
+    def _set_prediction(self, individual, values, start_time, finish_time):
+        individual.features["start_time"] = start_time
+        constraints = self.problem.evaluate_constraints(individual)
+        if constraints:
+            individual.features["feasible"] = sum(map(abs, constraints))
+
+        individual.costs = values
+        individual.features["predicted"] = True
+        individual.calc_signed_costs(self.problem.signs)
+
+        # set evaluated (the predictions are not cached, they are not the results of the problem)
+        individual.state = individual.State.EVALUATED
+        # info
+        individual.features["finish_time"] = finish_time
+        # write to store
+        self.problem.data_store.sync_individual(individual)
+
+    def evaluate(self, individual, lookup=True):
         # try to calculate the goal function of the individual in case of failure the individual is
         # replaced by another one, at maximum 5 tries
+        # lookup=False - the individual has already been looked up in the caches (pending)
 
         # Skips calculation of already calculated individual
         if individual.state == individual.State.EVALUATED:
@@ -23,6 +269,10 @@ class Job(metaclass=ABCMeta):
             individual.features["start_time"] = time.time()
             t_s = time.time()
 
+            # the same design point has already been evaluated (in this or in a previous run)
+            if (lookup or i > 0) and self.lookup(individual):
+                return
+
             # set in progress
             individual.state = individual.State.IN_PROGRESS
 
@@ -41,6 +291,7 @@ class Job(metaclass=ABCMeta):
 
                 # set evaluated
                 individual.state = individual.State.EVALUATED
+                self.store(individual)
                 # info
                 individual.features["finish_time"] = time.time()
                 # write to store
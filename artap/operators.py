@@ -6,13 +6,20 @@ from math import exp
 import numpy as np
 import functools
 import itertools
+import bisect
 
 from .individual import Individual
+from .population import Population
 from .utils import VectorAndNumbers
 from .doe import build_box_behnken, build_lhs, build_full_fact, build_plackett_burman, build_gsd, build_halton
 from .job import Job
+from .datastore import DummyDataStore
+from .surrogate import SurrogateModelEval, SurrogateModelPredict
 from joblib import Parallel, delayed
-from copy import deepcopy
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, Future
+from copy import copy, deepcopy
+import pickle
+import weakref
 
 EPSILON = sys.float_info.epsilon
 
@@ -39,6 +46,7 @@ class Evaluator(Operator):
         self.algorithm = algorithm
         self.individuals = []
         self.job = Job(self.algorithm.problem)
+        self.workers = None  # background threads of the asynchronous evaluation
 
     def add(self, individual):
         self.individuals.append(individual)
@@ -47,22 +55,49 @@ class Evaluator(Operator):
         self.evaluate(self.individuals)
 
     def evaluate(self, individuals):
+        # the caches are consulted once, only the missed individuals are evaluated
+        individuals = self.job.pending(individuals)
+        if not individuals:
+            return
+
+        # vectorized models evaluate the whole population at once
+        if self.job.evaluate_batch(individuals):
+            return
+
         if self.algorithm.options["max_processes"] > 1:
-            self.evaluate_parallel(individuals)
+            self.evaluate_parallel(individuals, lookup=False)
         else:
-            self.evaluate_serial(individuals)
+            self.evaluate_serial(individuals, lookup=False)
 
-    def evaluate_serial(self, individuals: list):
+    def evaluate_serial(self, individuals: list, lookup=True):
         for individual in individuals:
             if individual.state == individual.State.EMPTY:
-                individual.costs.append(self.job.evaluate(individual))
+                self.job.evaluate(individual, lookup)
 
-    def evaluate_parallel(self, individuals: list):
+    def evaluate_parallel(self, individuals: list, lookup=True):
         # simple parallel loop
         Parallel(n_jobs=self.algorithm.options["max_processes"], verbose=1, require='sharedmem')(
-            delayed(self.job.evaluate)(individual)
+            delayed(self.job.evaluate)(individual, lookup)
             for individual in individuals)
 
+    def submit(self, individual):
+        """
+        Starts the evaluation of the individual in the background (asynchronous mode), at most max_processes
+        individuals are evaluated at once.
+
+        :param individual: Individual
+        :return: Future, its result is the evaluated individual
+        """
+        if self.workers is None:
+            self.workers = ThreadPoolExecutor(max_workers=self.algorithm.options["max_processes"])
+            weakref.finalize(self, self.workers.shutdown, wait=False)
+
+        return self.workers.submit(self._evaluate_individual, individual)
+
+    def _evaluate_individual(self, individual):
+        self.job.evaluate(individual)
+        return individual
+
     def evaluate_scalar(self, vector):
         individual = Individual(list(vector))
 
@@ -79,6 +114,8 @@ class GradientEvaluator(Evaluator):
         super().__init__(algorithm)
         self.delta = 1e-4
         self.to_evaluate = []
+        # the finite differences are finer than the precision of the parameters, they cannot be served by the cache
+        self.job.cache.size = 0
         self.algorithm.problem.costs.append({'name': 'sensitivity', 'criteria': 'minimize'})
         self.n = len(algorithm.problem.costs)
 
@@ -124,7 +161,7 @@ class GradientEvaluator(Evaluator):
                 sensitivity = 1000
             else:
                 sensitivity = sum(abs(gradient))
-            if len(individual.costs) > self.n:
+            if len(individual.costs) >= self.n:
                 individual.costs[-1] = sensitivity
                 individual.costs_signed[-2] = sensitivity
             else:
@@ -166,10 +203,10 @@ class WorstCaseEvaluator(Evaluator):
 
     def evaluate_scalar(self, x):
         parent_individual = Individual(x)
-        parent_individual.costs.append(self.job.evaluate(parent_individual))
+        self.job.evaluate(parent_individual)
         self.add(parent_individual)
         for individual in self.to_evaluate:
-            individual.costs.append(self.job.evaluate(individual))
+            self.job.evaluate(individual)
         self.algorithm.problem.individuals.append(parent_individual)
         self.to_evaluate = []
         return parent_individual.costs[0]
@@ -190,6 +227,137 @@ class WorstCaseEvaluator(Evaluator):
                 individual.costs_signed.insert(-1, sum(sensitivity))
 
 
+# problem evaluated by the worker process of the ProcessEvaluator
+_worker_job = None
+
+
+def _init_worker(data):
+    global _worker_job
+    _worker_job = Job(pickle.loads(data))
+    # the records are cached by the parent process
+    _worker_job.cache.size = 0
+
+
+def _evaluate_vector(vector):
+    individual = Individual(vector)
+    failed = len(_worker_job.problem.failed)
+    _worker_job.evaluate(individual)
+
+    return {'vector': list(individual.vector),
+            'costs': list(individual.costs),
+            'custom': individual.custom,
+            'features': {key: individual.features[key] for key in ('feasible', 'start_time', 'finish_time', 'predicted')
+                         if key in individual.features},
+            'failed': [list(individual.vector) for individual in _worker_job.problem.failed[failed:]]}
+
+
+class ProcessEvaluator(Evaluator):
+    """
+    Evaluates the individuals in persistent worker processes (max_processes > 1), the Python models are not
+    serialized by the GIL.
+
+    Every worker holds its own unpickled copy of the problem, created once with the first evaluation. Only the
+    vectors are sent to the workers, the costs, feasibility, timing features, custom data and failed vectors are
+    returned to the parent process, which keeps the caches and writes to the data store. The problem (including its
+    surrogate model) has to be picklable, the model changes made by the workers are not propagated back.
+
+    The predictive surrogate model (SurrogateModelPredict) stays in the parent process: the individuals are predicted
+    there, the workers evaluate the rejected ones by the problem and the model is trained on their results.
+    """
+
+    def __init__(self, algorithm):
+        super().__init__(algorithm)
+        self.pool = None
+
+    def _problem_data(self):
+        problem = self.algorithm.problem
+
+        worker_problem = copy(problem)
+        worker_problem.individuals = []
+        worker_problem.failed = []
+        worker_problem.data_store = DummyDataStore()
+        worker_problem.evaluation_cache = None
+        if self._predictive():
+            worker_problem.surrogate = SurrogateModelEval(worker_problem)
+        else:
+            worker_problem.surrogate = copy(problem.surrogate)
+            worker_problem.surrogate.problem = worker_problem
+
+        return pickle.dumps(worker_problem)
+
+    def evaluate_parallel(self, individuals: list, lookup=True):
+        if lookup:
+            individuals = self.job.pending(individuals)
+        individuals = [individual for individual in individuals if individual.state != individual.State.EVALUATED]
+        # the batch predictions have been made by Evaluator.evaluate
+        if self._predictive() and not self.algorithm.problem.surrogate.batch_prediction:
+            individuals = [individual for individual in individuals if not self.job.predict(individual)]
+        if not individuals:
+            return
+
+        self._start()
+        chunksize = max(1, len(individuals) // (4 * self.algorithm.options["max_processes"]))
+        results = self.pool.map(_evaluate_vector, [list(individual.vector) for individual in individuals],
+                                chunksize=chunksize)
+
+        for individual, result in zip(individuals, results):
+            self._apply(individual, result)
+
+    def submit(self, individual):
+        future = Future()
+        if individual.state == individual.State.EVALUATED or self.job.lookup(individual) or \
+                (self._predictive() and self.job.predict(individual)):
+            future.set_result(individual)
+            return future
+
+        def done(worker_future):
+            try:
+                self._apply(individual, worker_future.result())
+                future.set_result(individual)
+            except BaseException as e:
+                future.set_exception(e)
+
+        self._start()
+        self.pool.submit(_evaluate_vector, list(individual.vector)).add_done_callback(done)
+        return future
+
+    def _predictive(self):
+        return isinstance(self.algorithm.problem.surrogate, SurrogateModelPredict)
+
+    def _start(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.algorithm.options["max_processes"],
+                                            initializer=_init_worker, initargs=(self._problem_data(),))
+            weakref.finalize(self, self.pool.shutdown, wait=False)
+
+    def _apply(self, individual, result):
+        problem = self.algorithm.problem
+        for vector in result['failed']:
+            failed_individual = Individual(vector)
+            failed_individual.state = individual.State.FAILED
+            problem.failed.append(failed_individual)
+
+        individual.vector = result['vector']
+        individual.costs = result['costs']
+        individual.custom = result['custom']
+        individual.features.update(result['features'])
+        if 'predicted' not in result['features'] and 'predicted' in individual.features:
+            del individual.features['predicted']
+        individual.calc_signed_costs(problem.signs)
+        if self._predictive():
+            problem.surrogate.learn(individual.vector, individual.costs)
+
+        individual.state = individual.State.EVALUATED
+        self.job.store(individual)
+        problem.data_store.sync_individual(individual)
+
+    def close(self):
+        """ Stops the worker processes. """
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+
 class Generator(Operator):
     def __init__(self, parameters=None, features=dict()):
         super().__init__()
@@ -463,6 +631,72 @@ class GSDGenerator(Generator):
         return individuals
 
 
+class DuplicateFilter(Operator):
+    """
+    Hash set of the design points generated during the run. The vectors are rounded to the precision of the
+    parameters, so the children identical to an already generated (and evaluated) individual can be rejected before
+    they reach the evaluator.
+    """
+
+    def __init__(self, parameters):
+        super().__init__()
+        self.parameters = parameters
+        self.keys = set()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clear(self):
+        self.keys = set()
+
+    def contains(self, vector):
+        return VectorAndNumbers.quantize(vector, self.parameters) in self.keys
+
+    def add(self, vector):
+        """
+        Registers the vector.
+
+        :return: True if the vector is new, False if it is a duplicate
+        """
+        key = VectorAndNumbers.quantize(vector, self.parameters)
+        if key in self.keys:
+            return False
+
+        self.keys.add(key)
+        return True
+
+    def extend(self, vectors):
+        if len(vectors) > 0:
+            self.keys.update(VectorAndNumbers.quantize(vectors, self.parameters))
+
+    def discard(self, vectors):
+        """ Unregisters the vectors (e.g. the candidates which have not been evaluated). """
+        if len(vectors) > 0:
+            self.keys.difference_update(VectorAndNumbers.quantize(vectors, self.parameters))
+
+    def new(self, vectors, size=None):
+        """
+        Selects (and registers) at most size rows which have not been generated yet (duplicates inside the matrix
+        are removed too).
+
+        :param vectors: array (n, parameters)
+        :param size: maximal number of the selected rows
+        :return: list of indices of the selected rows
+        """
+        selected = []
+        if size is not None and size <= 0:
+            return selected
+
+        for i, key in enumerate(VectorAndNumbers.quantize(vectors, self.parameters)):
+            if key not in self.keys:
+                self.keys.add(key)
+                selected.append(i)
+                if size is not None and len(selected) == size:
+                    break
+
+        return selected
+
+
 class Mutator(Operator):
     def __init__(self, parameters, probability):
         super().__init__()
@@ -524,6 +758,36 @@ class PmMutator(Mutator):
 
         return Individual(vector, parent.features)
 
+    def mutate_batch(self, vectors, current_iteration=0):
+        """
+        Polynomial mutation of the whole matrix of vectors at once.
+
+        :param vectors: array (n, parameters)
+        :return: array (n, parameters) of mutated vectors
+        """
+        x = np.array(vectors, dtype=float)
+        lb = np.array([parameter['bounds'][0] for parameter in self.parameters], dtype=float)
+        ub = np.array([parameter['bounds'][1] for parameter in self.parameters], dtype=float)
+
+        mask = np.random.random_sample(x.shape) < self.probability
+        rnd = np.random.random_sample(x.shape)
+
+        dx = ub - lb
+        delta1 = np.clip((x - lb) / dx, 0.0, 1.0)
+        delta2 = np.clip((ub - x) / dx, 0.0, 1.0)
+        mut_pow = 1.0 / (self.distribution_index + 1.0)
+
+        lower = rnd < 0.5
+        xy = np.where(lower, 1.0 - delta1, 1.0 - delta2)
+        with np.errstate(invalid='ignore'):
+            val = np.where(lower,
+                           2.0 * rnd + (1.0 - 2.0 * rnd) * xy ** (self.distribution_index + 1.0),
+                           2.0 * (1.0 - rnd) + 2.0 * (rnd - 0.5) * xy ** (self.distribution_index + 1.0))
+            deltaq = np.where(lower, val ** mut_pow - 1.0, 1.0 - val ** mut_pow)
+
+        mutated = np.clip(x + deltaq * dx, lb, ub)
+        return np.where(mask, mutated, x)
+
     def pm_mutation(self, x, lb, ub):
         """
         Polynomial mutation for float and integer parameters.
@@ -1140,85 +1404,275 @@ class Selector(Operator):
         return None
 
     def fast_nondominated_sorting(self, population):
-        pareto_front = [[]]
-        front_number = 1
-
-        # reset elements
-        for p in population:
-            p.features['domination_counter'] = 0
-            p.features['front_number'] = None
-            p.features['dominate'] = []
-
-        for i, p in enumerate(population):
-            for j in range(i + 1, len(population)):
-                q = population[j]
-                dom = self.comparator.compare(p.costs_signed, q.costs_signed)
+        """
+        Non-dominated sorting of the population, the front numbers (starting from 1) are stored into the
+        'front_number' feature and the crowding distance is computed on every front.
+
+        The Pareto dominance (with the feasibility column) is evaluated on the whole signed cost array at once,
+        other comparators are evaluated pairwise.
+
+        :param population: list of individuals or Population
+        """
+        if not isinstance(population, Population):
+            population = Population(population)
+
+        if len(population) == 0:
+            return
+
+        costs_signed = population.costs_signed
+        if isinstance(self.comparator, ParetoDominance):
+            front_number = nondominated_sorting(costs_signed)
+        else:
+            front_number = nondominated_fronts(dominance_matrix(costs_signed, self.comparator))
+
+        population.front_number = front_number
+        population.crowding_distance = crowding_distances(costs_signed[:, :-1], front_number)
+
+        return
+
+
+def dominance_matrix(costs_signed, comparator=None):
+    """
+    Builds the dominance relation of the population as a boolean matrix, matrix[i, j] is True if the i-th
+    individual dominates the j-th one.
+
+    Without comparator the Pareto dominance with constraints is used (see ParetoDominance): the last column of the
+    signed costs is the feasibility, the solution with a smaller constraint violation dominates, with the same
+    violation the Pareto dominance of the objectives is used.
+
+    :param costs_signed: array (n, costs + 1)
+    :param comparator: Dominance, evaluated pairwise if it is given
+    :return: boolean array (n, n)
+    """
+    costs_signed = np.asarray(costs_signed, dtype=float)
+    n = costs_signed.shape[0]
+
+    if comparator is not None:
+        matrix = np.zeros((n, n), dtype=bool)
+        rows = costs_signed.tolist()
+        for i in range(n):
+            for j in range(i + 1, n):
+                dom = comparator.compare(rows[i], rows[j])
                 if dom == 1:
-                    p.features['dominate'].append(q.id)
-                    q.features['domination_counter'] += 1
+                    matrix[i, j] = True
                 elif dom == 2:
-                    p.features['domination_counter'] += 1
-                    q.features['dominate'].append(p.id)
-
-            # selects the pareto values
-            if p.features['domination_counter'] == 0:
-                p.features['front_number'] = front_number
-                pareto_front[front_number - 1].append(p)
-
-        while len(pareto_front[front_number - 1]) > 0:
-            front_number += 1
-            pareto_front.append([])
-            for p in pareto_front[front_number - 2]:
-                for individual_id in p.features['dominate']:
-                    q = self.individual(population, individual_id)
-                    q.features['domination_counter'] -= 1
-                    if q.features['domination_counter'] == 0 and q.features['front_number'] is None:
-                        q.features['front_number'] = front_number
-                        pareto_front[front_number - 1].append(q)
-
-        if len(pareto_front[front_number - 1]) == 0:
-            pareto_front.pop()
-        for sub_front in pareto_front:
-            crowding_distance(sub_front)
+                    matrix[j, i] = True
+        return matrix
 
-        return
+    if costs_signed.shape[1] == 0:
+        return np.zeros((n, n), dtype=bool)
+
+    violation = np.abs(costs_signed[:, -1])
+    costs = costs_signed[:, :-1]
+
+    less_equal = np.ones((n, n), dtype=bool)
+    less = np.zeros((n, n), dtype=bool)
+    for k in range(costs.shape[1]):
+        column = costs[:, k]
+        less_equal &= column[:, None] <= column[None, :]
+        less |= column[:, None] < column[None, :]
+
+    same_violation = violation[:, None] == violation[None, :]
+    return (violation[:, None] < violation[None, :]) | (same_violation & less_equal & less)
+
+
+def pareto_compare(p, q):
+    """
+    Row-wise ParetoDominance.compare of two signed cost arrays.
+
+    :param p: array (n, costs + 1)
+    :param q: array (n, costs + 1)
+    :return: array (n, ) -- 1 if p dominates, 2 if q dominates, 0 otherwise
+    """
+    p = np.asarray(p, dtype=float)
+    q = np.asarray(q, dtype=float)
+
+    p_violation = np.abs(p[:, -1])
+    q_violation = np.abs(q[:, -1])
+    same_violation = p_violation == q_violation
+
+    p_dominates = (p_violation < q_violation) | (same_violation & np.all(p[:, :-1] <= q[:, :-1], axis=1) &
+                                                 np.any(p[:, :-1] < q[:, :-1], axis=1))
+    q_dominates = (q_violation < p_violation) | (same_violation & np.all(q[:, :-1] <= p[:, :-1], axis=1) &
+                                                 np.any(q[:, :-1] < p[:, :-1], axis=1))
+
+    return np.where(p_dominates, 1, np.where(q_dominates, 2, 0))
+
+
+def nondominated_fronts(matrix):
+    """
+    Peels the fronts from the dominance matrix.
+
+    :param matrix: boolean array (n, n), matrix[i, j] is True if i dominates j
+    :return: array of front numbers (starting from 1)
+    """
+    n = matrix.shape[0]
+    front_number = np.zeros(n, dtype=int)
+    counter = matrix.sum(axis=0)
+
+    number = 1
+    front = np.flatnonzero(counter == 0)
+    while front.size > 0:
+        front_number[front] = number
+        counter[front] = -1
+        counter -= matrix[front].sum(axis=0)
+        front = np.flatnonzero(counter == 0)
+        number += 1
+
+    return front_number
+
+
+def nondominated_sorting(costs_signed):
+    """
+    Non-dominated sorting with constraints (see ParetoDominance) of the signed cost array.
+
+    The individuals are split into groups with the same constraint violation (every group dominates all groups with
+    larger violation), the groups with 2 or 3 objectives are sorted by the O(N log N) sweep, the others by the
+    dominance matrix.
+
+    :param costs_signed: array (n, costs + 1), the last column is the feasibility
+    :return: array of front numbers (starting from 1)
+    """
+    costs_signed = np.asarray(costs_signed, dtype=float)
+    n = costs_signed.shape[0]
+
+    if n <= 1 or costs_signed.shape[1] == 0:
+        return np.ones(n, dtype=int)
+
+    costs = costs_signed[:, :-1]
+    if costs.shape[1] not in (2, 3) or np.isnan(costs_signed).any():
+        return nondominated_fronts(dominance_matrix(costs_signed))
+
+    front_number = np.zeros(n, dtype=int)
+    violation = np.abs(costs_signed[:, -1])
+    offset = 0
+    for value in np.unique(violation):
+        group = np.flatnonzero(violation == value)
+        front_number[group] = _nondominated_sweep(costs[group]) + offset
+        offset = front_number[group].max()
+
+    return front_number
+
+
+def _nondominated_sweep(costs):
+    """
+    Sweep-line non-dominated sorting for 2 and 3 objectives.
+
+    The unique points are processed in lexicographic order, so every earlier point which is not worse in the remaining
+    objectives dominates the current one. Every front keeps a staircase of its members in the second and third
+    objective (sorted by the second objective, the third one decreasing) and the front of the point is found by a
+    binary search over the fronts, so the total cost is O(N log N) comparisons.
+
+    :param costs: array (n, 2) or (n, 3)
+    :return: array of front numbers (starting from 1)
+    """
+    unique, inverse = np.unique(costs, axis=0, return_inverse=True)
+    unique_front = np.zeros(unique.shape[0], dtype=int)
+
+    if unique.shape[1] == 2:
+        # the minimum of the second objective of every front
+        minimum = []
+        for i, value in enumerate(unique[:, 1].tolist()):
+            k = bisect.bisect_right(minimum, value)
+            if k == len(minimum):
+                minimum.append(value)
+            else:
+                minimum[k] = value
+            unique_front[i] = k + 1
+    else:
+        # staircases of the fronts (second objective increasing, third objective decreasing)
+        keys = []
+        values = []
+
+        def dominated(k, y, z):
+            index = bisect.bisect_right(keys[k], y) - 1
+            return index >= 0 and values[k][index] <= z
+
+        for i, (y, z) in enumerate(unique[:, 1:].tolist()):
+            low, high = 0, len(keys)
+            while low < high:
+                middle = (low + high) // 2
+                if dominated(middle, y, z):
+                    low = middle + 1
+                else:
+                    high = middle
+
+            if low == len(keys):
+                keys.append([])
+                values.append([])
+
+            # remove members dominated by the new point in the second and third objective
+            start = bisect.bisect_left(keys[low], y)
+            stop = start
+            while stop < len(keys[low]) and values[low][stop] >= z:
+                stop += 1
+            keys[low][start:stop] = [y]
+            values[low][start:stop] = [z]
+
+            unique_front[i] = low + 1
+
+    return unique_front[inverse.reshape(-1)]
 
 
 def crowding_distance(front):
     """
     Crowding distance calculates the solution density on a front, a subset of the population.
-    :param front: list of individuals
+    :param front: list of individuals or Population
                   which is a subset of the total population
     :return:
     """
-    n = len(front)
+    population = front if isinstance(front, Population) else Population(front)
 
-    if n == 0:
-        return
-    elif n == 1:
-        front[0].features['crowding_distance'] = math.inf
-        return
-    elif n == 2:
-        front[0].features['crowding_distance'] = math.inf
-        front[1].features['crowding_distance'] = math.inf
+    if len(population) == 0:
         return
 
-    for i in range(len(front)):
-        front[i].features['crowding_distance'] = 0.0
+    costs = population.costs_signed[:, :-1]
+    population.crowding_distance = crowding_distances(costs)
+
+    # the front is left ordered by the last objective, the swarms rely on this order
+    if len(population) > 2:
+        front[:] = [population[i] for i in np.lexsort(costs.T).tolist()]
+    return
+
 
-    for dim in range(len(front[0].costs_signed[:-1])):
+def crowding_distances(costs, front_number=None):
+    """
+    Crowding distance of every row of the cost array, computed separately on every front.
 
-        front.sort(key=lambda x: x.costs_signed[dim])
-        # self.sort_by_coordinate(population, dim)
+    The rows are ranked by one argsort per objective, the boundary solutions get infinite distance, the others the
+    sum of normalized distances of their neighbours.
+
+    :param costs: array (n, costs) of signed costs (without the feasibility column)
+    :param front_number: array (n, ) of front numbers, the whole array is one front if it is not given
+    :return: array (n, )
+    """
+    costs = np.asarray(costs, dtype=float)
+    n = costs.shape[0]
+    distance = np.zeros(n)
 
-        front[0].features['crowding_distance'] = math.inf
-        front[-1].features['crowding_distance'] = math.inf
-        max_distance = front[-1].costs_signed[dim] - front[0].costs_signed[dim]
-        for i in range(1, n - 1):
-            distance = front[i + 1].costs_signed[dim] - front[i - 1].costs_signed[dim]
+    if front_number is None:
+        fronts = [np.arange(n)]
+    else:
+        front_number = np.asarray(front_number)
+        fronts = [np.flatnonzero(front_number == number) for number in np.unique(front_number)]
+
+    for front in fronts:
+        if front.size <= 2:
+            distance[front] = math.inf
+            continue
+
+        for dim in range(costs.shape[1]):
+            # the ties are ordered by the previous objectives
+            order = np.lexsort(costs[front, :dim + 1].T)
+            values = costs[front[order], dim]
+
+            distance[front[order[0]]] = math.inf
+            distance[front[order[-1]]] = math.inf
+            max_distance = values[-1] - values[0]
             if max_distance > 0.0:
-                front[i].features['crowding_distance'] += distance / max_distance
-    return
+                distance[front[order[1:-1]]] += (values[2:] - values[:-2]) / max_distance
+
+    return distance
 
 
 def nondominated_truncate(population, size):
@@ -1232,12 +1686,32 @@ def nondominated_truncate(population, size):
         The collection of solutions that have been non-domination sorted
     :size:
         The size of the truncated result
+    :return: Population
     """
+    if not isinstance(population, Population):
+        population = Population(population)
 
-    # calculating the crowding distance on the different fronts
-    population = list(set(population))
-    result = sorted(population, key=functools.cmp_to_key(nondominated_cmp))
-    return result[:size]
+    return population.take(nondominated_truncate_indices(population, size))
+
+
+def nondominated_truncate_indices(population, size):
+    """
+    Indices of the rows which survive the truncation: duplicates (the same vector and signed costs) are removed and
+    the rest is ranked by (front number, -crowding distance) with one lexsort.
+
+    :param population: Population which has been non-domination sorted
+    :param size: the size of the truncated result
+    :return: array of indices
+    """
+    if len(population) == 0:
+        return np.zeros(0, dtype=int)
+
+    rows = np.hstack([population.vectors, population.costs_signed])
+    _, keep = np.unique(rows, axis=0, return_index=True)
+    keep.sort()
+
+    order = np.lexsort((-population.crowding_distance[keep], population.front_number[keep]))
+    return keep[order[:size]]
 
 
 def nondominated_cmp(p, q):
@@ -1325,6 +1799,41 @@ class TournamentSelector(Selector):
 
         return selected
 
+    def select_indices(self, population, number):
+        """
+        Batch variant of the binary tournament selection over the columns of the population.
+
+        :param population: Population
+        :param number: number of tournaments
+        :return: array of indices of the selected individuals
+        """
+        n = len(population)
+        if n == 1:
+            return np.zeros(number, dtype=int)
+
+        # sampling two individuals without a replacement
+        first = np.random.randint(0, n, number)
+        second = np.random.randint(0, n - 1, number)
+        second[second >= first] += 1
+
+        front_number = population.front_number
+        costs_signed = population.costs_signed
+
+        if isinstance(self.dominance, ParetoDominance):
+            flag = pareto_compare(costs_signed[first], costs_signed[second])
+        else:
+            rows = costs_signed.tolist()
+            flag = np.array([self.dominance.compare(rows[i], rows[j]) for i, j in zip(first.tolist(),
+                                                                                      second.tolist())], dtype=int)
+
+        # random choice for the non-dominated pairs
+        flag = np.where(flag == 0, np.random.randint(1, 3, number), flag)
+        # smaller front number is preferred
+        flag = np.where(front_number[first] < front_number[second], 1, flag)
+        flag = np.where(front_number[second] < front_number[first], 2, flag)
+
+        return np.where(flag == 1, first, second)
+
 
 class FireflyStep(Operator):
     """
@@ -1503,3 +2012,54 @@ class SimulatedBinaryCrossover(Crossover):
                             x1[i], x2[i] = c1, c2
 
         return Individual(x1, p1.features), Individual(x2, p2.features)
+
+    def cross_batch(self, vectors, parents1, parents2):
+        """
+        Simulated binary crossover of the whole mating pool at once.
+
+        :param vectors: array (n, parameters) of the parent vectors
+        :param parents1: array of indices of the first parents
+        :param parents2: array of indices of the second parents
+        :return: array (2 * len(parents1), parameters), the first and the second offsprings of every pair
+        """
+        vectors = np.asarray(vectors, dtype=float)
+        x1 = vectors[parents1].copy()
+        x2 = vectors[parents2].copy()
+
+        n = x1.shape[0]
+        lb = np.array([parameter['bounds'][0] for parameter in self.parameters], dtype=float)
+        ub = np.array([parameter['bounds'][1] for parameter in self.parameters], dtype=float)
+
+        mask = (np.random.random_sample(n) <= self.probability)[:, None] \
+            & (np.random.random_sample(x1.shape) <= 0.5) & (np.abs(x2 - x1) > EPSILON)
+
+        y1 = np.minimum(x1, x2)
+        y2 = np.maximum(x1, x2)
+        dy = np.where(mask, y2 - y1, 1.0)
+        rand = np.random.random_sample(x1.shape)
+        exponent = 1.0 / (self.distribution_index + 1.0)
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            # calculates c1
+            beta = 1.0 + (2.0 * (y1 - lb) / dy)
+            alpha = 2.0 - beta ** -(self.distribution_index + 1.0)
+            betaq = np.where(rand <= (1.0 / alpha), (rand * alpha) ** exponent,
+                             (1.0 / (2.0 - rand * alpha)) ** exponent)
+            c1 = 0.5 * (y1 + y2 - betaq * dy)
+
+            # calculates c2
+            beta = 1.0 + (2.0 * (ub - y2) / dy)
+            alpha = 2.0 - beta ** -(self.distribution_index + 1.0)
+            betaq = np.where(rand <= (1.0 / alpha), (rand * alpha) ** exponent,
+                             (1.0 / (2.0 - rand * alpha)) ** exponent)
+            c2 = 0.5 * (y1 + y2 + betaq * dy)
+
+        # check the boundaries
+        c1 = np.clip(c1, lb, ub)
+        c2 = np.clip(c2, lb, ub)
+
+        swap = np.random.random_sample(x1.shape) <= 0.5
+        offsprings1 = np.where(mask, np.where(swap, c2, c1), x1)
+        offsprings2 = np.where(mask, np.where(swap, c1, c2), x2)
+
+        return np.vstack((offsprings1, offsprings2))
@@ -0,0 +1,140 @@
+"""
+population.py
+===========================================
+Columnar storage of a set of individuals
+"""
+
+from collections.abc import MutableSequence
+
+import numpy as np
+
+from .individual import Individual
+
+
+class Population(MutableSequence):
+    """
+    Collects a set of individuals and provides their numerical data as contiguous NumPy arrays.
+
+    Every row of the arrays belongs to one individual:
+
+    - vectors (n, parameters) -- design variables
+    - costs (n, costs) -- values of the goal functions
+    - costs_signed (n, costs + 1) -- signed costs, the last column is the feasibility
+    - feasible (n, ) -- the distance from the feasibility region
+    - front_number (n, ) -- number of the non-dominated front (0 if it is not sorted)
+    - crowding_distance (n, )
+
+    The individuals hold the data, they are handed to Problem.evaluate and to the data store. The arrays are gathered
+    from the individuals on every access, so they always reflect the current data (including the lists changed in
+    place); keep the array in a local variable if it is used repeatedly. Ragged rows (e.g. not evaluated individuals)
+    are padded with NaN. Population behaves like a list of individuals, so it can be passed to every operator which
+    expects a list.
+    """
+
+    def __init__(self, individuals=None):
+        if individuals is None:
+            self.individuals = []
+        elif isinstance(individuals, Population):
+            self.individuals = list(individuals.individuals)
+        else:
+            self.individuals = list(individuals)
+
+    def __len__(self):
+        return len(self.individuals)
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return self.individuals[key]
+
+        return self.take(np.arange(len(self.individuals))[key])
+
+    def __setitem__(self, key, value):
+        self.individuals[key] = value
+
+    def __delitem__(self, key):
+        del self.individuals[key]
+
+    def __iter__(self):
+        return iter(self.individuals)
+
+    def __repr__(self):
+        return "Population: {} individuals".format(len(self.individuals))
+
+    def insert(self, index, individual: Individual):
+        self.individuals.insert(index, individual)
+
+    def append(self, individual: Individual):
+        self.individuals.append(individual)
+
+    def extend(self, individuals):
+        self.individuals.extend(individuals)
+
+    def sort(self, key=None, reverse=False):
+        self.individuals.sort(key=key, reverse=reverse)
+
+    def take(self, indices):
+        """
+        Creates a new population from the selected rows.
+
+        :param indices: array of indices or boolean mask
+        :return: Population
+        """
+        indices = np.asarray(indices)
+        if indices.dtype == bool:
+            indices = np.flatnonzero(indices)
+
+        return Population([self.individuals[i] for i in indices.tolist()])
+
+    @staticmethod
+    def _matrix(rows):
+        n = len(rows)
+        lengths = set(map(len, rows))
+        if len(lengths) <= 1:
+            width = lengths.pop() if lengths else 0
+            return np.array(rows, dtype=float).reshape(n, width)
+
+        # ragged rows - pad with nan
+        matrix = np.full((n, max(lengths)), np.nan)
+        for i, row in enumerate(rows):
+            matrix[i, :len(row)] = row
+        return matrix
+
+    def _feature(self, key, default, dtype):
+        return np.fromiter((individual.features.get(key) or default for individual in self.individuals), dtype=dtype,
+                           count=len(self.individuals))
+
+    def _set_feature(self, key, values, dtype):
+        for individual, value in zip(self.individuals, np.asarray(values, dtype=dtype).tolist()):
+            individual.features[key] = value
+
+    @property
+    def vectors(self):
+        return self._matrix([individual.vector for individual in self.individuals])
+
+    @property
+    def costs(self):
+        return self._matrix([individual.costs for individual in self.individuals])
+
+    @property
+    def costs_signed(self):
+        return self._matrix([individual.costs_signed for individual in self.individuals])
+
+    @property
+    def feasible(self):
+        return self._feature('feasible', 0.0, float)
+
+    @property
+    def front_number(self):
+        return self._feature('front_number', 0, int)
+
+    @front_number.setter
+    def front_number(self, values):
+        self._set_feature('front_number', values, int)
+
+    @property
+    def crowding_distance(self):
+        return self._feature('crowding_distance', 0.0, float)
+
+    @crowding_distance.setter
+    def crowding_distance(self, values):
+        self._set_feature('crowding_distance', values, float)
@@ -2,7 +2,7 @@
  Module is dedicated to describe optimization problem.
 """
 
-from .datastore import SqliteDataStore, DummyDataStore
+from .datastore import SqliteDataStore, BinaryDataStore, DummyDataStore
 from .utils import ConfigDictionary
 from .surrogate import SurrogateModelEval
 
@@ -51,6 +51,10 @@ class Problem:
                              desc='Maximal time for calculation')
         self.options.declare(name='save_data_files', default=False,
                              desc='Saving data from computation')
+        self.options.declare(name='cache_size', default=0, lower=0,
+                             desc='Maximal number of evaluated vectors kept in the evaluation cache (0 disables cache)')
+        self.options.declare(name='model_version', default='',
+                             desc='Version of the model, it distinguishes the records of the persistent cache')
 
         # tmp name
         d = datetime.datetime.now()
@@ -103,6 +107,7 @@ class Problem:
         self.executor = None
         self.failed = []  # storage for failed individuals
         self.data_store = DummyDataStore()
+        self.evaluation_cache = None  # persistent cache of the evaluations (SqliteEvaluationCache)
         self.output_files = None
 
         self.working_dir = tempfile.gettempdir() + os.sep + "artap-{}".format(ts) + os.sep
@@ -215,6 +220,25 @@ class Problem:
         """ :param individual: Individual """
         pass
 
+    def evaluate_batch(self, matrix):
+        """
+        Evaluates the whole population at once (optional vectorized variant of evaluate).
+
+        :param matrix: array (n, parameters) of vectors
+        :return: array (n, costs) or None if the individuals have to be evaluated one by one
+        """
+        return None
+
+    def evaluate_constraints_batch(self, matrix):
+        """
+        Evaluates the constraints of the whole population at once (optional vectorized variant of
+        evaluate_constraints).
+
+        :param matrix: array (n, parameters) of vectors
+        :return: array (n, constraints) or None if the constraints have to be evaluated one by one
+        """
+        return None
+
     def __setattr__(self, key, value):
         # if self.__is_frozen and not hasattr(self, key):
         #     raise TypeError(" %r is a frozen class" % self)
@@ -236,9 +260,58 @@ class Problem:
 
 
 class ProblemViewDataStore(Problem):
-    def __init__(self, database_name):
+    """
+    Problem read from the SqliteDataStore database or from the BinaryDataStore log.
+
+    In the lazy mode only the name, parameters and costs are read when the database is opened, problem.individuals
+    stays empty. The individuals are read on demand by the populations, iterate and the paged and filtered queries
+    (individuals, vectors, costs), the filters are population_id, algorithm_id, state and the cost ranges:
+
+        problem = ProblemViewDataStore("data.sqlite", lazy=True)
+        costs = problem.costs_array(population_id=37, costs={'F': (None, 10.0)})
+    """
+
+    def __init__(self, database_name, lazy=False):
         super().__init__()
-        self.data_store = SqliteDataStore(self, database_name=database_name, mode="read")
+        if BinaryDataStore.is_binary(database_name):
+            self.data_store = BinaryDataStore(self, database_name=database_name, mode="read", lazy=lazy)
+        else:
+            self.data_store = SqliteDataStore(self, database_name=database_name, mode="read", lazy=lazy)
+
+    def populations(self):
+        if not self.data_store.lazy:
+            return super().populations()
+
+        return {population_id: self.population(population_id)
+                for population_id in self.data_store.population_ids()}
+
+    def population(self, population_id):
+        # indexed query, the individuals are not filtered in Python
+        return self.data_store.read_individuals(population_id)
+
+    def last_population(self):
+        population_ids = self.data_store.population_ids()
+        return self.population(population_ids[-1]) if population_ids else []
+
+    def count(self, **filters):
+        """ Number of the stored individuals which fulfill the filters. """
+        return self.data_store.count(**filters)
+
+    def iterate(self, page_size=1000, **filters):
+        """ Iterates over the stored individuals, they are read in pages of the given size. """
+        return self.data_store.iterate(page_size=page_size, **filters)
+
+    def individuals_page(self, page=0, page_size=1000, **filters):
+        """ :return: list of the individuals of the given page """
+        return self.data_store.read_individuals(limit=page_size, offset=page * page_size, **filters)
+
+    def vectors_array(self, limit=None, offset=0, **filters):
+        """ :return: array (n, parameters) of the stored individuals """
+        return self.data_store.read_vectors(limit=limit, offset=offset, **filters)
+
+    def costs_array(self, limit=None, offset=0, **filters):
+        """ :return: array (n, costs) of the stored individuals """
+        return self.data_store.read_costs(limit=limit, offset=offset, **filters)
 
     def set(self, **kwargs):
         pass
@@ -1,5 +1,7 @@
 import csv
+import numpy as np
 from .quality_indicator import gd, epsilon_add
+from .population import Population
 from matplotlib import pylab, rc, axis
 
 
@@ -84,33 +86,29 @@ class Results:
             return out
 
     def population(self, population_id=-1):
-        # Returns population with given index
+        """
+        Returns population with given index (the last population by default) as a columnar Population.
+        """
         #if population_id >= len(self.problem.populations):
         #    raise ValueError('Index of population exceeds the number of populations.')
         if population_id == -1:
             individuals = self.problem.last_population()
         else:
             individuals = self.problem.population(population_id)
-        return individuals
+        return Population(individuals)
 
     def goal_on_index(self, name=None, population_id=-1):
         """ Returns a list of lists. The first list contains indexes of individuals in population,
             the other lists contains values of the goal function(s).
         """
-        individuals = self.population(population_id)
-        n = range(len(individuals))
-
-        table = [list(n)]
+        population = self.population(population_id)
+        table = [list(range(len(population)))]
         if name is None:
+            costs = population.costs
             for j in range(len(self.problem.costs)):
-                table.append([])
-                for i in n:
-                    table[j + 1].append(individuals[i].costs[j])
+                table.append(self._column(costs, j))
         else:
-            table.append([])
-            index = self.goal_index(name)
-            for i in n:
-                table[1].append(individuals[i].costs[index])
+            table.append(self._column(population.costs, self.goal_index(name)))
 
         return table
 
@@ -123,19 +121,14 @@ class Results:
         :return:
         """
 
-        individuals = self.population(population_id)
-        n = range(len(individuals))
-        table = [list(n)]
+        population = self.population(population_id)
+        table = [list(range(len(population)))]
         if name is None:
+            vectors = population.vectors
             for j in range(len(self.problem.parameters)):
-                table.append([])
-                for i in n:
-                    table[j + 1].append(individuals[i].vector[j])
+                table.append(self._column(vectors, j))
         else:
-            table.append([])
-            index = self.parameter_index(name)
-            for i in n:
-                table[1].append(individuals[i].vector[index])
+            table.append(self._column(population.vectors, self.parameter_index(name)))
 
         return table
 
@@ -149,48 +142,30 @@ class Results:
         function
         """
 
-        if population_id == -1:
-            individuals = self.problem.last_population()
-        else:
-            individuals = self.population(population_id)
-
-        parameter_index = self.parameter_index(parameter_name)
-        goal_index = self.goal_index(goal_name)
-        parameter_values = []
-        goal_values = []
-
-        for individual in individuals:
-            parameter_values.append(individual.vector[parameter_index])
-            goal_values.append(individual.costs[goal_index])
+        population = self.population(population_id)
+        parameter_values = self._column(population.vectors, self.parameter_index(parameter_name))
+        goal_values = self._column(population.costs, self.goal_index(goal_name))
 
         if sorted is True:
-            goal_values = self.sort_list(parameter_values, goal_values)
-            parameter_values.sort()
+            parameter_values, goal_values = self.sort_lists(parameter_values, goal_values)
 
         return [parameter_values, goal_values]
 
     def parameter_on_goal(self, goal_name, parameter_name, population_id=-1, sorted=False):
         parameter_values, goal_values = self.goal_on_parameter(parameter_name, goal_name, population_id, sorted=False)
         if sorted:
-            parameter_values = self.sort_list(goal_values, parameter_values)
-            goal_values.sort()
+            goal_values, parameter_values = self.sort_lists(goal_values, parameter_values)
 
         return [goal_values, parameter_values]
 
     def parameter_on_parameter(self, parameter_1, parameter_2, population_id=-1, sorted=False):
-        individuals = self.population(population_id)
-        index_1 = self.parameter_index(parameter_1)
-        index_2 = self.parameter_index(parameter_2)
-        values_1 = []
-        values_2 = []
-
-        for individual in individuals:
-            values_1.append(individual.vector[index_1])
-            values_2.append(individual.vector[index_2])
+        population = self.population(population_id)
+        vectors = population.vectors
+        values_1 = self._column(vectors, self.parameter_index(parameter_1))
+        values_2 = self._column(vectors, self.parameter_index(parameter_2))
 
         if sorted:
-            values_2 = self.sort_list(values_1, values_2)
-            values_1.sort()
+            values_1, values_2 = self.sort_lists(values_1, values_2)
 
         return [values_1, values_2]
 
@@ -229,17 +204,15 @@ class Results:
         :return: pareto front
         """
         if population_id is not None:
-            individuals = self.population(population_id)
+            population = self.population(population_id)
         else:
-            individuals = self.problem.individuals
+            population = Population(self.problem.individuals)
 
-        n = self.goal_number()
+        costs = population.costs
+        mask = population.front_number == 1
         pareto_front = []
-        for i in range(n):
-            pareto_front.append([])
-            for individual in individuals:
-                if individual.features['front_number'] == 1:
-                    pareto_front[i].append(individual.costs[i])
+        for i in range(self.goal_number()):
+            pareto_front.append(self._column(costs, i, mask))
 
         return pareto_front
 
@@ -249,6 +222,20 @@ class Results:
         sorted_list = [x for _, x in sorted(zipped_pairs)]
         return sorted_list
 
+    @staticmethod
+    def sort_lists(list_1, list_2):
+        """ Sorts both lists by the values of the first one (ties are sorted by the second one). """
+        order = np.lexsort((list_2, list_1))
+        return np.asarray(list_1)[order].tolist(), np.asarray(list_2)[order].tolist()
+
+    @staticmethod
+    def _column(matrix, index, mask=None):
+        if matrix.shape[0] == 0:
+            return []
+        if mask is not None:
+            return matrix[mask, index].tolist()
+        return matrix[:, index].tolist()
+
     # TODO: Generalize
     # TODO: add test
     def find_optimum(self, name=None):
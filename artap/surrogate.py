@@ -1,8 +1,300 @@
 from abc import ABCMeta, abstractmethod
+from collections import deque
+from copy import copy, deepcopy
+import hashlib
 import math
+import os
+import pickle
+import threading
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from .datastore import problem_fingerprint
+
+
+class DataBuffer:
+    """
+    Pre-allocated growable NumPy buffer of the training data, the rows are appended in amortised constant time
+    (the capacity is doubled when it is exhausted). The appended rows are accessible as the matrix view.
+    """
+
+    def __init__(self, rows=None, capacity=64):
+        self.capacity = capacity
+        self._data = None
+        self._size = 0
+
+        if rows is not None:
+            self.extend(rows)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def array(self):
+        if self._data is None:
+            return np.empty((0, 0))
+        return self._data[:self._size]
+
+    def clear(self):
+        self._size = 0
+
+    def append(self, row):
+        self.extend([row])
+
+    def extend(self, rows):
+        rows = np.asarray(rows, dtype=float)
+        rows = rows.reshape(len(rows), -1)
+        if len(rows) == 0:
+            return
+
+        size = self._size + len(rows)
+        if self._data is None:
+            self._data = np.empty((max(self.capacity, size), rows.shape[1]))
+        elif size > len(self._data):
+            grown = np.empty((max(size, 2 * len(self._data)), self._data.shape[1]))
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+
+        self._data[self._size:size] = rows
+        self._size = size
+
+
+class NeighbourIndex:
+    """
+    Spatial index of the training vectors for the nearest-neighbour and radius queries.
+
+    The vectors are normalised by the bounds of the parameters (in percents), so the Chebyshev distance is the largest
+    relative difference of the parameters. The indexed vectors are kept in a KD-tree, the recently added ones in a small
+    buffer searched by brute force; the tree is rebuilt when the buffer outgrows the square root of the indexed vectors,
+    so adding is amortised and the queries remain logarithmic.
+    """
+
+    def __init__(self, parameters, leaf_size=16):
+        bounds = np.array([parameter['bounds'] for parameter in parameters], dtype=float).reshape(-1, 2)
+        self.lower = bounds[:, 0]
+        width = bounds[:, 1] - bounds[:, 0]
+        self.scale = 100.0 / np.where(width > 0.0, width, 1.0)
+        self.leaf_size = leaf_size
+
+        self._points = np.empty((16, len(parameters)))
+        self._size = 0
+        self._tree = None
+        self._indexed = 0
+
+    def __len__(self):
+        return self._size
+
+    def clear(self):
+        self._size = 0
+        self._tree = None
+        self._indexed = 0
+
+    def normalise(self, vectors):
+        return (np.asarray(vectors, dtype=float) - self.lower) * self.scale
+
+    def add(self, vector):
+        self.extend([vector])
+
+    def extend(self, vectors):
+        points = self.normalise(vectors).reshape(-1, len(self.lower))
+        size = self._size + len(points)
+        if size > len(self._points):
+            grown = np.empty((max(size, 2 * len(self._points)), len(self.lower)))
+            grown[:self._size] = self._points[:self._size]
+            self._points = grown
+
+        self._points[self._size:size] = points
+        self._size = size
+
+        if self._size - self._indexed > max(self.leaf_size, math.sqrt(self._size)):
+            self._tree = cKDTree(self._points[:self._size], leafsize=self.leaf_size)
+            self._indexed = self._size
+
+    def query(self, vectors):
+        """
+        Finds the nearest training vectors.
+
+        :param vectors: matrix of vectors (or one vector)
+        :return: arrays of the (normalised) Chebyshev distances and of the indices of the nearest training vectors,
+                 the distance is inf if the index is empty
+        """
+        points = self.normalise(vectors).reshape(-1, len(self.lower))
+        distances = np.full(len(points), np.inf)
+        indices = np.full(len(points), -1, dtype=int)
+
+        if self._tree is not None:
+            distances, indices = self._tree.query(points, p=np.inf)
+
+        if self._size > self._indexed:
+            buffer = self._points[self._indexed:self._size]
+            buffered = np.abs(points[:, None, :] - buffer[None, :, :]).max(axis=2)
+            nearest = buffered.argmin(axis=1)
+            buffered = buffered[np.arange(len(points)), nearest]
+            closer = buffered < distances
+            distances = np.where(closer, buffered, distances)
+            indices = np.where(closer, nearest + self._indexed, indices)
+
+        return distances, indices
+
+    def nearest(self, vector, k):
+        """
+        Finds the k nearest training vectors.
+
+        :param vector: vector
+        :param k: number of the neighbours
+        :return: array of the indices (sorted by the distance) and array of the (normalised) Chebyshev distances
+        """
+        point = self.normalise(vector).reshape(len(self.lower))
+        distances = np.empty(0)
+        indices = np.empty(0, dtype=int)
+
+        if self._tree is not None:
+            distances, indices = self._tree.query(point, k=min(k, self._indexed), p=np.inf)
+            distances, indices = np.atleast_1d(distances), np.atleast_1d(indices)
+
+        if self._size > self._indexed:
+            buffered = np.abs(self._points[self._indexed:self._size] - point).max(axis=1)
+            distances = np.concatenate((distances, buffered))
+            indices = np.concatenate((indices, np.arange(self._indexed, self._size)))
+
+        order = np.argsort(distances, kind='stable')[:k]
+        return indices[order], distances[order]
+
+    def query_radius(self, vectors, radius):
+        """
+        Finds the training vectors in the (normalised) Chebyshev distance.
+
+        :param vectors: matrix of vectors (or one vector)
+        :param radius: distance in percents of the bounds
+        :return: list of the arrays of indices (one array for every vector)
+        """
+        points = self.normalise(vectors).reshape(-1, len(self.lower))
+        if self._tree is not None:
+            found = [np.asarray(indices, dtype=int) for indices in
+                     self._tree.query_ball_point(points, radius, p=np.inf)]
+        else:
+            found = [np.empty(0, dtype=int) for _ in range(len(points))]
+
+        if self._size > self._indexed:
+            buffer = self._points[self._indexed:self._size]
+            inside = np.abs(points[:, None, :] - buffer[None, :, :]).max(axis=2) <= radius
+            found = [np.sort(np.concatenate((indices, np.flatnonzero(row) + self._indexed)))
+                     for indices, row in zip(found, inside)]
+
+        return found
+
+
+class RetrainPolicy:
+    """
+    Decides when the surrogate model is retrained. The model is retrained when
+
+    - the training data have grown by growth samples (or by growth_ratio of the data of the last training) or
+    - the mean validation error of the last window predictions exceeds error (drift of the model), the predictions
+      are validated by the real evaluations, the error is relative to the range of the training values
+    """
+
+    def __init__(self, growth=10, growth_ratio=None, error=None, window=10):
+        self.growth = growth
+        self.growth_ratio = growth_ratio
+        self.error = error
+
+        self.trained_size = 0
+        self.errors = deque(maxlen=window)
+
+    @property
+    def drift(self):
+        """ Mean validation error of the last predictions. """
+        return sum(self.errors) / len(self.errors) if self.errors else 0.0
+
+    def record(self, error):
+        self.errors.append(error)
+
+    def due(self, size):
+        """
+        :param size: number of the training samples
+        :return: True if the model has to be retrained
+        """
+        grown = size - self.trained_size
+        if grown <= 0:
+            return False
+        if self.growth and grown >= self.growth:
+            return True
+        if self.growth_ratio and grown >= self.growth_ratio * self.trained_size:
+            return True
+
+        return self.error is not None and len(self.errors) == self.errors.maxlen and self.drift > self.error
+
+    def reset(self, size):
+        """ Records the training on size samples. """
+        self.trained_size = size
+        self.errors.clear()
+
+
+class SurrogateTrainer:
+    """
+    Trains the surrogate model in the background thread. The copy of the model is fitted on the snapshot of the
+    training data while the current model keeps serving the predictions, then the fitted model is swapped in at once.
+    Only one training runs at a time, the requests arriving during the training are dropped (the retraining is
+    triggered again on the grown data). The failed trainings are logged by the problem logger, the current model is
+    kept and the exception is stored in last_error.
+    """
+
+    def __init__(self, surrogate):
+        self.surrogate = surrogate
+        self.trainings = 0
+        self.failures = 0
+        # exception of the last failed training
+        self.last_error = None
+        self._thread = None
+
+    def busy(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self):
+        """
+        Starts the training.
+
+        :return: False if the training is already running
+        """
+        if self.busy():
+            return False
+
+        x, y = self.surrogate.snapshot()
+        self._thread = threading.Thread(target=self._train, args=(x, y), daemon=True)
+        self._thread.start()
+        return True
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_thread'] = None
+        return state
+
+    def wait(self, timeout=None):
+        """ Waits for the running training. """
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _train(self, x, y):
+        try:
+            model = self.surrogate.shadow(x, y)
+            model.train()
+        except Exception as e:
+            self.failures += 1
+            self.last_error = e
+            self.surrogate.problem.logger.error("SurrogateTrainer: training failed: {}".format(e), exc_info=True)
+            return
+
+        self.surrogate.swap(model)
+        self.trainings += 1
 
 
 class SurrogateModel(metaclass=ABCMeta):
+    # attributes of the trained model, they are swapped in after the background training
+    _model_attributes = ('regressor', 'trained', 'has_epsilon', 'score', 'lml', 'lml_gradient', 'train_counter')
+    # attributes stored by save (the trained model, the adapted thresholds and the stats)
+    _saved_attributes = _model_attributes + ('distance_threshold', 'sigma_threshold', 'eval_counter', 'predict_counter')
+
     def __init__(self, problem):
         # self.name = name
         self.problem = problem
@@ -10,27 +302,175 @@ class SurrogateModel(metaclass=ABCMeta):
         # surrogate model
         self.regressor = None
 
-        self.x_data = []
-        self.y_data = []
+        # training data
+        self._x_data = DataBuffer()
+        self._y_data = DataBuffer()
+        self._index = None
+        self._lock = threading.RLock()
 
         self.trained = False
 
         # distance in percentage, taking into account bounds
         self.distance_threshold = 0.0
+        # maximal standard deviation of the accepted prediction
+        self.sigma_threshold = float("inf")
 
         # stats
         self.eval_counter = 0
         self.predict_counter = 0
         self.eval_stats = True
 
+    def __getstate__(self):
+        # the model is sent to the worker processes
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    @property
+    def x_data(self):
+        """ Matrix of the training vectors (view of the growable buffer). """
+        return self._x_data.array
+
+    @x_data.setter
+    def x_data(self, rows):
+        self._x_data = DataBuffer(rows)
+        self._index = None
+
+    @property
+    def y_data(self):
+        """ Matrix of the training values (view of the growable buffer). """
+        return self._y_data.array
+
+    @y_data.setter
+    def y_data(self, rows):
+        self._y_data = DataBuffer(rows)
+
     def add_data(self, x, y):
-        self.x_data.append(x)
-        self.y_data.append(y)
+        with self._lock:
+            self._x_data.append(x)
+            self._y_data.append(y)
+
+    def snapshot(self):
+        """ Copies the training data. """
+        with self._lock:
+            return self.x_data.copy(), self.y_data.copy()
+
+    def shadow(self, x, y):
+        """
+        Creates the copy of the model (with the copy of the regressor) for the training on the given data, the model
+        can be trained without affecting the current predictions.
+        """
+        model = copy(self)
+        model.regressor = deepcopy(self.regressor)
+        model._x_data = DataBuffer(x)
+        model._y_data = DataBuffer(y)
+        model._index = None
+        return model
+
+    def swap(self, model):
+        """ Replaces the trained model by the model trained in the background. """
+        with self._lock:
+            for name in self._model_attributes:
+                if hasattr(model, name):
+                    setattr(self, name, getattr(model, name))
 
     def read_from_data_store(self):
         for individual in self.problem.individuals:
             self.add_data(individual.vector, individual.costs)
 
+    def problem_fingerprint(self):
+        return problem_fingerprint(self.problem.parameters, self.problem.costs, self.problem.options['model_version'])
+
+    def fingerprint(self, x=None, y=None):
+        """
+        Identifies the training data (the problem, the training vectors and values in their order).
+
+        :param x: training vectors, x_data by default
+        :param y: training values, y_data by default
+        :return: hex digest
+        """
+        if x is None:
+            x, y = self.snapshot()
+
+        digest = hashlib.sha1(self.problem_fingerprint().encode())
+        for data in (x, y):
+            data = np.ascontiguousarray(data, dtype=float)
+            digest.update(str(data.shape).encode())
+            digest.update(data.tobytes())
+
+        return digest.hexdigest()
+
+    def default_file_name(self):
+        """ File of the model next to the database of the data store (data.sqlite -> data.surrogate). """
+        database_name = getattr(self.problem.data_store, 'database_name', None)
+        if not database_name:
+            raise ValueError("Surrogate model: the data store has no file, the file name of the model is required.")
+
+        return os.path.splitext(database_name)[0] + ".surrogate"
+
+    def save(self, file_name=None):
+        """
+        Saves the trained model, the training data and the stats. The file is replaced atomically.
+
+        :param file_name: file name of the model, the file next to the database of the data store by default
+        :return: file name
+        """
+        if file_name is None:
+            file_name = self.default_file_name()
+
+        with self._lock:
+            x, y = self.snapshot()
+            state = {"class": type(self).__name__,
+                     "problem": self.problem_fingerprint(),
+                     "fingerprint": self.fingerprint(x, y),
+                     "x_data": x,
+                     "y_data": y,
+                     "attributes": {name: getattr(self, name) for name in self._saved_attributes
+                                    if hasattr(self, name)}}
+
+            with open(file_name + ".tmp", "wb") as file:
+                pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(file_name + ".tmp", file_name)
+
+        return file_name
+
+    def load(self, file_name=None):
+        """
+        Restores the model saved by save, the model predicts without training. If the model has already got the
+        training data (e.g. read_from_data_store), they have to be the data of the saved model, the stale model is
+        refused. Otherwise the training data are restored from the file.
+
+        :param file_name: file name of the model, the file next to the database of the data store by default
+        """
+        if file_name is None:
+            file_name = self.default_file_name()
+
+        with open(file_name, "rb") as file:
+            state = pickle.load(file)
+
+        if state["class"] != type(self).__name__:
+            raise ValueError("Surrogate model '{}' is {}.".format(file_name, state["class"]))
+        if state["problem"] != self.problem_fingerprint():
+            raise ValueError("Surrogate model '{}' has been trained for another problem.".format(file_name))
+
+        with self._lock:
+            if len(self.x_data) > 0:
+                if self.fingerprint() != state["fingerprint"]:
+                    raise ValueError("Surrogate model '{}' is stale, it has been trained on different data."
+                                     .format(file_name))
+            elif self.fingerprint(state["x_data"], state["y_data"]) != state["fingerprint"]:
+                raise ValueError("Surrogate model '{}' is corrupted.".format(file_name))
+            else:
+                self.x_data = state["x_data"]
+                self.y_data = state["y_data"]
+
+            for name, value in state["attributes"].items():
+                setattr(self, name, value)
+
     def init_default_regressor(self):
         pass
 
@@ -42,32 +482,63 @@ class SurrogateModel(metaclass=ABCMeta):
     def predict(self, x, *args):
         pass
 
+    def predict_batch(self, matrix):
+        """
+        Predicts the whole population in one call (the regressors override it, the default predicts one by one).
+
+        :param matrix: array (n, parameters) of vectors
+        :return: array (n, costs) of means, array (n, costs) of standard deviations or None if they are not provided
+        """
+        means = [np.ravel(self.predict(vector)) for vector in np.asarray(matrix, dtype=float)]
+        return np.array(means, dtype=float).reshape(len(means), -1), None
+
     def compute(self, individual):
         return self.problem.evaluate(individual)
 
+    @property
+    def index(self):
+        """ Spatial index of x_data, the vectors added to x_data since the last access are indexed on demand. """
+        if self._index is None or len(self._index) > len(self.x_data):
+            self._index = NeighbourIndex(self.problem.parameters)
+        if len(self._index) < len(self.x_data):
+            self._index.extend(self.x_data[len(self._index):])
+
+        return self._index
+
     def compute_distance(self, x):
-        # n = len(limits)
-        dist = float("inf")
-        for vector in self.x_data:
-            dist_tmp = 0.0
-            for k in range(len(vector)):
-                d = 100.0 * abs(vector[k] - x[k]) / (self.problem.parameters[k]['bounds'][1] - self.problem.parameters[k]['bounds'][0])
-                # print("parameter {0:11.6e}, \tvector {1:11.6e}, \tdiff {2:11.6e}, \tlimits {3:11.6e} \tdistance: {4:4.1f} %".format(x[k], vector[k], abs(x[k] - vector[k]), self.problem.parameters[k]['bounds'][1] - self.problem.parameters[k]['bounds'][0], d))
-                # dist_tmp = dist_tmp + d
-                dist_tmp = max(dist_tmp, d)
-            # average value
-            # dist_tmp = dist_tmp / n
-
-            if dist_tmp < dist:
-                vec = vector
-            dist = min(dist, dist_tmp)
-
-            # for k in range(len(vector)):
-            #     d = 100.0 * math.fabs(vec[k] - x[k]) / (self.problem.parameters[k]['bounds'][1] - self.problem.parameters[k]['bounds'][0])
-            #     print("parameter {0:11.6e}, \tvector {1:11.6e}, \tdiff {2:11.6e}, \tlimits {3:11.6e} \tdistance: {4:4.1f} %".format(x[k], vector[k], abs(x[k] - vector[k]), self.problem.parameters[k]['bounds'][1] - self.problem.parameters[k]['bounds'][0], d))
-            # print("dist min: {0:4.1f} %".format(dist))
-
-        return dist
+        """
+        Computes the distance to the nearest training vector (Chebyshev distance in percents of the bounds).
+
+        :param x: vector
+        :return: distance, inf if there is no training data
+        """
+        return float(self.index.query(x)[0][0])
+
+    def compute_distances(self, vectors):
+        """ Computes the distances of the vectors (e.g. of the whole population) to the nearest training vectors. """
+        return self.index.query(vectors)[0]
+
+    def neighbours(self, x, distance=None):
+        """
+        Finds the training vectors in the distance from the vector.
+
+        :param x: vector
+        :param distance: distance in percents of the bounds, distance_threshold by default
+        :return: list of indices to x_data
+        """
+        if distance is None:
+            distance = self.distance_threshold
+        return self.index.query_radius(x, distance)[0].tolist()
+
+    def is_trusted(self, x):
+        """
+        Decides between the prediction and the real evaluation, the prediction is trusted only in the distance_threshold
+        from the training data (no restriction if distance_threshold is 0).
+
+        :param x: vector
+        :return: True if the vector can be predicted
+        """
+        return self.distance_threshold <= 0.0 or self.compute_distance(x) <= self.distance_threshold
 
     @abstractmethod
     def evaluate(self, individual):
@@ -78,43 +549,218 @@ class SurrogateModelPredict(SurrogateModel):
     def __init__(self, problem):
         super().__init__(problem)
 
+        # the evaluator hands the whole population to the surrogate model (evaluate_batch), the prediction of the
+        # single individuals by Problem.predict is not used
+        self.batch_prediction = False
+
+        # the model is retrained by the policy (instead of every train_step evaluations), in the background thread
+        # if background_training is set
+        self.retrain_policy = None
+        self.background_training = False
+        self.trainer = SurrogateTrainer(self)
+
+        # the predictions are accepted by the gate of the uncertainty (sigma_threshold) and of the distance from the
+        # training data (distance_threshold) instead of Problem.predict
+        self.gated = False
+        # the thresholds of the gate adapt to the error of the predictions of the evaluated individuals (relative to the
+        # range of the values), the gate is tightened if an accepted prediction exceeds target_error and loosened if
+        # a rejected one meets it; the unset thresholds (infinite sigma_threshold, zero distance_threshold) close the
+        # gate until they are initialised by the uncertainty and the distance of the first accurate prediction
+        self.target_error = None
+        self.threshold_shrink = 0.8
+        self.threshold_growth = 1.1
+
+    def load(self, file_name=None):
+        # the model trained in the background must not replace the loaded one
+        self.trainer.wait()
+        super().load(file_name)
+
+        # the loaded model has been trained on the current data
+        if self.retrain_policy is not None:
+            self.retrain_policy.reset(len(self.x_data))
+
+    def evaluate_batch(self, individuals):
+        """
+        Predicts the whole population in one call of the regressor. Only the predictions close to the training data
+        (distance_threshold) and with the small uncertainty (sigma_threshold) are accepted.
+
+        :param individuals: list of individuals
+        :return: list of the predicted values, None for the individuals which have to be evaluated
+        """
+        if not self.trained or not individuals:
+            return [None] * len(individuals)
+
+        matrix = np.array([individual.vector for individual in individuals], dtype=float)
+        means, stds = self.predict_batch(matrix)
+        accepted = self.gate(matrix, stds)
+
+        # count prediction
+        self.predict_counter += int(np.count_nonzero(accepted))
+
+        means = np.reshape(means, (len(individuals), -1)).tolist()
+        return [values if ok else None for values, ok in zip(means, accepted.tolist())]
+
+    def gate(self, matrix, stds, distances=None):
+        """
+        Accepts the predictions close to the training data (distance_threshold) and with the small uncertainty
+        (sigma_threshold).
+
+        :param matrix: array (n, parameters) of vectors
+        :param stds: array (n, costs) of standard deviations of the predictions or None
+        :param distances: distances to the nearest training vectors (computed if they are not given)
+        :return: boolean array (n, )
+        """
+        accepted = np.ones(len(matrix), dtype=bool)
+        if self.target_error is not None and not self._thresholds_set(stds is not None):
+            # the adaptive thresholds have not been initialised yet
+            accepted[:] = False
+            return accepted
+
+        if self.distance_threshold > 0.0:
+            if distances is None:
+                distances = self.compute_distances(matrix)
+            accepted &= distances <= self.distance_threshold
+        if stds is not None:
+            accepted &= np.reshape(stds, (len(matrix), -1)).max(axis=1) <= self.sigma_threshold
+
+        return accepted
+
+    def _thresholds_set(self, uncertainty=True):
+        """ :return: True if the thresholds are finite and positive (sigma_threshold only with the uncertainty). """
+        sigma = not uncertainty or 0.0 < self.sigma_threshold < float("inf")
+        return sigma and 0.0 < self.distance_threshold < float("inf")
+
     def evaluate(self, individual):
         values = None
-        if self.trained and "predict" in dir(self.problem):
-            values = self.problem.predict(individual)
-            if values is not None:
-                # count prediction
-                self.problem.surrogate.predict_counter += 1
+        if not self.batch_prediction:
+            values = self.predict_individual(individual)
 
         if values is None:
             # evaluate model
             values = self.evaluate_individual(individual)
+            if "predicted" in individual.features:
+                del individual.features["predicted"]
+
+        return values
+
+    def predict_individual(self, individual):
+        """
+        Predicts the individual by the gate (gated) or by Problem.predict in the distance_threshold from the training
+        data, the prediction is marked by the feature 'predicted'.
+
+        :param individual: Individual
+        :return: predicted values, None if the individual has to be evaluated
+        """
+        if not self.trained:
+            return None
+
+        values = None
+        if self.gated:
+            means, stds = self.predict_batch([individual.vector])
+            if self.gate([individual.vector], stds)[0]:
+                values = np.ravel(means).tolist()
+        elif "predict" in dir(self.problem) and self.is_trusted(individual.vector):
+            values = self.problem.predict(individual)
 
-        # self.problem.logger.info("surrogate: predict / eval counter: {0:5.0f} / {1:5.0f}, total: {2:5.0f}".format(
-        #     self.problem.surrogate.predict_counter,
-        #     self.problem.surrogate.eval_counter,
-        #     self.problem.surrogate.predict_counter + self.problem.surrogate.eval_counter))
+        if values is not None:
+            # count prediction
+            self.predict_counter += 1
+            # the prediction is not the result of the problem (it is not cached)
+            individual.features["predicted"] = True
 
         return values
 
+    @property
+    def predict_ratio(self):
+        """ Ratio of the predicted individuals to all individuals. """
+        total = self.predict_counter + self.eval_counter
+        return self.predict_counter / total if total > 0 else 0.0
+
+    def report(self):
+        """ Logs the numbers of the predictions and of the evaluations and the thresholds of the gate. """
+        self.problem.logger.info("surrogate: predict / eval counter: {0:5.0f} / {1:5.0f}, total: {2:5.0f}, "
+                                 "predict ratio: {3:.1f} %, sigma threshold: {4:g}, distance threshold: {5:g} %"
+                                 .format(self.predict_counter, self.eval_counter,
+                                         self.predict_counter + self.eval_counter, 100.0 * self.predict_ratio,
+                                         self.sigma_threshold, self.distance_threshold))
+
     def evaluate_individual(self, individual):
         # evaluate problem
         value = self.problem.evaluate(individual)
+        self.learn(individual.vector, value)
+
+        return value
+
+    def learn(self, x, value):
+        """
+        Takes the evaluated vector into account: the current model is validated, the vector is added to the training
+        data and the model is retrained when it is due. The ProcessEvaluator calls it with the results of the workers.
+
+        :param x: evaluated vector
+        :param value: values of the problem
+        """
         # increase counter
         self.eval_counter += 1
+        # validate the current model
+        if self.trained and (self.target_error is not None or
+                             (self.retrain_policy is not None and self.retrain_policy.error is not None)):
+            self.validate(x, value)
         # add training date to surrogate model
-        self.add_data(individual.vector, value)
-
-        if self.train_step != -1:
-            if self.eval_counter % self.train_step == 0:
-                # init default regressor
-                if self.regressor is None:
-                    self.init_default_regressor()
-
-                # train model
+        self.add_data(x, value)
+
+        if self.retrain_policy is not None:
+            retrain = self.retrain_policy.due(len(self.x_data))
+        else:
+            retrain = self.train_step != -1 and self.eval_counter % self.train_step == 0
+
+        if retrain:
+            # init default regressor
+            if self.regressor is None:
+                self.init_default_regressor()
+
+            # train model (the request is dropped if the background training is running)
+            if self.background_training:
+                retrain = self.trainer.submit()
+            else:
                 self.train()
 
-        return value
+            if retrain and self.retrain_policy is not None:
+                self.retrain_policy.reset(len(self.x_data))
+
+    def validate(self, x, value):
+        """
+        Compares the prediction of the evaluated vector with its value, the error (relative to the range of the values)
+        is recorded by the retraining policy and adapts the thresholds of the gate.
+        """
+        means, stds = self.predict_batch([x])
+        scale = np.ptp(self.y_data, axis=0).max() if len(self.y_data) > 1 else 0.0
+        error = float(np.abs(np.ravel(means) - np.ravel(value)).max() / (scale if scale > 0.0 else 1.0))
+
+        if self.retrain_policy is not None:
+            self.retrain_policy.record(error)
+
+        if self.target_error is not None:
+            if not self._thresholds_set(stds is not None):
+                # the first accurate prediction initialises the unset thresholds
+                if error <= self.target_error:
+                    sigma = float(np.max(stds)) if stds is not None else 0.0
+                    distance = self.compute_distance(x)
+                    if not 0.0 < self.sigma_threshold < float("inf") and sigma > 0.0:
+                        self.sigma_threshold = sigma
+                    if not 0.0 < self.distance_threshold < float("inf") and 0.0 < distance < float("inf"):
+                        self.distance_threshold = distance
+                return
+
+            accepted = self.gate([x], stds)[0]
+            if accepted and error > self.target_error:
+                factor = self.threshold_shrink
+            elif not accepted and error <= self.target_error:
+                factor = self.threshold_growth
+            else:
+                return
+
+            self.sigma_threshold *= factor
+            self.distance_threshold *= factor
 
 
 class SurrogateModelEval(SurrogateModel):
@@ -1,10 +1,11 @@
-from .utils import flatten
-
 from .surrogate import SurrogateModelPredict
 
 import warnings
+from collections import OrderedDict
+from copy import deepcopy
 
-from scipy.spatial import distance
+import numpy as np
+from scipy.linalg import cholesky, cho_solve, solve_triangular
 
 from sklearn.svm import SVR
 from sklearn.neural_network import MLPRegressor
@@ -17,6 +18,7 @@ from sklearn.neighbors import KNeighborsRegressor, RadiusNeighborsRegressor
 from sklearn.gaussian_process import GaussianProcessRegressor
 from sklearn.gaussian_process.kernels import RBF, Matern, DotProduct, WhiteKernel, ConstantKernel, RationalQuadratic, ExpSineSquared
 
+from sklearn.base import clone
 from sklearn.model_selection import GridSearchCV
 from sklearn.model_selection import RandomizedSearchCV
 
@@ -29,9 +31,17 @@ class SurrogateModelScikit(SurrogateModelPredict):
         self.sigma_threshold = 10
         self.score_threshold = 0.5
         self.distance_metric = 'chebyshev'
-        self.distance_threshold = 1.0
+        # the predictions are not restricted to the neighbourhood of the training data by default (0.0), e.g. 1.0
+        # trusts them only within 1 % of the bounds from the nearest training vector
+        self.distance_threshold = 0.0
         self.has_epsilon = False # some regressors has epsilon (GaussianProcessRegressor, ...)
 
+        # incremental training of GaussianProcessRegressor - the Cholesky factor is extended by the new training data
+        # (fixed hyperparameters), the hyperparameters are optimised (warm-started) only every optimise_step-th training
+        self.incremental = False
+        self.optimise_step = 5
+        self.train_counter = 0
+
         # stats
         self.score = None
         self.lml = None
@@ -178,123 +188,241 @@ class SurrogateModelScikit(SurrogateModelPredict):
         else:
             assert 0
 
+    def predict_batch(self, matrix):
+        # disable sklearn warnings
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+
+            matrix = np.asarray(matrix, dtype=float)
+            if self.has_epsilon:
+                means, stds = self.regressor.predict(matrix, return_std=True)
+                stds = np.reshape(stds, (len(matrix), -1))
+            else:
+                means, stds = self.regressor.predict(matrix), None
+
+        return np.reshape(means, (len(matrix), -1)), stds
+
     def train(self):
         # disable sklearn warnings
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
 
-            # print(len(self.x_data), len(self.y_data))
-            # print(self.x_data, self.y_data)
-            self.regressor.fit(self.x_data, self.y_data)
-            # self.regressor.fit(self.x_data, np.ravel(self.y_data, order='C'))
-            # self.trained = True
+            updated = self.incremental and self.train_counter % self.optimise_step != 0 and self._update_cholesky()
+            if not updated:
+                if self.incremental and hasattr(self.regressor, "kernel_"):
+                    # warm start - the optimizer starts from the last hyperparameters
+                    self.regressor.kernel = self.regressor.kernel_
+                self.regressor.fit(self.x_data, self.y_data)
+            self.train_counter += 1
 
         if self.eval_stats:
             # score
             self.score = self.regressor.score(self.x_data, self.y_data)
             # print("self.score = {} : {}".format(len(self.x_data), self.score))
-            # lml (Gaussian regressor)
-            if "log_marginal_likelihood" in dir(self.regressor):
+            # lml (Gaussian regressor), the hyperparameters are not changed by the update
+            if "log_marginal_likelihood" in dir(self.regressor) and not updated:
                 self.lml, self.lml_gradient = self.regressor.log_marginal_likelihood(self.regressor.kernel_.theta, eval_gradient=True)
 
         # set trained
         self.trained = self.score >= self.score_threshold
         self.trained = True
 
-    # def evaluate(self, individual):
-    #     evaluate = True
-    #
-    #     if self.trained:
-    #         # disable sklearn warnings
-    #         with warnings.catch_warnings():
-    #             warnings.simplefilter("ignore")
-    #
-    #             if self.has_epsilon:
-    #                 p, sigma = self.predict(individual.vector)
-    #             else:
-    #                 p = self.predict(individual.vector)
-    #                 sigma = 0
-    #
-    #         # compute minimal parameter distance
-    #         if self.distance_metric is not None:
-    #             dist = float("inf")
-    #             for parameter in self.x_data:
-    #                 if self.distance_metric == 'chebyshev':
-    #                     dist = min(dist, distance.chebyshev(individual.vector, parameter))
-    #                 else:
-    #                     assert 0
-    #
-    #             # print("dist = {}".format(dist))
-    #             # print("sigma = {}".format(sigma))
-    #
-    #         # estimated value
-    #         value = flatten(p[0])
-    #
-    #         """
-    #         val = self.problem.evaluate(x)
-    #         # self.problem.logger.info("SurrogateGaussianProcess: predict: x: {}, prediction: {}, sigma: {}".format(x, p[0], sigma))
-    #         self.problem.logger.info("SurrogateGaussianProcess: predict: x: {}, prediction: {}, value: {}".format(x, p[0], val))
-    #         value = val
-    #         """
-    #
-    #         # increase counter
-    #         self.predict_counter += 1
-    #         evaluate = False
-    #
-    #     if evaluate:
-    #         # evaluate problem
-    #         value = self.problem.evaluate(individual)
-    #         # increase counter
-    #         self.eval_counter += 1
-    #         # add training date to surrogate model
-    #         # self.add_data(np.array(x), np.array(value))
-    #         self.add_data(individual.vector, value)
-    #
-    #         if self.eval_counter % self.train_step == 0:
-    #             # init default regressor
-    #             if self.regressor is None:
-    #                 self.init_default_regressor()
-    #
-    #             # train model
-    #             self.train()
-    #
-    #     """
-    #     if self.trained:
-    #         p, sigma = self.predict([x], return_std=True)
-    #         self.problem.logger.info(
-    #             "SurrogateGaussianProcess: predict: x: {}, prediction: {}, sigma: {}".format(x, p[0], sigma))
-    #
-    #         if sigma < self.options['sigma_threshold']:
-    #             # estimated value
-    #             value = p[0].tolist()
-    #
-    #             # increase counter
-    #             self.predict_counter += 1
-    #             evaluate = False
-    #
-    #     if evaluate:
-    #         # evaluate problem
-    #         value = self.problem.evaluate(x)
-    #         # increase counter
-    #         self.eval_counter += 1
-    #         # add training date to surrogate model
-    #         self.add_data(x, value)
-    #
-    #         if self.eval_counter % self.options['train_step'] == 0:
-    #             # surrogate model
-    #             counter_eff = 100.0 * self.predict_counter / (
-    #                         self.eval_counter + self.predict_counter)
-    #             # speed up - increase train step
-    #             if counter_eff > 30:
-    #                 self.options['train_step'] = int(self.options['train_step'] * 1.3)
-    #             self.problem.logger.info("Surrogate: learning: {}, predict eff: {}, train_step: {}"
-    #                               .format(self.predict_counter, counter_eff, self.options['train_step']))
-    #
-    #             # init default regressor
-    #             if self.regressor is not None:
-    #                 self.init_default_regressor()
-    #
-    #             # train model
-    #             self.train()
-    #     """
-    #     return value
+    def _update_cholesky(self):
+        """
+        Appends the new training data to the fitted GaussianProcessRegressor with fixed hyperparameters, the Cholesky
+        factor L of K + alpha I is extended by the new rows
+
+            L_21 = (L_11^-1 K_12)^T, L_22 = chol(K_22 + alpha I - L_21 L_21^T)
+
+        (a rank-one update for every new vector), so the costs are O(n^2) instead of O(n^3) of the refit.
+
+        :return: False if the regressor cannot be updated (it has to be fitted)
+        """
+        gp = self.regressor
+        if not isinstance(gp, GaussianProcessRegressor) or not hasattr(gp, "L_") or np.iterable(gp.alpha):
+            return False
+
+        n = len(gp.X_train_)
+        x_new = self.x_data[n:]
+        if len(self.x_data) < n or not np.array_equal(self.x_data[:n], gp.X_train_):
+            return False
+
+        if len(x_new) > 0:
+            k_12 = gp.kernel_(gp.X_train_, x_new)
+            k_22 = gp.kernel_(x_new)
+            k_22[np.diag_indices_from(k_22)] += gp.alpha
+
+            l_21 = solve_triangular(gp.L_, k_12, lower=True, check_finite=False).T
+            try:
+                l_22 = cholesky(k_22 - l_21 @ l_21.T, lower=True, check_finite=False)
+            except np.linalg.LinAlgError:
+                return False
+
+            L = np.zeros((n + len(x_new), n + len(x_new)))
+            L[:n, :n] = gp.L_
+            L[n:, :n] = l_21
+            L[n:, n:] = l_22
+            gp.L_ = L
+            gp.X_train_ = np.array(self.x_data)
+
+        # the normalisation of the values depends on all data
+        y = np.array(self.y_data)
+        if gp.y_train_.ndim == 1:
+            y = y.ravel()
+        if gp.normalize_y:
+            gp._y_train_mean = np.mean(y, axis=0)
+            std = np.std(y, axis=0)
+            gp._y_train_std = np.where(std == 0.0, 1.0, std)
+        gp.y_train_ = (y - gp._y_train_mean) / gp._y_train_std
+        gp.alpha_ = cho_solve((gp.L_, True), gp.y_train_, check_finite=False)
+
+        return True
+
+
+class SurrogateModelLocal(SurrogateModelPredict):
+    """
+    Local Gaussian process surrogate model for large training sets.
+
+    The parameter space (normalised by the bounds) is divided into regions, cells of the width region_width (in
+    percents of the bounds). The cell is halved (down to min_region_width) while its neighbours (the nearest training
+    vectors to its centre) do not cover it, so the dense data lead to the small regions. The regressor of the region
+    is a clone of the regressor fitted on the neighbours when the region is queried for the first time. The fitted
+    models are cached (at most max_models, the least recently used are dropped) and invalidated when the new training
+    data arrive into their neighbourhood. The costs of the training and the memory are bounded by the number of the
+    neighbours, not by the size of the training set.
+    """
+
+    # the fitted local models are swapped in after the background training
+    _model_attributes = SurrogateModelPredict._model_attributes + ('_models', '_split')
+
+    def __init__(self, problem):
+        super().__init__(problem)
+
+        self.train_step = 10
+        self.sigma_threshold = 10
+        self.distance_threshold = 0.0
+        self.has_epsilon = True
+
+        # number of the neighbours of the region (training set of its regressor)
+        self.n_neighbours = 50
+        self.region_width = 25.0
+        self.min_region_width = 1.0
+        self.max_models = 100
+
+        # stats
+        self.fit_counter = 0
+
+        self._models = OrderedDict()
+        # the halved regions (the new data cannot enlarge the neighbourhood, they stay halved)
+        self._split = set()
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state['_models'] = OrderedDict()
+        return state
+
+    def shadow(self, x, y):
+        model = super().shadow(x, y)
+        # the background training does not share the local models with the current model
+        with self._lock:
+            model._models = deepcopy(self._models)
+            model._split = set(self._split)
+        return model
+
+    def init_default_regressor(self):
+        # default kernel (the local regressors work with the vectors normalised to the percents of the bounds)
+        kernel = 1.0 * RationalQuadratic(length_scale=10.0, alpha=0.1, length_scale_bounds=(1.0, 1e4))
+        # default regressor (template of the local regressors)
+        self.regressor = GaussianProcessRegressor(kernel=kernel)
+
+    def add_data(self, x, y):
+        with self._lock:
+            super().add_data(x, y)
+
+            # the models whose neighbours would include the new vector are fitted again
+            if self._models:
+                point = self.index.normalise(x)
+                for key in [key for key, (model, centre, radius) in self._models.items()
+                            if np.abs(point - centre).max() <= radius]:
+                    del self._models[key]
+
+    def train(self):
+        if self.regressor is None:
+            self.init_default_regressor()
+
+        # the local models are fitted on demand
+        self._models.clear()
+        self._split.clear()
+        self.trained = len(self.x_data) > 0
+
+    def region(self, point):
+        """ Key (width and cell) of the region of the normalised vector. """
+        width = self.region_width
+        while True:
+            key = (width, tuple(np.floor(point / width).astype(int).tolist()))
+            if key in self._models or width / 2.0 < self.min_region_width:
+                return key
+
+            if key not in self._split:
+                indices, distances = self.neighbourhood(key)
+                if len(indices) < self.n_neighbours or distances.max() >= width / 2.0:
+                    return key
+                self._split.add(key)
+
+            width /= 2.0
+
+    def neighbourhood(self, key):
+        """ Returns the indices of the neighbours of the region and their distances from its centre. """
+        width, cell = key
+        index = self.index
+        centre = (np.array(cell, dtype=float) + 0.5) * width
+        return index.nearest(index.lower + centre / index.scale, self.n_neighbours)
+
+    def model(self, key):
+        """ Returns the (cached) regressor of the region. """
+        if key in self._models:
+            self._models.move_to_end(key)
+            return self._models[key][0]
+
+        width, cell = key
+        indices, distances = self.neighbourhood(key)
+
+        model = clone(self.regressor)
+        # disable sklearn warnings
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            model.fit(self.index.normalise(self.x_data[indices]), self.y_data[indices])
+        self.fit_counter += 1
+
+        centre = (np.array(cell, dtype=float) + 0.5) * width
+        self._models[key] = (model, centre, distances.max())
+        while len(self._models) > self.max_models:
+            self._models.popitem(last=False)
+
+        return model
+
+    def predict_batch(self, matrix):
+        matrix = np.asarray(matrix, dtype=float).reshape(len(matrix), -1)
+        means = np.empty((len(matrix), self.y_data.shape[1]))
+        stds = np.empty_like(means)
+
+        # the vectors are predicted by the models of their regions
+        points = self.index.normalise(matrix)
+        regions = {}
+        for i, point in enumerate(points):
+            regions.setdefault(self.region(point), []).append(i)
+
+        for key, rows in regions.items():
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                mean, std = self.model(key).predict(points[rows], return_std=True)
+            means[rows] = np.reshape(mean, (len(rows), -1))
+            stds[rows] = np.reshape(std, (len(rows), -1))
+
+        return means, stds
+
+    def predict(self, x, *args):
+        if self.trained:
+            return self.predict_batch([x])
+        else:
+            assert 0
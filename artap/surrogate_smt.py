@@ -30,6 +30,15 @@ class SurrogateModelSMT(SurrogateModelPredict):
         else:
             assert 0
 
+    def predict_batch(self, matrix):
+        matrix = np.asarray(matrix, dtype=float)
+        means = self.regressor.predict_values(matrix)
+        stds = None
+        if self.regressor.supports["variances"]:
+            stds = np.sqrt(np.maximum(self.regressor.predict_variances(matrix), 0.0))
+
+        return np.reshape(means, (len(matrix), -1)), stds
+
     def train(self):
         self.trained = False
         assert(len(self.x_data) == len(self.y_data))
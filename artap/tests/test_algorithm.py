@@ -1,9 +1,18 @@
 import unittest
+import os
+import random
+import tempfile
+
+import numpy as np
+
 from ..problem import Problem
 from ..individual import Individual
 from ..operators import CustomGenerator, LHSGenerator, Evaluator
-from ..algorithm import DummyAlgorithm
+from ..algorithm import DummyAlgorithm, EvaluatorType
 from ..algorithm_sweep import SweepAlgorithm
+from ..algorithm_genetic import NSGAII, EpsMOEA
+from ..algorithm_swarm import OMOPSO, SMPSO
+from ..surrogate_scikit import SurrogateModelScikit
 
 
 class SweepProblem(Problem):
@@ -21,6 +30,35 @@ class SweepProblem(Problem):
         return [result]
 
 
+class ProcessProblem(SweepProblem):
+    """ Reports the worker process. """
+    def evaluate(self, individual: Individual):
+        individual.custom['pid'] = os.getpid()
+        return super().evaluate(individual)
+
+
+class Interrupted(Exception):
+    pass
+
+
+class BiObjectiveProblem(Problem):
+    """ Counts the evaluations. """
+    def set(self):
+        self.name = "BiObjectiveProblem"
+        self.parameters = [{'name': 'x_1', 'bounds': [0, 5]},
+                           {'name': 'x_2', 'bounds': [0, 3]}]
+        self.costs = [{'name': 'F_1'}, {'name': 'F_2'}]
+        self.evaluated = 0
+        self.interrupt_after = None
+
+    def evaluate(self, individual: Individual):
+        if self.evaluated == self.interrupt_after:
+            raise Interrupted()
+        self.evaluated += 1
+        x_1, x_2 = individual.vector
+        return [4 * x_1 ** 2 + 4 * x_2 ** 2, (x_1 - 5) ** 2 + (x_2 - 5) ** 2]
+
+
 class TestJob(unittest.TestCase):
     """ Tests simple one objective optimization problem."""
 
@@ -83,6 +121,147 @@ class TestJob(unittest.TestCase):
         self.assertEqual(individuals[0].costs, [9])
         self.assertEqual(individuals[1].costs, [22])
 
+    def test_dummy_evaluate_process(self):
+        problem = ProcessProblem()
+        individuals = [Individual([1, 2, 2]), Individual([3, 3, 2]), Individual([1, 1, 1]), Individual([1, 2, 2])]
+
+        algorithm = DummyAlgorithm(problem)
+        algorithm.set_evaluator(EvaluatorType.PROCESS)
+        algorithm.options['max_processes'] = 2
+        algorithm.evaluate(individuals)
+        algorithm.evaluator.close()
+
+        self.assertEqual([individual.costs for individual in individuals], [[9], [22], [3], [9]])
+        self.assertEqual(individuals[1].costs_signed, [22, 0.0])
+        self.assertEqual(individuals[2].state, Individual.State.EVALUATED)
+        self.assertNotEqual(individuals[0].custom['pid'], os.getpid())
+        self.assertGreater(individuals[1].features['finish_time'], 0.0)
+
+    def test_surrogate_evaluate_process(self):
+        problem = ProcessProblem()
+        problem.surrogate = SurrogateModelScikit(problem)
+        problem.surrogate.init_default_regressor()
+        problem.surrogate.train_step = 4
+        problem.surrogate.gated = True
+        problem.surrogate.sigma_threshold = 1e3
+        problem.surrogate.distance_threshold = 100.0
+
+        algorithm = DummyAlgorithm(problem)
+        algorithm.set_evaluator(EvaluatorType.PROCESS)
+        algorithm.options['max_processes'] = 2
+        algorithm.evaluate([Individual([x]) for x in [-5.0, 0.0, 5.0, 10.0]])
+
+        # the model of the parent process is trained on the results of the workers
+        self.assertEqual(len(problem.surrogate.x_data), 4)
+        self.assertEqual(problem.surrogate.eval_counter, 4)
+        self.assertTrue(problem.surrogate.trained)
+
+        individuals = [Individual([2.0]), Individual([7.0])]
+        algorithm.evaluate(individuals)
+        algorithm.evaluator.close()
+
+        self.assertEqual(problem.surrogate.predict_counter, 2)
+        self.assertTrue(all(individual.features['predicted'] for individual in individuals))
+        self.assertNotIn('pid', individuals[0].custom)
+
+
+class TestCheckpoint(unittest.TestCase):
+    """ Tests the warm restart of the algorithms from the checkpoint. """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.checkpoint = os.path.join(self.directory.name, "checkpoint.pkl")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    @staticmethod
+    def optimize(algorithm_class, max_population_number, checkpoint=None, resume=False, interrupt_after=None):
+        problem = BiObjectiveProblem()
+        problem.interrupt_after = interrupt_after
+        algorithm = algorithm_class(problem)
+        algorithm.options['max_population_number'] = max_population_number
+        algorithm.options['max_population_size'] = 6
+        algorithm.options['max_processes'] = 1
+        algorithm.options['checkpoint'] = checkpoint
+        if resume:
+            algorithm.resume()
+        else:
+            random.seed(1)
+            np.random.seed(1)
+            algorithm.run()
+
+        last = max(individual.population_id for individual in problem.individuals)
+        vectors = [individual.vector for individual in problem.individuals if individual.population_id == last]
+        return problem, vectors
+
+    def check_resume(self, algorithm_class):
+        problem, vectors = self.optimize(algorithm_class, 4)
+
+        # the run is interrupted in the third generation
+        with self.assertRaises(Interrupted):
+            self.optimize(algorithm_class, 4, checkpoint=self.checkpoint, interrupt_after=problem.evaluated - 8)
+        resumed, resumed_vectors = self.optimize(algorithm_class, 4, checkpoint=self.checkpoint, resume=True)
+
+        # the resumed run continues with the next generation and gives the same results as the uninterrupted one
+        self.assertGreater(min(individual.population_id for individual in resumed.individuals), 1)
+        self.assertEqual(resumed_vectors, vectors)
+
+    def test_resume_nsga2(self):
+        self.check_resume(NSGAII)
+
+    def test_resume_epsmoea(self):
+        self.check_resume(EpsMOEA)
+
+    def test_resume_omopso(self):
+        self.check_resume(OMOPSO)
+
+    def test_resume_smpso(self):
+        self.check_resume(SMPSO)
+
+    def test_unsupported(self):
+        # the steady-state loop has no complete generations
+        algorithm = NSGAII(BiObjectiveProblem())
+        algorithm.options['checkpoint'] = self.checkpoint
+        algorithm.options['asynchronous'] = True
+        with self.assertRaises(ValueError):
+            algorithm.run()
+        self.assertEqual(algorithm.problem.evaluated, 0)
+
+        with self.assertRaises(ValueError):
+            DummyAlgorithm(BiObjectiveProblem()).resume(self.checkpoint)
+
+    def test_extend_run(self):
+        problem, vectors = self.optimize(NSGAII, 4)
+
+        first, _ = self.optimize(NSGAII, 2, checkpoint=self.checkpoint)
+        second, resumed_vectors = self.optimize(NSGAII, 4, checkpoint=self.checkpoint, resume=True)
+
+        # the finished run is extended, nothing is evaluated twice
+        self.assertEqual(min(individual.population_id for individual in second.individuals), 3)
+        self.assertEqual(resumed_vectors, vectors)
+        self.assertEqual(first.evaluated + second.evaluated, problem.evaluated)
+
+    def test_checkpoint_interval(self):
+        problem = BiObjectiveProblem()
+        algorithm = NSGAII(problem)
+        algorithm.options['max_population_number'] = 3
+        algorithm.options['max_population_size'] = 4
+        algorithm.options['checkpoint'] = self.checkpoint
+        algorithm.options['checkpoint_interval'] = 2
+        algorithm.run()
+
+        # the last generation is always stored
+        iteration, individuals = NSGAII(BiObjectiveProblem()).load_checkpoint(self.checkpoint)
+        self.assertEqual(iteration, 3)
+        self.assertEqual(len(individuals), 4)
+        self.assertFalse(os.path.exists(self.checkpoint + ".tmp"))
+
+        # nothing remains to be done
+        evaluated = problem.evaluated
+        algorithm.resume()
+        self.assertEqual(problem.evaluated, evaluated)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,8 @@
 import unittest
+import numpy as np
 from ..individual import Individual
-from ..benchmark_pareto import BiObjectiveTestProblem, DTLZI,DTLZII, DTLZIII, DTLZIV
+from ..benchmark_pareto import BiObjectiveTestProblem, DTLZI,DTLZII, DTLZIII, DTLZIV, PoloniFunction, CEC2020MMF1, \
+    CEC2020MMF2, ZDT1
 
 class TestBiobjective(unittest.TestCase):
 
@@ -68,3 +70,51 @@ class TestDTLZIV(unittest.TestCase):
 
         self.assertAlmostEqual(f0**2.0+f1**2.0+f2**2.0, 1.0)
 
+
+class TestBatchEvaluation(unittest.TestCase):
+
+    def test_batch(self):
+        problems = [BiObjectiveTestProblem(), PoloniFunction(), DTLZI(**{'dimension': 8, 'm': 3}),
+                    DTLZII(**{'dimension': 12, 'm': 3}), DTLZIII(**{'dimension': 12, 'm': 3}),
+                    DTLZIV(**{'dimension': 12, 'm': 3}), CEC2020MMF1(), CEC2020MMF2(), ZDT1()]
+
+        rng = np.random.RandomState(0)
+        for problem in problems:
+            bounds = np.array([parameter['bounds'] for parameter in problem.parameters], dtype=float)
+            x = bounds[:, 0] + rng.random_sample((20, len(bounds))) * (bounds[:, 1] - bounds[:, 0])
+
+            costs = problem.evaluate_batch(x)
+            self.assertEqual(costs.shape, (20, len(problem.costs)))
+            for i in range(20):
+                np.testing.assert_allclose(costs[i], problem.evaluate(Individual(x[i].tolist())))
+
+    @staticmethod
+    def optimal_vectors(problem, n, alpha=1.0):
+        """ Position variables on the regular grid, the distance variables in the optimum (0.5). """
+        m = len(problem.costs)
+        axis = np.linspace(0.0, 1.0, n) ** (1.0 / alpha)
+        grid = np.meshgrid(*[axis] * (m - 1), indexing='ij')
+        positions = np.column_stack([coordinate.ravel() for coordinate in grid])
+        return np.hstack([positions, np.full((len(positions), len(problem.parameters) - m + 1), 0.5)])
+
+    def test_pareto_front_sample(self):
+        problem = DTLZI(**{'dimension': 8, 'm': 3})
+        front = problem.pareto_front_sample(10)
+        self.assertEqual(front.shape, (100, 3))
+        np.testing.assert_allclose(np.sum(front, axis=1), 0.5)
+        np.testing.assert_allclose(problem.evaluate_batch(self.optimal_vectors(problem, 10)), front, atol=1e-12)
+
+        for problem, alpha in [(DTLZII(**{'dimension': 12, 'm': 3}), 1.0), (DTLZIII(**{'dimension': 12, 'm': 3}), 1.0),
+                               (DTLZIV(**{'dimension': 12, 'm': 3}), 100.0), (DTLZII(**{'dimension': 7, 'm': 4}), 1.0)]:
+            front = problem.pareto_front_sample(10)
+            self.assertEqual(front.shape, (10 ** (len(problem.costs) - 1), len(problem.costs)))
+            np.testing.assert_allclose(np.sum(front ** 2, axis=1), 1.0)
+
+            # the problem reaches the sample in its optimum
+            x = self.optimal_vectors(problem, 10, alpha)
+            np.testing.assert_allclose(problem.evaluate_batch(x), front, atol=1e-12)
+            np.testing.assert_allclose(problem.evaluate(Individual(x[37].tolist())), front[37], atol=1e-12)
+
+        front = ZDT1().pareto_front_sample(50)
+        self.assertEqual(front.shape, (50, 2))
+        np.testing.assert_allclose(front[:, 1], 1.0 - np.sqrt(front[:, 0]))
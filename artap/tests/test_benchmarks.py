@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 from ..individual import Individual
 from ..benchmark_functions import Rosenbrock, Ackley, Schwefel, Sphere, ModifiedEasom, Michaelwicz, Perm, Rastrigin, \
     SixHump, EqualityConstr, Griewank, Schubert, Zakharov, XinSheYang, XinSheYang2, XinSheYang3, Booth, GramacyLee, \
@@ -181,5 +182,25 @@ class TestAlpine(unittest.TestCase):
         self.assertAlmostEqual(test2d.evaluate(Individual(test2d.global_optimum_coords))[0], test2d.global_optimum, 3)
 
 
+class TestBatchEvaluation(unittest.TestCase):
+
+    def test_batch(self):
+        problems = [Rosenbrock(**{'dimension': 5}), Ackley(**{'dimension': 4}), Schwefel(**{'dimension': 3}),
+                    Sphere(**{'dimension': 3}), ModifiedEasom(**{'dimension': 3}), Michaelwicz(**{'dimension': 5}),
+                    Perm(**{'dimension': 4}), Rastrigin(**{'dimension': 4}), SixHump(), Griewank(**{'dimension': 4}),
+                    Schubert(), Zakharov(**{'dimension': 4}), XinSheYang(**{'dimension': 3}),
+                    XinSheYang2(**{'dimension': 3}), Booth(), GramacyLee(), AlpineFunction(**{'dimension': 4})]
+
+        rng = np.random.RandomState(0)
+        for problem in problems:
+            bounds = np.array([parameter['bounds'] for parameter in problem.parameters], dtype=float)
+            x = bounds[:, 0] + rng.random_sample((20, len(bounds))) * (bounds[:, 1] - bounds[:, 0])
+
+            costs = problem.evaluate_batch(x)
+            self.assertEqual(costs.shape, (20, 1))
+            for i in range(20):
+                self.assertAlmostEqual(costs[i, 0], problem.evaluate(Individual(x[i].tolist()))[0], 8)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -5,12 +5,18 @@ import time
 import json
 import sqlite3
 import pathlib
+import shutil
+from copy import deepcopy
+import numpy as np
 
 from ..problem import Problem, ProblemViewDataStore
 from ..individual import Individual
-from ..datastore import SqliteDataStore
+from ..datastore import SqliteDataStore, BinaryDataStore, SqliteEvaluationCache, SqliteWriterError
+from ..job import Job
 from ..algorithm_sweep import SweepAlgorithm
 from ..algorithm_genetic import NSGAII
+from ..algorithm_swarm import OMOPSO
+from ..algorithm import EvaluatorType
 
 from ..operators import RandomGenerator
 
@@ -61,12 +67,18 @@ class TestDataStoreSqlite(unittest.TestCase):
         # remove datastore
         problem.data_store.destroy()
 
-        # check json
+        # check typed columns
         conn = sqlite3.connect(database_name)
         c = conn.cursor()
-        c.execute("SELECT * FROM individuals WHERE ID = ?", [list(individuals.keys())[6]])
-        row = c.fetchall()
-        individual = Individual.from_dict(json.loads(row[0][1]))
+        c.execute("SELECT parameter_0, cost_0 FROM individuals WHERE ID = ?", [list(individuals.keys())[6]])
+        row = c.fetchone()
+        self.assertAlmostEqual(row[0], individuals[list(individuals.keys())[6]].vector[0])
+        self.assertAlmostEqual(row[1], individuals[list(individuals.keys())[6]].costs[0])
+        conn.close()
+
+        # check individual
+        view = ProblemViewDataStore(database_name=database_name)
+        individual = {individual.id: individual for individual in view.individuals}[list(individuals.keys())[6]]
         # print(individual)
 
         # result
@@ -97,6 +109,518 @@ class TestDataStoreSqlite(unittest.TestCase):
         self.assertAlmostEqual(individuals[0].costs[0], 49.0245242, 4)
 
 
+class TestDataStoreSqliteSchema(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def test_typed_columns(self):
+        database_name = os.path.join(self.directory, "data.sqlite")
+        problem = MyProblem()
+        problem.data_store = SqliteDataStore(problem, database_name=database_name, mode="rewrite")
+
+        algorithm = NSGAII(problem)
+        algorithm.options['max_population_number'] = 3
+        algorithm.options['max_population_size'] = 4
+        algorithm.run()
+        problem.data_store.destroy()
+
+        conn = sqlite3.connect(database_name)
+        indexes = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index';").fetchall()]
+        self.assertIn("individuals_population_id", indexes)
+        self.assertIn("individuals_cost_0", indexes)
+        conn.close()
+
+        # the survivors are stored in the last population they belong to (one row for every id)
+        stored = {individual.id: individual for individual in problem.individuals}
+        stored = [stored[key] for key in sorted(stored)]
+
+        view = ProblemViewDataStore(database_name=database_name)
+        individuals = [individual for individual in stored if individual.population_id == 2]
+        costs = view.data_store.read_costs(population_id=2)
+        self.assertEqual(costs.shape, (len(individuals), 1))
+        for individual, cost in zip(individuals, costs):
+            self.assertAlmostEqual(individual.costs[0], cost[0])
+        self.assertEqual(view.data_store.read_vectors().shape, (len(view.individuals), 2))
+
+        individuals = [individual for individual in stored if individual.population_id == 3]
+        last_population = view.last_population()
+        self.assertEqual([individual.id for individual in last_population],
+                         [individual.id for individual in individuals])
+        self.assertEqual(last_population[0].state, Individual.State.EVALUATED)
+        self.assertAlmostEqual(last_population[0].costs_signed[0], individuals[0].costs_signed[0])
+
+    def test_migration(self):
+        file_path = str(pathlib.Path(__file__).parent.absolute())
+        database_name = os.path.join(self.directory, "data.sqlite")
+        shutil.copyfile(os.path.join(file_path, "data/data.sqlite"), database_name)
+
+        view = ProblemViewDataStore(database_name=database_name)
+        individuals = view.individuals
+
+        # migrated in place
+        problem = MyProblem()
+        problem.data_store = SqliteDataStore(problem, database_name=database_name, mode="write")
+        problem.data_store.destroy()
+
+        conn = sqlite3.connect(database_name)
+        self.assertEqual(conn.execute("SELECT version FROM schema;").fetchone()[0], SqliteDataStore.schema_version)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM individuals;").fetchone()[0], len(individuals))
+        conn.close()
+
+        migrated = ProblemViewDataStore(database_name=database_name).individuals
+        self.assertEqual(len(migrated), len(individuals))
+        for individual, original in zip(migrated, individuals):
+            self.assertEqual(individual.id, original.id)
+            self.assertEqual(individual.vector, original.vector)
+            self.assertEqual(individual.costs, original.costs)
+            self.assertEqual(individual.features, original.features)
+
+
+    def gradient_run(self, write_behind):
+        database_name = os.path.join(self.directory, "data.sqlite")
+        problem = MyProblem()
+        problem.data_store = SqliteDataStore(problem, database_name=database_name, mode="rewrite",
+                                             write_behind=write_behind)
+
+        # the sensitivity cost is appended after the table has been created
+        algorithm = NSGAII(problem, evaluator_type=EvaluatorType.GRADIENT)
+        algorithm.options['max_population_number'] = 2
+        algorithm.options['max_population_size'] = 4
+        algorithm.run()
+        problem.data_store.destroy()
+
+        view = ProblemViewDataStore(database_name=database_name)
+        self.assertEqual([cost['name'] for cost in view.costs], ['F', 'sensitivity'])
+        self.assertEqual(view.data_store.read_costs().shape, (len(view.individuals), 2))
+        # the finite differences are stored without the sensitivity
+        stored = {individual.id: individual for individual in view.individuals}
+        for individual in problem.individuals:
+            self.assertEqual(len(individual.costs), 2)
+            self.assertEqual(stored[individual.id].costs, individual.costs)
+
+    def test_added_costs(self):
+        self.gradient_run(write_behind=False)
+
+    def test_added_costs_write_behind(self):
+        self.gradient_run(write_behind=True)
+
+    def test_failed_write(self):
+        database_name = os.path.join(self.directory, "data.sqlite")
+        problem = MyProblem()
+        problem.data_store = SqliteDataStore(problem, database_name=database_name, mode="rewrite")
+        conn = sqlite3.connect(database_name)
+        conn.execute("DROP TABLE features;")
+        conn.commit()
+        conn.close()
+
+        # the error is not retried, the individual is written by the next sync
+        individual = Individual([1, 1])
+        with self.assertRaises(sqlite3.OperationalError):
+            problem.data_store.sync_individual(individual)
+        self.assertNotIn(individual.id, problem.data_store._synced)
+        problem.data_store.destroy()
+
+
+class TestDataStoreSqliteLazy(unittest.TestCase):
+    def setUp(self):
+        self.database_name = os.path.join(tempfile.mkdtemp(), "data.sqlite")
+        problem = MyProblem()
+        problem.data_store = SqliteDataStore(problem, database_name=self.database_name, mode="rewrite")
+
+        algorithm = NSGAII(problem)
+        algorithm.options['max_population_number'] = 4
+        algorithm.options['max_population_size'] = 6
+        algorithm.run()
+        problem.data_store.destroy()
+
+        self.stored = ProblemViewDataStore(database_name=self.database_name).individuals
+
+    def test_metadata(self):
+        problem = ProblemViewDataStore(database_name=self.database_name, lazy=True)
+        self.assertEqual(problem.name, 'NLopt_BOBYQA')
+        self.assertEqual(len(problem.parameters), 2)
+        self.assertEqual(len(problem.individuals), 0)
+        self.assertEqual(problem.count(), len(self.stored))
+
+    def test_iterate(self):
+        problem = ProblemViewDataStore(database_name=self.database_name, lazy=True)
+        ids = [individual.id for individual in problem.iterate(page_size=5)]
+        self.assertEqual(ids, [individual.id for individual in self.stored])
+
+        page = problem.individuals_page(page=1, page_size=5)
+        self.assertEqual([individual.id for individual in page], ids[5:10])
+        self.assertEqual(problem.vectors_array(limit=5, offset=5).shape, (5, 2))
+
+        populations = problem.populations()
+        self.assertEqual(sum(map(len, populations.values())), len(self.stored))
+
+    def test_filters(self):
+        problem = ProblemViewDataStore(database_name=self.database_name, lazy=True)
+
+        population = [individual for individual in self.stored if individual.population_id == 2]
+        self.assertEqual(problem.count(population_id=2), len(population))
+        self.assertEqual(problem.count(population_id=[1, 2]), len([individual for individual in self.stored
+                                                                   if individual.population_id in [1, 2]]))
+        self.assertEqual(problem.count(state=Individual.State.EVALUATED), len(self.stored))
+        self.assertEqual(problem.count(algorithm_id=-1), 0)
+
+        limit = sorted(individual.costs[0] for individual in self.stored)[len(self.stored) // 2]
+        costs = problem.costs_array(costs={'F': (None, limit)})
+        self.assertEqual(len(costs), len([individual for individual in self.stored if individual.costs[0] <= limit]))
+        self.assertTrue(all(costs[:, 0] <= limit))
+        self.assertEqual(len(problem.costs_array(costs={0: (limit, limit)})), 1)
+
+
+class TestDataStoreSqliteWriteBehind(unittest.TestCase):
+    def setUp(self):
+        self.database_name = os.path.join(tempfile.mkdtemp(), "data.sqlite")
+
+    def count(self):
+        conn = sqlite3.connect(self.database_name)
+        count = conn.execute("SELECT COUNT(*) FROM individuals").fetchone()[0]
+        conn.close()
+        return count
+
+    def test_algorithm(self):
+        problem = MyProblem()
+        problem.data_store = SqliteDataStore(problem, database_name=self.database_name, mode="rewrite",
+                                             write_behind=True)
+
+        algorithm = NSGAII(problem)
+        algorithm.options['max_population_number'] = 6
+        algorithm.options['max_population_size'] = 4
+        algorithm.run()
+
+        # sync_all at the end of the algorithm flushes the queue
+        self.assertEqual(self.count(), len(problem.individuals))
+        conn = sqlite3.connect(self.database_name)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        conn.close()
+        problem.data_store.destroy()
+
+        view = ProblemViewDataStore(database_name=self.database_name)
+        self.assertEqual(len(view.individuals), len(problem.individuals))
+
+    def test_group_commit(self):
+        problem = MyProblem()
+        data_store = SqliteDataStore(problem, database_name=self.database_name, mode="rewrite", write_behind=True,
+                                     batch_size=10, batch_interval=60.0)
+
+        for i in range(25):
+            individual = Individual([i, i])
+            individual.costs = [2 * i]
+            data_store.sync_individual(individual)
+        data_store.flush()
+
+        self.assertEqual(self.count(), 25)
+        self.assertEqual(data_store._writer.commits, 3)
+
+        # the interval commit
+        data_store._writer.batch_interval = 0.01
+        data_store.sync_individual(Individual([1, 1]))
+        for i in range(100):
+            if self.count() == 26:
+                break
+            time.sleep(0.01)
+        self.assertEqual(self.count(), 26)
+        data_store.destroy()
+
+    def test_lost_rows(self):
+        problem = MyProblem()
+        problem.data_store = SqliteDataStore(problem, database_name=self.database_name, mode="rewrite",
+                                             write_behind=True)
+        conn = sqlite3.connect(self.database_name)
+        conn.execute("CREATE TRIGGER fail BEFORE INSERT ON individuals BEGIN SELECT RAISE(ABORT, 'failed'); END;")
+        conn.commit()
+
+        individual = Individual([1, 1])
+        problem.individuals.append(individual)
+        problem.data_store.sync_individual(individual)
+        with self.assertLogs(problem.logger, level='ERROR'):
+            with self.assertRaises(SqliteWriterError) as context:
+                problem.data_store.flush()
+        self.assertEqual(context.exception.ids, [individual.id])
+
+        # the lost individual is written by the next sync
+        conn.execute("DROP TRIGGER fail;")
+        conn.commit()
+        conn.close()
+        problem.data_store.sync_all()
+        self.assertEqual(self.count(), 1)
+        problem.data_store.destroy()
+
+
+class TestDataStoreBinary(unittest.TestCase):
+    def setUp(self):
+        self.database_name = os.path.join(tempfile.mkdtemp(), "run.bin")
+
+    def run_algorithm(self):
+        problem = MyProblem()
+        problem.data_store = BinaryDataStore(problem, database_name=self.database_name, mode="rewrite",
+                                             buffer_size=7)
+
+        algorithm = NSGAII(problem)
+        algorithm.options['max_population_number'] = 4
+        algorithm.options['max_population_size'] = 6
+        algorithm.run()
+        problem.data_store.destroy()
+
+        # the last synced state of every individual
+        stored = {individual.id: individual for individual in problem.individuals}
+        return problem, [stored[key] for key in sorted(stored)]
+
+    def test_read_write(self):
+        problem, stored = self.run_algorithm()
+
+        view = ProblemViewDataStore(database_name=self.database_name)
+        self.assertIsInstance(view.data_store, BinaryDataStore)
+        self.assertEqual(view.name, problem.name)
+        self.assertEqual(view.parameters, problem.parameters)
+
+        individuals = {individual.id: individual for individual in view.individuals}
+        for original in stored:
+            individual = individuals[original.id]
+            self.assertEqual(individual.population_id, original.population_id)
+            self.assertEqual(individual.state, original.state)
+            self.assertEqual(individual.vector, original.vector)
+            self.assertEqual(individual.costs, original.costs)
+            self.assertEqual(individual.costs_signed, original.costs_signed)
+            self.assertEqual(individual.algorithm_id, original.algorithm_id)
+            self.assertEqual(individual.custom, original.custom)
+            self.assertEqual(individual.features['front_number'], original.features['front_number'])
+
+    def test_memmap(self):
+        problem, stored = self.run_algorithm()
+
+        view = ProblemViewDataStore(database_name=self.database_name, lazy=True)
+        self.assertEqual(len(view.individuals), 0)
+        self.assertIsInstance(view.data_store.records(), np.memmap)
+
+        population = [individual for individual in stored if individual.population_id == 2]
+        costs = view.costs_array(population_id=2)
+        self.assertEqual(costs.shape, (len(population), 1))
+        for individual, cost in zip(population, costs):
+            self.assertAlmostEqual(individual.costs[0], cost[0])
+        self.assertEqual(view.vectors_array(limit=2, offset=1).shape, (2, 2))
+
+        # the log contains also the offspring which have not survived
+        last_population = view.last_population()
+        self.assertEqual({individual.population_id for individual in last_population},
+                         {max(view.data_store.population_ids())})
+        self.assertEqual(len(last_population), view.count(population_id=max(view.data_store.population_ids())))
+
+        limit = float(np.median(view.costs_array()[:, 0]))
+        self.assertTrue(all(view.costs_array(costs={'F': (None, limit)})[:, 0] <= limit))
+        self.assertEqual([individual.id for individual in view.iterate(page_size=4)],
+                         [individual.id for individual in view.data_store.read_individuals()])
+
+    def test_algorithm_filter(self):
+        problem, stored = self.run_algorithm()
+
+        view = ProblemViewDataStore(database_name=self.database_name, lazy=True)
+        logged = view.data_store.read_individuals()
+        algorithm_id = stored[0].algorithm_id
+        self.assertEqual(view.count(algorithm_id=algorithm_id),
+                         len([individual for individual in logged if individual.algorithm_id == algorithm_id]))
+        self.assertEqual(view.count(algorithm_id=-1), 0)
+        self.assertEqual(len(view.costs_array(algorithm_id=-1)), 0)
+
+    def test_orphan_feature_line(self):
+        problem = MyProblem()
+        data_store = BinaryDataStore(problem, database_name=self.database_name, mode="rewrite", buffer_size=1)
+        first = Individual([1.0, 1.0])
+        first.custom = {'name': 'first'}
+        data_store.sync_individual(first)
+
+        # the writing was interrupted between the feature line and the record
+        with open(data_store.features_name, "a") as file:
+            file.write('[0, {}, {"name": "lost"}, [], [], 0, 0]\n')
+
+        second = Individual([2.0, 2.0])
+        second.custom = {'name': 'second'}
+        data_store.sync_individual(second)
+        data_store.destroy()
+
+        view = ProblemViewDataStore(database_name=self.database_name)
+        self.assertEqual([individual.custom['name'] for individual in view.individuals], ['first', 'second'])
+
+
+class TestDataStoreDirtyTracking(unittest.TestCase):
+    def setUp(self):
+        self.database_name = os.path.join(tempfile.mkdtemp(), "data.sqlite")
+
+    def test_checksum(self):
+        individual = Individual([1.0, 2.0])
+        checksum = individual.checksum()
+        self.assertEqual(individual.checksum(), checksum)
+
+        individual.features['front_number'] = 1
+        self.assertNotEqual(individual.checksum(), checksum)
+
+        # the lists and dictionaries changed in place
+        checksum = individual.checksum()
+        individual.vector[0] = 3.0
+        self.assertNotEqual(individual.checksum(), checksum)
+
+        checksum = individual.checksum()
+        individual.custom['data'] = [1, 2]
+        self.assertNotEqual(individual.checksum(), checksum)
+
+        checksum = individual.checksum()
+        individual.custom['data'].append(3)
+        self.assertNotEqual(individual.checksum(), checksum)
+
+        # the copy holds the same data
+        self.assertEqual(deepcopy(individual).checksum(), individual.checksum())
+
+    def test_swarm_checksum(self):
+        problem = MyProblem()
+        algorithm = OMOPSO(problem)
+        individual = Individual([1.0, 2.0])
+        individual.features['velocity'] = [0.5, 0.5]
+        checksum = individual.checksum()
+        # the position is updated in place
+        algorithm.update_position([individual])
+        self.assertEqual(individual.vector, [1.5, 2.5])
+        self.assertNotEqual(individual.checksum(), checksum)
+
+    def cost(self, individual):
+        conn = sqlite3.connect(self.database_name)
+        cost = conn.execute("SELECT cost_0 FROM individuals WHERE id = ?;", [individual.id]).fetchone()[0]
+        conn.close()
+        return cost
+
+    def overwrite(self, individual, cost):
+        conn = sqlite3.connect(self.database_name)
+        conn.execute("UPDATE individuals SET cost_0 = ? WHERE id = ?;", [cost, individual.id])
+        conn.commit()
+        conn.close()
+
+    def test_sync(self):
+        problem = MyProblem()
+        data_store = SqliteDataStore(problem, database_name=self.database_name, mode="rewrite")
+
+        individual = Individual([1.0, 2.0])
+        individual.costs = [5.0]
+        problem.individuals.append(individual)
+        data_store.sync_individual(individual)
+        self.assertEqual(self.cost(individual), 5.0)
+
+        # unchanged individual is not written again
+        self.overwrite(individual, -1.0)
+        data_store.sync_individual(individual)
+        data_store.sync_all()
+        self.assertEqual(self.cost(individual), -1.0)
+
+        # the change of the features is written
+        individual.features['front_number'] = 2
+        data_store.sync_all()
+        self.assertEqual(self.cost(individual), 5.0)
+
+        # the list changed in place is written
+        individual.costs[0] = 7.0
+        data_store.sync_all()
+        self.assertEqual(self.cost(individual), 7.0)
+        data_store.destroy()
+
+        # the read individuals are synced
+        problem = MyProblem()
+        data_store = SqliteDataStore(problem, database_name=self.database_name, mode="write")
+        self.overwrite(individual, -1.0)
+        data_store.sync_all()
+        self.assertEqual(self.cost(individual), -1.0)
+        data_store.destroy()
+
+
+class CountingProblem(MyProblem):
+    """ Counts the calls of the model. """
+    def evaluate(self, individual):
+        self.counter = getattr(self, 'counter', 0) + 1
+        return super().evaluate(individual)
+
+
+class TestEvaluationCacheSqlite(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.vectors = [[1.0, 2.0], [3.0, -1.0], [0.5, 0.5]]
+
+    def evaluate(self, problem):
+        job = Job(problem)
+        individuals = [Individual(vector) for vector in self.vectors]
+        for individual in individuals:
+            job.evaluate(individual)
+        return individuals
+
+    def test_previous_datastore(self):
+        database_name = os.path.join(self.directory, "run.sqlite")
+        problem = CountingProblem()
+        problem.data_store = SqliteDataStore(problem, database_name=database_name, mode="rewrite")
+        self.evaluate(problem)
+
+        problem = CountingProblem()
+        problem.evaluation_cache = SqliteEvaluationCache(problem, [database_name], read_only=True)
+        individuals = self.evaluate(problem)
+
+        self.assertEqual(getattr(problem, 'counter', 0), 0)
+        self.assertEqual(problem.evaluation_cache.hits, 3)
+        self.assertAlmostEqual(individuals[1].costs[0], 10.0)
+        self.assertEqual(individuals[1].custom["functions"], [9.0, 1.0])
+
+        # different model version
+        problem = CountingProblem()
+        problem.options['model_version'] = '2'
+        problem.evaluation_cache = SqliteEvaluationCache(problem, [database_name], read_only=True)
+        self.evaluate(problem)
+        self.assertEqual(problem.counter, 3)
+
+    def test_cache_files(self):
+        cache_name = os.path.join(self.directory, "cache.sqlite")
+        problem = CountingProblem()
+        problem.evaluation_cache = SqliteEvaluationCache(problem, cache_name)
+        self.evaluate(problem)
+        self.assertEqual(problem.counter, 3)
+
+        # concurrent run shares the cache file
+        problem_shared = CountingProblem()
+        cache = SqliteEvaluationCache(problem_shared, [cache_name], read_only=True)
+        self.vectors.append([2.0, 2.0])
+        self.evaluate(problem)
+        problem_shared.evaluation_cache = cache
+        self.evaluate(problem_shared)
+        self.assertEqual(getattr(problem_shared, 'counter', 0), 0)
+        self.assertEqual(cache.hits, 4)
+
+        with self.assertRaises(RuntimeError):
+            SqliteEvaluationCache(problem, os.path.join(self.directory, "missing.sqlite"), read_only=True)
+
+        # the connections are kept open
+        self.vectors = [[5.0, 5.0], [6.0, 6.0]]
+        self.evaluate(problem)
+        self.assertEqual(len(problem.evaluation_cache._connections), 2)
+        problem.evaluation_cache.close()
+        self.assertEqual(len(problem.evaluation_cache._connections), 0)
+
+    def test_predictions(self):
+        database_name = os.path.join(self.directory, "run.sqlite")
+        problem = CountingProblem()
+        problem.data_store = SqliteDataStore(problem, database_name=database_name, mode="rewrite")
+        individuals = self.evaluate(problem)
+        individuals[1].features['predicted'] = True
+        problem.data_store.sync_individual(individuals[1])
+        problem.data_store.flush()
+
+        # the predictions of the surrogate model are not indexed
+        problem = CountingProblem()
+        problem.evaluation_cache = SqliteEvaluationCache(problem, [database_name], read_only=True)
+        self.assertEqual(len(problem.evaluation_cache), 2)
+        self.assertIsNone(problem.evaluation_cache.get(individuals[1]))
+
+        # and they are not stored
+        cache = SqliteEvaluationCache(problem, os.path.join(self.directory, "cache.sqlite"))
+        cache.put(individuals[1])
+        self.assertEqual(len(cache), 0)
+
+
 class TestDataStoreBenchmark(unittest.TestCase):
     def setUp(self):
         self.n = 300
@@ -132,12 +656,8 @@ class TestDataStoreBenchmark(unittest.TestCase):
         t_s = time.time()
         # check
 
-        conn = sqlite3.connect(database_name)
-        c = conn.cursor()
-        c.execute("SELECT * FROM individuals;")
-        rows = c.fetchall()
-        for row in rows:
-            individual = Individual.from_dict(json.loads(row[1]))
+        data_store = SqliteDataStore(problem, database_name=database_name, mode="read")
+        for individual in data_store.read_individuals():
             self.assertAlmostEqual(individual.costs[0], individuals[individual.id].costs[0], 3)
 
         # remove file
@@ -1,7 +1,10 @@
 import unittest
+import numpy as np
 from ..problem import Problem
+from ..algorithm import DummyAlgorithm
 from ..individual import Individual
-from ..job import Job
+from ..job import Job, EvaluationCache
+from ..surrogate_scikit import SurrogateModelScikit
 
 
 class JobProblem(Problem):
@@ -12,6 +15,7 @@ class JobProblem(Problem):
         self.costs = ['F_1']
 
     def evaluate(self, individual):
+        self.counter = getattr(self, 'counter', 0) + 1
         result = 0
         for i in individual.vector:
             result += i*i
@@ -22,6 +26,55 @@ class JobProblem(Problem):
         pass
 
 
+class DecliningBatchProblem(JobProblem):
+    """ The batch evaluation is declined, the individuals are evaluated one by one. """
+    def evaluate_batch(self, matrix):
+        return None
+
+
+class BatchProblem(Problem):
+    """ Evaluates the whole population as one array. """
+    def set(self):
+        self.name = "BatchProblem"
+        self.parameters = [{'name': 'x_1', 'bounds': [-5, 5]}, {'name': 'x_2', 'bounds': [-5, 5]}]
+        self.costs = [{'name': 'F_1'}, {'name': 'F_2', 'criteria': 'maximize'}]
+        self.batches = []
+
+    def evaluate(self, individual):
+        raise RuntimeError("BatchProblem: individual evaluation.")
+
+    def evaluate_batch(self, matrix):
+        self.batches.append(len(matrix))
+        return np.column_stack((np.sum(matrix ** 2, axis=1), matrix[:, 0]))
+
+    def evaluate_constraints_batch(self, matrix):
+        return np.maximum(matrix[:, 1:2] - 1.0, 0.0)
+
+
+class FailingBatchProblem(JobProblem):
+    """ The batch evaluation fails, the individuals are evaluated one by one. """
+    def evaluate_batch(self, matrix):
+        raise RuntimeError("FailingBatchProblem: batch evaluation.")
+
+
+class CountingSurrogate(SurrogateModelScikit):
+    def predict_batch(self, matrix):
+        self.batches = getattr(self, 'batches', []) + [len(matrix)]
+        return super().predict_batch(matrix)
+
+
+class SurrogateProblem(Problem):
+    def set(self):
+        self.name = "SurrogateProblem"
+        self.parameters = [{'name': 'x_1', 'bounds': [0, 10]}]
+        self.costs = [{'name': 'F_1'}]
+        self.counter = 0
+
+    def evaluate(self, individual):
+        self.counter += 1
+        return [np.sin(individual.vector[0])]
+
+
 class TestJob(unittest.TestCase):
     """ Tests simple one objective optimization problem."""
 
@@ -32,6 +85,152 @@ class TestJob(unittest.TestCase):
         job.evaluate(individual)
         self.assertEqual(individual.costs, [9])
 
+    def test_evaluation_cache(self):
+        problem = JobProblem()
+        problem.options['cache_size'] = 10
+        job = Job(problem)
+        job.evaluate(Individual([1, 2, 2]))
+        individual = Individual([1, 2, 2])
+        job.evaluate(individual)
+
+        self.assertEqual(problem.counter, 1)
+        self.assertEqual(individual.costs, [9])
+        self.assertEqual(individual.costs_signed, [9, 0.0])
+        self.assertEqual(individual.state, Individual.State.EVALUATED)
+        self.assertEqual((job.cache.hits, job.cache.misses), (1, 1))
+
+    def test_evaluation_cache_eviction(self):
+        problem = JobProblem()
+        problem.options['cache_size'] = 2
+        job = Job(problem)
+        for vector in [[1], [2], [1], [3], [2]]:
+            job.evaluate(Individual(vector))
+
+        # [2] is the least recently used record when [3] is stored
+        self.assertEqual(problem.counter, 4)
+        self.assertEqual(len(job.cache), 2)
+        self.assertEqual((job.cache.hits, job.cache.misses), (1, 4))
+
+    def test_disabled_cache(self):
+        # the cache is disabled by default
+        problem = JobProblem()
+        job = Job(problem)
+        job.evaluate(Individual([1, 2]))
+        job.evaluate(Individual([1, 2]))
+        self.assertEqual(problem.counter, 2)
+
+    def test_quantised_key(self):
+        cache = EvaluationCache([{'name': 'x_1', 'precision': 1e-1}], size=10)
+        individual = Individual([1.0])
+        individual.costs = [1.0]
+        cache.put(individual)
+        self.assertIsNotNone(cache.get(Individual([1.01])))
+        self.assertIsNone(cache.get(Individual([1.2])))
+
+
+    def test_single_lookup(self):
+        problem = DecliningBatchProblem()
+        problem.options['cache_size'] = 10
+        individuals = [Individual([1.0]), Individual([2.0])]
+        algorithm = DummyAlgorithm(problem)
+        algorithm.evaluate(individuals)
+
+        self.assertEqual(problem.counter, 2)
+        self.assertEqual((algorithm.evaluator.job.cache.hits, algorithm.evaluator.job.cache.misses), (0, 2))
+
+    def test_batch_evaluation(self):
+        problem = BatchProblem()
+        problem.options['cache_size'] = 10
+        individuals = [Individual([1.0, 2.0]), Individual([0.0, 0.5]), Individual([-1.0, 3.0])]
+
+        algorithm = DummyAlgorithm(problem)
+        algorithm.evaluate(individuals)
+
+        self.assertEqual(problem.batches, [3])
+        self.assertEqual(individuals[0].costs, [5.0, 1.0])
+        self.assertEqual(individuals[0].costs_signed, [5.0, -1.0, 1.0])
+        self.assertEqual(individuals[1].features['feasible'], 0.0)
+        self.assertEqual(individuals[2].features['feasible'], 2.0)
+        self.assertEqual(individuals[2].state, Individual.State.EVALUATED)
+
+        # the cached and evaluated individuals are skipped
+        individuals.append(Individual([1.0, 2.0]))
+        individuals.append(Individual([2.0, 2.0]))
+        algorithm.evaluate(individuals)
+        self.assertEqual(problem.batches, [3, 1])
+        self.assertEqual(individuals[3].costs, [5.0, 1.0])
+
+    def test_batch_fallback(self):
+        problem = JobProblem()
+        individuals = [Individual([1, 2, 2]), Individual([3])]
+        self.assertFalse(Job(problem).evaluate_batch(individuals))
+
+        algorithm = DummyAlgorithm(problem)
+        algorithm.evaluate(individuals)
+        self.assertEqual(individuals[1].costs, [9])
+
+    def test_batch_error(self):
+        problem = FailingBatchProblem()
+        individuals = [Individual([1, 2, 2]), Individual([3, 0, 0])]
+        with self.assertLogs(problem.logger, level='WARNING') as log:
+            self.assertFalse(Job(problem).evaluate_batch(individuals))
+        self.assertIn("FailingBatchProblem: batch evaluation.", log.output[0])
+        self.assertIn("Traceback", log.output[0])
+
+        DummyAlgorithm(problem).evaluate(individuals)
+        self.assertEqual(individuals[1].costs, [9])
+
+    def test_batch_prediction(self):
+        problem = SurrogateProblem()
+        problem.surrogate = CountingSurrogate(problem)
+        problem.surrogate.init_default_regressor()
+        problem.surrogate.train_step = -1
+        problem.surrogate.batch_prediction = True
+        problem.surrogate.sigma_threshold = 0.05
+        for x in np.linspace(0, 5, 21):
+            problem.surrogate.add_data([x], [np.sin(x)])
+        problem.surrogate.train()
+
+        # the individuals far from the training data are too uncertain
+        individuals = [Individual([1.1]), Individual([2.6]), Individual([9.5]), Individual([4.1])]
+        algorithm = DummyAlgorithm(problem)
+        algorithm.evaluate(individuals)
+
+        self.assertEqual(problem.surrogate.batches, [4])
+        self.assertEqual(problem.surrogate.predict_counter, 3)
+        self.assertEqual(problem.counter, 1)
+        self.assertEqual(problem.surrogate.eval_counter, 1)
+        for individual in individuals:
+            self.assertEqual(individual.state, Individual.State.EVALUATED)
+            self.assertAlmostEqual(individual.costs[0], np.sin(individual.vector[0]), 2)
+        self.assertEqual([individual.features.get('predicted', False) for individual in individuals],
+                         [True, True, False, True])
+
+    def test_predictions_not_cached(self):
+        problem = SurrogateProblem()
+        problem.options['cache_size'] = 10
+        problem.surrogate = SurrogateModelScikit(problem)
+        problem.surrogate.init_default_regressor()
+        problem.surrogate.train_step = -1
+        problem.surrogate.gated = True
+        problem.surrogate.distance_threshold = 0.0
+        problem.surrogate.sigma_threshold = 0.05
+        for x in np.linspace(0, 5, 21):
+            problem.surrogate.add_data([x], [np.sin(x)])
+        problem.surrogate.train()
+
+        job = Job(problem)
+        individual = Individual([1.1])
+        job.evaluate(individual)
+        self.assertTrue(individual.features['predicted'])
+        self.assertEqual(len(job.cache), 0)
+
+        # the real evaluation is cached, the copied flag is dropped
+        individual = Individual([9.5], features={'predicted': True})
+        job.evaluate(individual)
+        self.assertNotIn('predicted', individual.features)
+        self.assertEqual(len(job.cache), 1)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,11 +1,16 @@
 from ..operators import SimpleMutator, SimulatedBinaryCrossover, SimpleCrossover, \
     TournamentSelector, ParetoDominance, nondominated_truncate, crowding_distance, PmMutator, EpsilonDominance, \
-    UniformMutator, NonUniformMutation, FireflyStep
+    UniformMutator, NonUniformMutation, FireflyStep, nondominated_sorting, nondominated_fronts, dominance_matrix, \
+    crowding_distances, nondominated_truncate_indices, DuplicateFilter
 from ..individual import Individual
 from ..benchmark_pareto import BiObjectiveTestProblem
 from ..problem import Problem
+from ..population import Population
+from ..algorithm_genetic import NSGAII
 from math import inf
 import unittest
+import numpy as np
+from copy import deepcopy
 
 
 class TestCrossover(unittest.TestCase):
@@ -228,6 +233,158 @@ class TestFastNonDominatedSorting(unittest.TestCase):
         self.assertAlmostEqual(1.0, population[3].features['crowding_distance'])
 
 
+class TestNonDominatedSortingArrays(unittest.TestCase):
+    """ Compares the array-based sorting with the pairwise ParetoDominance comparator. """
+
+    def check(self, n_costs):
+        rng = np.random.RandomState(1)
+        for i in range(50):
+            costs = rng.randint(0, 6, (40, n_costs)).astype(float)
+            feasible = rng.choice([0.0, 0.0, 0.0, 0.5, -0.5, 2.0], 40)
+            costs_signed = np.column_stack([costs, feasible])
+
+            expected = nondominated_fronts(dominance_matrix(costs_signed, ParetoDominance()))
+            self.assertTrue(np.array_equal(nondominated_fronts(dominance_matrix(costs_signed)), expected))
+            self.assertTrue(np.array_equal(nondominated_sorting(costs_signed), expected))
+
+    def test_two_objectives(self):
+        self.check(2)
+
+    def test_three_objectives(self):
+        self.check(3)
+
+    def test_four_objectives(self):
+        self.check(4)
+
+    def test_constraint_violation(self):
+        costs_signed = [[0.0, 0.0, 1.0], [5.0, 5.0, 0.0], [6.0, 6.0, 0.0], [1.0, 1.0, -0.5]]
+        self.assertEqual(nondominated_sorting(costs_signed).tolist(), [4, 1, 2, 3])
+
+
+class TestCrowdingDistanceArrays(unittest.TestCase):
+
+    def test_crowding_distances(self):
+        costs = [[0.0, 1.0], [1.0, 0.0], [0.75, 0.75], [0.5, 0.5]]
+        distance = crowding_distances(costs)
+        self.assertEqual(distance.tolist(), [inf, inf, 1.0, 1.5])
+
+        # separately on every front
+        distance = crowding_distances(costs, [1, 1, 2, 1])
+        self.assertEqual(distance.tolist(), [inf, inf, inf, 2.0])
+
+    def test_front_order(self):
+        front = []
+        for costs in [[0.0, 1.0], [1.0, 0.0], [0.75, 0.75], [0.5, 0.5]]:
+            individual = Individual(costs)
+            individual.costs_signed = costs + [0.0]
+            front.append(individual)
+
+        # the list is ordered by the last objective
+        crowding_distance(front)
+        self.assertEqual([individual.costs_signed[1] for individual in front], [0.0, 0.5, 0.75, 1.0])
+        self.assertEqual([individual.features['crowding_distance'] for individual in front], [inf, 1.5, 1.0, inf])
+
+    def test_truncate_indices(self):
+        individuals = []
+        for i, (front, crowding) in enumerate([(2, inf), (1, 0.5), (1, inf), (2, 1.0), (1, 0.5)]):
+            individual = Individual([i, i])
+            individual.costs_signed = [i, -i, 0.0]
+            individual.features['front_number'] = front
+            individual.features['crowding_distance'] = crowding
+            individuals.append(individual)
+
+        # duplicate is removed
+        individuals.append(deepcopy(individuals[2]))
+
+        indices = nondominated_truncate_indices(Population(individuals), 4)
+        self.assertEqual(indices.tolist(), [2, 1, 4, 0])
+
+
+class TestBatchOperators(unittest.TestCase):
+    """ Tests crossover, mutation and selection over the whole mating pool. """
+
+    def setUp(self):
+        self.parameters = [{'name': 'x_1', 'bounds': [0, 5]},
+                           {'name': 'x_2', 'bounds': [0, 3]},
+                           {'name': 'x_3', 'bounds': [-1, 1]}]
+        self.lb = np.array([0, 0, -1])
+        self.ub = np.array([5, 3, 1])
+        self.vectors = self.lb + np.random.random_sample((20, 3)) * (self.ub - self.lb)
+
+    def test_sbx_batch(self):
+        sbx = SimulatedBinaryCrossover(self.parameters, 1.0)
+        offsprings = sbx.cross_batch(self.vectors, np.arange(10), np.arange(10, 20))
+        self.assertEqual(offsprings.shape, (20, 3))
+        self.assertTrue(np.all(offsprings >= self.lb) and np.all(offsprings <= self.ub))
+
+        # without crossover the parents are copied
+        sbx = SimulatedBinaryCrossover(self.parameters, 0.0)
+        offsprings = sbx.cross_batch(self.vectors, np.arange(10), np.arange(10, 20))
+        self.assertTrue(np.array_equal(offsprings, self.vectors))
+
+    def test_pm_batch(self):
+        mutator = PmMutator(self.parameters, 1.0)
+        mutated = mutator.mutate_batch(self.vectors)
+        self.assertEqual(mutated.shape, (20, 3))
+        self.assertTrue(np.all(mutated >= self.lb) and np.all(mutated <= self.ub))
+
+        mutator = PmMutator(self.parameters, 0.0)
+        self.assertTrue(np.array_equal(mutator.mutate_batch(self.vectors), self.vectors))
+
+    def test_tournament_batch(self):
+        individuals = []
+        for i, vector in enumerate(self.vectors.tolist()):
+            individual = Individual(vector)
+            individual.costs_signed = [i, i, 0.0]
+            individual.features['front_number'] = 1 if i == 0 else 2
+            individuals.append(individual)
+
+        selector = TournamentSelector(self.parameters)
+        selected = selector.select_indices(Population(individuals), 1000)
+        self.assertEqual(selected.shape, (1000, ))
+        self.assertTrue(np.all((selected >= 0) & (selected < 20)))
+        # the first individual is never beaten and the last one never wins
+        self.assertGreater(np.count_nonzero(selected == 0), 50)
+        self.assertEqual(np.count_nonzero(selected == 19), 0)
+
+    def test_distinct_mates(self):
+        problem = BiObjectiveTestProblem()
+        algorithm = NSGAII(problem)
+        algorithm.selector = TournamentSelector(problem.parameters)
+
+        # the first individual wins every tournament
+        individuals = []
+        for i in range(3):
+            individual = Individual([float(i), float(i)])
+            individual.costs_signed = [i, i, 0.0]
+            individual.features['front_number'] = i + 1
+            individuals.append(individual)
+
+        population = Population(individuals)
+        parents1 = algorithm.selector.select_indices(population, 100)
+        parents2 = algorithm._select_mates(population, parents1)
+        self.assertEqual(parents2.shape, (100, ))
+        self.assertFalse(np.any(parents1 == parents2))
+
+
+class TestDuplicateFilter(unittest.TestCase):
+
+    def test_precision(self):
+        parameters = [{'name': 'x_1', 'bounds': [0, 5], 'precision': 0.1},
+                      {'name': 'x_2', 'bounds': [0, 3]}]
+        duplicates = DuplicateFilter(parameters)
+
+        self.assertTrue(duplicates.add([1.0, 2.0]))
+        self.assertFalse(duplicates.add([1.02, 2.0]))
+        self.assertTrue(duplicates.add([1.1, 2.0]))
+        self.assertTrue(duplicates.contains([0.98, 2.0]))
+        self.assertFalse(duplicates.contains([1.0, 2.0001]))
+
+        selected = duplicates.new(np.array([[1.0, 2.0], [3.0, 1.0], [3.0, 1.0], [4.0, 1.0], [5.0, 1.0]]), 2)
+        self.assertEqual(selected, [1, 3])
+        self.assertEqual(len(duplicates), 4)
+
+
 class SBXCrossoverTestCases(unittest.TestCase):
 
     def test_should_constructor_assign_the_correct_probability_value(self):
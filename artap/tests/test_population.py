@@ -0,0 +1,89 @@
+import unittest
+import random
+
+from ..individual import Individual
+from ..population import Population
+from ..operators import TournamentSelector, crowding_distance
+
+
+class TestPopulation(unittest.TestCase):
+    """ Tests columnar storage of individuals. """
+
+    def setUp(self):
+        self.individuals = []
+        for i in range(5):
+            individual = Individual([i, 2 * i])
+            individual.costs = [i, 5 - i]
+            individual.costs_signed = [i, 5 - i, 0.0]
+            self.individuals.append(individual)
+
+    def test_columns(self):
+        population = Population(self.individuals)
+        self.assertEqual(len(population), 5)
+        self.assertEqual(population.vectors.shape, (5, 2))
+        self.assertEqual(population.costs.shape, (5, 2))
+        self.assertEqual(population.costs_signed.shape, (5, 3))
+        self.assertAlmostEqual(population.vectors[3, 1], 6.0)
+        self.assertAlmostEqual(population.costs[4, 1], 1.0)
+        self.assertAlmostEqual(population.feasible[0], 0.0)
+
+    def test_ragged_rows(self):
+        individual = Individual([1, 1])
+        population = Population(self.individuals + [individual])
+        self.assertEqual(population.costs.shape, (6, 2))
+        self.assertTrue(all(population.costs[5] != population.costs[5]))
+
+    def test_take_and_features(self):
+        population = Population(self.individuals)
+        population.front_number = [1, 2, 1, 2, 3]
+        population.crowding_distance = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self.assertEqual(self.individuals[4].features['front_number'], 3)
+        self.assertAlmostEqual(self.individuals[3].features['crowding_distance'], 4.0)
+
+        subset = population.take(population.front_number == 2)
+        self.assertEqual(len(subset), 2)
+        self.assertIs(subset[0], self.individuals[1])
+        self.assertAlmostEqual(subset.crowding_distance[1], 4.0)
+        self.assertAlmostEqual(subset.vectors[1, 0], 3.0)
+
+    def test_current_data(self):
+        population = Population(self.individuals)
+        self.assertAlmostEqual(population.costs[2, 1], 3.0)
+
+        # the arrays follow the assigned lists and the lists changed in place
+        self.individuals[2].costs = [10.0, 20.0]
+        self.individuals[3].costs[0] = 7.0
+        self.individuals[3].features['feasible'] = 1.5
+        self.assertAlmostEqual(population.costs[2, 1], 20.0)
+        self.assertAlmostEqual(population.costs[3, 0], 7.0)
+        self.assertAlmostEqual(population.feasible[3], 1.5)
+
+        # the changed width
+        self.individuals[0].costs = [1.0, 2.0, 3.0]
+        self.assertEqual(population.costs.shape, (5, 3))
+
+    def test_list_interface(self):
+        population = Population(self.individuals)
+        vectors = population.vectors
+        population.append(Individual([10, 10]))
+        self.assertEqual(population.vectors.shape, (6, 2))
+        self.assertEqual(vectors.shape, (5, 2))
+
+        del population[0]
+        self.assertEqual(len(population), 5)
+        self.assertAlmostEqual(population.vectors[0, 0], 1.0)
+        self.assertEqual(len(random.sample(population, 2)), 2)
+
+    def test_operators(self):
+        population = Population(self.individuals)
+        for individual in population:
+            individual.features['front_number'] = 1
+        crowding_distance(population)
+        self.assertEqual(len(population), 5)
+
+        selector = TournamentSelector([{'name': 'x_1', 'bounds': [0, 10]}, {'name': 'x_2', 'bounds': [0, 10]}])
+        self.assertIn(selector.select(population), self.individuals)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -46,5 +46,26 @@ class TestZDT1(unittest.TestCase):
         exact = problem.pareto_front(vals[0])
         self.assertLessEqual(epsilon_add(exact, vals), 0.2)
 
+
+class TestZDT1Asynchronous(unittest.TestCase):
+    # steady-state eps-MOEA
+
+    def test_local_problem(self):
+        problem = ZDT1()
+        algorithm = EpsMOEA(problem)
+        algorithm.options['max_population_number'] = 100
+        algorithm.options['max_population_size'] = 100
+        algorithm.options['max_processes'] = 4
+        algorithm.options['epsilons'] = 0.05
+        algorithm.options['asynchronous'] = True
+        algorithm.run()
+
+        self.assertEqual(len(problem.individuals), 100 + 100 * 100)
+
+        results = Results(problem)
+        vals = results.pareto_values(algorithm.archive)
+        exact = problem.pareto_front(vals[0])
+        self.assertLessEqual(epsilon_add(exact, vals), 0.2)
+
 if __name__ == '__main__':
     unittest.main()
@@ -5,6 +5,9 @@ from ..benchmark_pareto import ZDT1
 from ..algorithm_genetic import NSGAII
 from ..results import Results
 from ..quality_indicator import epsilon_add
+from ..problem import Problem
+from ..individual import Individual
+from ..surrogate import SurrogateModelPredict
 
 
 class TestNSGA2(unittest.TestCase):
@@ -23,6 +26,137 @@ class TestNSGA2(unittest.TestCase):
             self.assertEqual(len(individuals), algorithm.options['max_population_size'])
 
 
+class DiscreteProblem(Problem):
+    """ Small discrete problem, the design space is exhausted during the run. """
+
+    def set(self, **kwargs):
+        self.name = "DiscreteProblem"
+        self.parameters = [{'name': 'x_1', 'bounds': [0, 5], 'precision': 1},
+                           {'name': 'x_2', 'bounds': [0, 5], 'precision': 1}]
+        self.costs = [{'name': 'F_1'}, {'name': 'F_2'}]
+        self.evaluated = []
+
+    def evaluate(self, individual):
+        self.evaluated.append(tuple(round(x) for x in individual.vector))
+        x_1, x_2 = individual.vector
+        return [x_1 ** 2 + x_2, (x_1 - 5) ** 2 + x_2]
+
+
+class TestNSGA2Duplicates(unittest.TestCase):
+    def test_duplicates(self):
+        problem = DiscreteProblem()
+        algorithm = NSGAII(problem)
+        algorithm.options['max_population_number'] = 10
+        algorithm.options['max_population_size'] = 4
+        algorithm.options['max_redraws'] = 10
+        algorithm.options['max_processes'] = 1
+        algorithm.run()
+
+        # offsprings are never evaluated twice in one run
+        initial = problem.evaluated[:4]
+        offsprings = problem.evaluated[4:]
+        self.assertEqual(len(offsprings), len(set(offsprings)))
+        self.assertFalse(set(initial) & set(offsprings))
+        self.assertLessEqual(len(problem.evaluated), 4 + 36)
+
+
+class TestNSGA2Asynchronous(unittest.TestCase):
+    def test_budget(self):
+        problem = DiscreteProblem()
+        problem.parameters = [{'name': 'x_1', 'bounds': [0, 5]}, {'name': 'x_2', 'bounds': [0, 5]}]
+        algorithm = NSGAII(problem)
+        algorithm.options['max_population_number'] = 5
+        algorithm.options['max_population_size'] = 6
+        algorithm.options['max_processes'] = 3
+        algorithm.options['asynchronous'] = True
+        algorithm.run()
+
+        # initial population and max_population_number * max_population_size offsprings
+        self.assertEqual(len(problem.evaluated), 6 + 30)
+        self.assertEqual(len(problem.individuals), 6 + 30)
+        self.assertEqual(max(problem.populations().keys()), 5)
+        for individual in problem.individuals:
+            self.assertEqual(individual.state, individual.State.EVALUATED)
+
+    def test_local_problem(self):
+        problem = ZDT1()
+        algorithm = NSGAII(problem)
+        algorithm.options['max_population_number'] = 100
+        algorithm.options['max_population_size'] = 50
+        algorithm.options['max_processes'] = 4
+        algorithm.options['asynchronous'] = True
+        algorithm.run()
+
+        results = Results(problem)
+        vals = results.pareto_values()
+        exact = problem.pareto_front(vals[0])
+        self.assertLessEqual(epsilon_add(exact, vals), 0.2)
+
+
+class SumSurrogate(SurrogateModelPredict):
+    """ Predicts the sum of the parameters (the first goal function of SumProblem). """
+
+    def __init__(self, problem):
+        super().__init__(problem)
+        self.train_step = 4
+        self.batches = []
+
+    def train(self):
+        self.trained = True
+
+    def predict(self, x, *args):
+        return [sum(x), 0.0]
+
+    def predict_batch(self, matrix):
+        self.batches.append(len(matrix))
+        return super().predict_batch(matrix)
+
+
+class SumProblem(Problem):
+    def set(self, **kwargs):
+        self.name = "SumProblem"
+        self.parameters = [{'name': 'x_1', 'bounds': [0, 5]}, {'name': 'x_2', 'bounds': [0, 5]}]
+        self.costs = [{'name': 'F_1'}, {'name': 'F_2'}]
+        self.evaluated = 0
+
+    def evaluate(self, individual):
+        self.evaluated += 1
+        return [sum(individual.vector), 0.0]
+
+
+class TestNSGA2Prescreening(unittest.TestCase):
+    def test_prescreen(self):
+        problem = SumProblem()
+        problem.surrogate = SumSurrogate(problem)
+        problem.surrogate.train()
+        algorithm = NSGAII(problem)
+        algorithm.options['max_population_size'] = 3
+        algorithm.options['prescreening'] = 2
+
+        parents = [Individual([0.0, 0.0]), Individual([1.0, 1.0])]
+        candidates = [Individual([x, 1.0]) for x in [4.0, 0.5, 3.0, 2.0, 0.2, 1.5, 4.5, 2.5]]
+        algorithm.duplicates.extend([individual.vector for individual in parents + candidates])
+
+        # the four candidates with the best predicted costs are kept
+        offsprings = algorithm.prescreen(parents + candidates, len(parents))
+        self.assertEqual([individual.vector[0] for individual in offsprings], [0.0, 1.0, 0.5, 2.0, 0.2, 1.5])
+        self.assertFalse(algorithm.duplicates.contains([4.0, 1.0]))
+        self.assertTrue(algorithm.duplicates.contains([0.5, 1.0]))
+
+    def test_run(self):
+        problem = SumProblem()
+        problem.surrogate = SumSurrogate(problem)
+        algorithm = NSGAII(problem)
+        algorithm.options['max_population_number'] = 4
+        algorithm.options['max_population_size'] = 6
+        algorithm.options['prescreening'] = 5
+        algorithm.run()
+
+        # the same number of evaluations, the candidates are ranked by the surrogate model
+        self.assertEqual(problem.evaluated, 6 + 4 * 6)
+        self.assertEqual(problem.surrogate.batches, [5 * 6] * 4)
+
+
 class TestZDT1(unittest.TestCase):
     # integration test -- tests the total functionality of nsga2
     # around 11secs according to literature DOI: 10.1007/978-3-642-01020-0_39
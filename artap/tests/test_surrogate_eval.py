@@ -1,9 +1,24 @@
 import math
 import unittest
 
+import numpy as np
+
 from ..individual import Individual
 from ..benchmark_functions import Booth
-from ..surrogate import SurrogateModelEval
+from ..surrogate import SurrogateModelEval, SurrogateModelPredict, NeighbourIndex, DataBuffer
+
+
+class ConstantSurrogate(SurrogateModelPredict):
+    def train(self):
+        self.trained = True
+
+    def predict(self, x, *args):
+        return [0.0]
+
+
+class BoothPredict(Booth):
+    def predict(self, individual):
+        return self.surrogate.predict(individual.vector)
 
 
 class TestSurrogateEval(unittest.TestCase):
@@ -24,3 +39,89 @@ class TestSurrogateEval(unittest.TestCase):
                                                                                             math.fabs(value_problem -
                                                                                                       value_surrogate)))
         self.assertLess(math.fabs(value_problem - value_surrogate), 1e-8)
+
+
+class TestDataBuffer(unittest.TestCase):
+    def test_append(self):
+        buffer = DataBuffer(capacity=2)
+        for i in range(5):
+            buffer.append([i, 2 * i])
+        buffer.extend([[5, 10], [6, 12]])
+
+        self.assertEqual(len(buffer), 7)
+        self.assertEqual(buffer.array.shape, (7, 2))
+        self.assertEqual(buffer.array[6].tolist(), [6.0, 12.0])
+
+    def test_training_data(self):
+        problem = Booth()
+        problem.surrogate = SurrogateModelEval(problem)
+        self.assertEqual(len(problem.surrogate.x_data), 0)
+
+        problem.surrogate.add_data([1.0, 2.0], [3.0])
+        problem.surrogate.add_data([2.0, 3.0], [4.0])
+        self.assertEqual(problem.surrogate.x_data.shape, (2, 2))
+        self.assertEqual(problem.surrogate.y_data.tolist(), [[3.0], [4.0]])
+
+
+class TestNeighbourIndex(unittest.TestCase):
+    def setUp(self):
+        self.parameters = [{'name': 'x_1', 'bounds': [0, 10]}, {'name': 'x_2', 'bounds': [-1, 1]}]
+        rng = np.random.RandomState(0)
+        self.data = rng.uniform([0, -1], [10, 1], size=(500, 2))
+        self.queries = rng.uniform([0, -1], [10, 1], size=(50, 2))
+        # brute force normalised Chebyshev distances
+        scale = np.array([10.0, 50.0])
+        self.distances = np.abs((self.queries[:, None, :] - self.data[None, :, :]) * scale).max(axis=2)
+
+    def test_nearest(self):
+        index = NeighbourIndex(self.parameters)
+        # incremental adding, some vectors remain in the buffer
+        for vector in self.data:
+            index.add(vector)
+
+        distances, indices = index.query(self.queries)
+        self.assertEqual(len(index), 500)
+        np.testing.assert_allclose(distances, self.distances.min(axis=1))
+        np.testing.assert_allclose(self.distances[np.arange(50), indices], distances)
+
+    def test_radius(self):
+        index = NeighbourIndex(self.parameters)
+        index.extend(self.data[:300])
+        index.extend(self.data[300:])
+
+        for found, row in zip(index.query_radius(self.queries, 5.0), self.distances):
+            self.assertEqual(sorted(found.tolist()), np.flatnonzero(row <= 5.0).tolist())
+
+    def test_empty(self):
+        index = NeighbourIndex(self.parameters)
+        distances, indices = index.query([1.0, 0.0])
+        self.assertEqual(distances[0], float("inf"))
+        self.assertEqual(index.query_radius([1.0, 0.0], 10.0)[0].tolist(), [])
+
+
+class TestSurrogateDistance(unittest.TestCase):
+    def test_distance(self):
+        problem = Booth()
+        problem.surrogate = SurrogateModelEval(problem)
+        self.assertEqual(problem.surrogate.compute_distance([1.0, 1.0]), float("inf"))
+
+        problem.surrogate.add_data([1.0, 1.0], [0.0])
+        problem.surrogate.add_data([4.0, -2.0], [0.0])
+        # Booth: bounds [-5, 5], the distance is in percents of the bounds
+        self.assertAlmostEqual(problem.surrogate.compute_distance([1.5, 1.25]), 5.0)
+        np.testing.assert_allclose(problem.surrogate.compute_distances([[1.5, 1.25], [4.0, -2.5]]), [5.0, 5.0])
+        self.assertEqual(problem.surrogate.neighbours([3.0, -1.0], 10.0), [1])
+
+    def test_prediction_threshold(self):
+        problem = BoothPredict()
+        problem.surrogate = ConstantSurrogate(problem)
+        problem.surrogate.train_step = -1
+        problem.surrogate.distance_threshold = 5.0
+        problem.surrogate.add_data([1.0, 3.0], [0.0])
+        problem.surrogate.train()
+
+        # the prediction is used only close to the training data
+        self.assertEqual(problem.surrogate.evaluate(Individual([1.5, 3.5])), [0.0])
+        self.assertEqual(problem.surrogate.predict_counter, 1)
+        self.assertGreater(problem.surrogate.evaluate(Individual([5.0, 5.0]))[0], 0.0)
+        self.assertEqual(problem.surrogate.eval_counter, 1)
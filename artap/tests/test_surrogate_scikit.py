@@ -1,13 +1,18 @@
 import math
+import os
+import tempfile
 import unittest
 
+import numpy as np
+
 from ..problem import Problem
 from ..individual import Individual
 from ..benchmark_functions import Booth
-from ..surrogate import SurrogateModelEval
-from ..surrogate_scikit import SurrogateModelScikit
+from ..surrogate import SurrogateModelEval, RetrainPolicy
+from ..surrogate_scikit import SurrogateModelScikit, SurrogateModelLocal
 from ..operators import LHSGenerator
 from ..algorithm_sweep import SweepAlgorithm
+from ..datastore import SqliteDataStore
 
 from sklearn.gaussian_process import GaussianProcessRegressor
 from sklearn.gaussian_process.kernels import RationalQuadratic, ExpSineSquared
@@ -192,6 +197,341 @@ class TestSurrogateScikit(unittest.TestCase):
         self.assertLess(percent, 5.0)
 
 
+class TestSurrogateScikitIncremental(unittest.TestCase):
+    def test_incremental(self):
+        problem = Booth()
+        problem.surrogate = SurrogateModelScikit(problem)
+        problem.surrogate.init_default_regressor()
+        problem.surrogate.regressor.normalize_y = True
+        problem.surrogate.incremental = True
+        problem.surrogate.optimise_step = 10
+        problem.surrogate.train_step = -1
+
+        rng = np.random.RandomState(0)
+        for vector in rng.uniform(-5, 5, size=(20, 2)):
+            problem.surrogate.evaluate(Individual(vector.tolist()))
+        problem.surrogate.train()
+        kernel = problem.surrogate.regressor.kernel_
+
+        # the following trainings extend the Cholesky factor, the hyperparameters remain
+        for vector in rng.uniform(-5, 5, size=(5, 2)):
+            problem.surrogate.evaluate(Individual(vector.tolist()))
+            problem.surrogate.train()
+        self.assertEqual(problem.surrogate.train_counter, 6)
+        self.assertEqual(problem.surrogate.regressor.kernel_, kernel)
+        self.assertEqual(problem.surrogate.x_data.shape, (25, 2))
+
+        reference = GaussianProcessRegressor(kernel=kernel, optimizer=None, normalize_y=True)
+        reference.fit(problem.surrogate.x_data, problem.surrogate.y_data)
+
+        x = rng.uniform(-5, 5, size=(10, 2))
+        mean, std = problem.surrogate.regressor.predict(x, return_std=True)
+        reference_mean, reference_std = reference.predict(x, return_std=True)
+        np.testing.assert_allclose(mean, reference_mean, rtol=1e-6, atol=1e-6)
+        np.testing.assert_allclose(std, reference_std, rtol=1e-6, atol=1e-6)
+
+
+class TestSurrogateRetraining(unittest.TestCase):
+    def test_background_training(self):
+        problem = MyProblemSin()
+        problem.surrogate = SurrogateModelScikit(problem)
+        problem.surrogate.background_training = True
+        problem.surrogate.retrain_policy = RetrainPolicy(growth=10)
+
+        for x in np.linspace(0, 10, 10):
+            problem.surrogate.evaluate(Individual([x]))
+        # the model is fitted on the snapshot of the data
+        for x in np.linspace(0.25, 9.75, 5):
+            problem.surrogate.evaluate(Individual([x]))
+        problem.surrogate.trainer.wait()
+
+        self.assertTrue(problem.surrogate.trained)
+        self.assertEqual(problem.surrogate.trainer.trainings, 1)
+        self.assertEqual(len(problem.surrogate.regressor.X_train_), 10)
+        self.assertEqual(len(problem.surrogate.x_data), 15)
+        self.assertEqual(problem.surrogate.retrain_policy.trained_size, 10)
+
+        # the swapped model serves the predictions
+        x = problem.surrogate.x_data[4][0]
+        value, sigma = problem.surrogate.predict([x])
+        self.assertAlmostEqual(float(np.ravel(value)[0]), x * math.sin(x), 3)
+
+    def test_background_training_error(self):
+        problem = MyProblemSin()
+        problem.surrogate = SurrogateModelScikit(problem)
+        problem.surrogate.regressor = RandomForestRegressor(n_estimators=-1)
+        problem.surrogate.background_training = True
+        problem.surrogate.retrain_policy = RetrainPolicy(growth=10)
+
+        with self.assertLogs(problem.logger, level='ERROR') as logs:
+            for x in np.linspace(0, 10, 10):
+                problem.surrogate.evaluate(Individual([x]))
+            problem.surrogate.trainer.wait()
+
+        # the error is logged with the traceback and kept, the model remains untrained
+        self.assertIn("Traceback", logs.output[0])
+        self.assertIsInstance(problem.surrogate.trainer.last_error, ValueError)
+        self.assertEqual(problem.surrogate.trainer.failures, 1)
+        self.assertEqual(problem.surrogate.trainer.trainings, 0)
+        self.assertFalse(problem.surrogate.trained)
+
+    def test_policy(self):
+        policy = RetrainPolicy(growth=None, growth_ratio=0.5, error=0.1, window=3)
+        self.assertTrue(policy.due(1))
+        policy.reset(10)
+        self.assertFalse(policy.due(10))
+        self.assertFalse(policy.due(14))
+        self.assertTrue(policy.due(15))
+
+        # drift of the validation error
+        policy.record(0.2)
+        policy.record(0.2)
+        self.assertFalse(policy.due(11))
+        policy.record(0.05)
+        self.assertAlmostEqual(policy.drift, 0.15)
+        self.assertTrue(policy.due(11))
+        self.assertFalse(policy.due(10))
+
+    def test_validation(self):
+        problem = MyProblemSin()
+        problem.surrogate = SurrogateModelScikit(problem)
+        problem.surrogate.retrain_policy = RetrainPolicy(growth=8, error=0.05, window=2)
+
+        for x in np.linspace(0, 5, 8):
+            problem.surrogate.evaluate(Individual([x]))
+        self.assertTrue(problem.surrogate.trained)
+        self.assertEqual(len(problem.surrogate.retrain_policy.errors), 0)
+
+        # the model trained on [0, 5] fails on [8, 10], it is retrained before the growth
+        problem.surrogate.batch_prediction = True
+        problem.surrogate.evaluate(Individual([9.0]))
+        problem.surrogate.evaluate(Individual([10.0]))
+        self.assertEqual(problem.surrogate.retrain_policy.trained_size, 10)
+
+
+class TestSurrogateGated(unittest.TestCase):
+    def setUp(self):
+        self.problem = MyProblemSin()
+        self.problem.surrogate = SurrogateModelScikit(self.problem)
+        self.problem.surrogate.init_default_regressor()
+        self.problem.surrogate.train_step = -1
+        self.problem.surrogate.gated = True
+        self.problem.surrogate.sigma_threshold = 0.05
+        self.problem.surrogate.distance_threshold = 0.0
+        for x in np.linspace(0, 5, 21):
+            self.problem.surrogate.evaluate(Individual([x]))
+        self.problem.surrogate.train()
+
+    def test_gated(self):
+        surrogate = self.problem.surrogate
+        value = surrogate.evaluate(Individual([2.6]))
+        self.assertAlmostEqual(value[0], 2.6 * math.sin(2.6), 2)
+        self.assertEqual(surrogate.predict_counter, 1)
+
+        # uncertain prediction
+        surrogate.evaluate(Individual([9.0]))
+        self.assertEqual(surrogate.predict_counter, 1)
+        self.assertEqual(surrogate.eval_counter, 22)
+        self.assertAlmostEqual(surrogate.predict_ratio, 1.0 / 23.0)
+
+        with self.assertLogs(self.problem.logger, level='INFO') as log:
+            surrogate.report()
+        self.assertIn("predict / eval counter:     1 /    22", log.output[0])
+
+    def test_adaptive_thresholds(self):
+        surrogate = self.problem.surrogate
+        surrogate.target_error = 0.01
+
+        # accurate prediction rejected by the gate
+        surrogate.sigma_threshold = 1e-9
+        surrogate.distance_threshold = 1e-3
+        surrogate.evaluate(Individual([2.6]))
+        self.assertAlmostEqual(surrogate.sigma_threshold, 1.1e-9)
+        self.assertAlmostEqual(surrogate.distance_threshold, 1.1e-3)
+
+        # inaccurate prediction accepted by the gate
+        surrogate.sigma_threshold = 100.0
+        surrogate.distance_threshold = 100.0
+        surrogate.evaluate_individual(Individual([9.0]))
+        self.assertAlmostEqual(surrogate.sigma_threshold, 80.0)
+        self.assertAlmostEqual(surrogate.distance_threshold, 80.0)
+
+    def test_adaptive_thresholds_defaults(self):
+        surrogate = self.problem.surrogate
+        surrogate.target_error = 0.01
+        surrogate.sigma_threshold = float("inf")
+        surrogate.distance_threshold = 0.0
+
+        # the unset thresholds close the gate, the accurate prediction initialises them
+        surrogate.evaluate(Individual([2.6]))
+        self.assertEqual(surrogate.predict_counter, 0)
+        self.assertTrue(0.0 < surrogate.sigma_threshold < float("inf"))
+        self.assertAlmostEqual(surrogate.distance_threshold, 1.0)
+
+        value = surrogate.evaluate(Individual([2.7]))
+        self.assertAlmostEqual(value[0], 2.7 * math.sin(2.7), 2)
+        self.assertEqual(surrogate.predict_counter, 1)
+
+
+class TestSurrogateLocal(unittest.TestCase):
+    def setUp(self):
+        self.problem = MyProblemSin()
+        self.problem.surrogate = SurrogateModelLocal(self.problem)
+        self.problem.surrogate.n_neighbours = 20
+
+        for x in np.linspace(0.0, 10.0, 101):
+            self.problem.surrogate.add_data([x], self.problem.evaluate(Individual([x])))
+        self.problem.surrogate.train()
+
+    def test_predict(self):
+        surrogate = self.problem.surrogate
+        vectors = [[0.55], [2.55], [5.15], [7.25], [9.95]]
+        means, stds = surrogate.predict_batch(vectors)
+        self.assertEqual(means.shape, (5, 1))
+        self.assertEqual(stds.shape, (5, 1))
+        for vector, mean in zip(vectors, means[:, 0]):
+            self.assertAlmostEqual(mean, self.problem.evaluate(Individual(vector))[0], places=2)
+
+        # the regions are halved to be covered by their neighbours, every region is fitted on the bounded number
+        # of the neighbours
+        self.assertEqual(surrogate.fit_counter, 5)
+        for (width, cell), (model, centre, radius) in surrogate._models.items():
+            self.assertAlmostEqual(width, 12.5)
+            self.assertEqual(len(model.X_train_), 20)
+
+    def test_cache(self):
+        surrogate = self.problem.surrogate
+        surrogate.predict([0.5])
+        surrogate.predict([1.0])
+        self.assertEqual(surrogate.fit_counter, 1)
+
+        # the new data in the neighbourhood invalidates the region, the distant regions are kept
+        surrogate.predict([9.0])
+        surrogate.add_data([1.25], self.problem.evaluate(Individual([1.25])))
+        self.assertEqual(len(surrogate._models), 1)
+        surrogate.predict([9.0])
+        self.assertEqual(surrogate.fit_counter, 2)
+        surrogate.predict([1.0])
+        self.assertEqual(surrogate.fit_counter, 3)
+
+    def test_shadow(self):
+        surrogate = self.problem.surrogate
+        surrogate.predict([0.5])
+
+        # the background training clears its own local models, the current model keeps serving
+        model = surrogate.shadow(*surrogate.snapshot())
+        model.train()
+        self.assertEqual(len(surrogate._models), 1)
+        self.assertEqual(len(model._models), 0)
+        surrogate.predict([0.5])
+        self.assertEqual(surrogate.fit_counter, 1)
+
+        # the trained local models are swapped in
+        surrogate.swap(model)
+        self.assertEqual(len(surrogate._models), 0)
+
+        # the neighbours of the vector (inherited query, not the size of the neighbourhood)
+        self.assertEqual(surrogate.neighbours([5.0], 0.5), [50])
+
+    def test_max_models(self):
+        surrogate = self.problem.surrogate
+        surrogate.region_width = 5.0
+        surrogate.max_models = 3
+        surrogate.predict_batch(np.linspace(0.0, 9.9, 20).reshape(-1, 1))
+        self.assertEqual(surrogate.fit_counter, 20)
+        self.assertEqual(len(surrogate._models), 3)
+
+        # the least recently used models are dropped
+        surrogate.predict([9.9])
+        self.assertEqual(surrogate.fit_counter, 20)
+        surrogate.predict([0.0])
+        self.assertEqual(surrogate.fit_counter, 21)
+
+
+class TestSurrogatePersistence(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.directory.name, "model.surrogate")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    @staticmethod
+    def trained(problem):
+        surrogate = SurrogateModelScikit(problem)
+        surrogate.init_default_regressor()
+        for x in np.linspace(0.0, 10.0, 21):
+            surrogate.add_data([x], problem.evaluate(Individual([x])))
+        surrogate.train()
+        surrogate.eval_counter = 21
+        surrogate.sigma_threshold = 0.5
+        return surrogate
+
+    def test_save_load(self):
+        surrogate = self.trained(MyProblemSin())
+        surrogate.save(self.file_name)
+
+        loaded = SurrogateModelScikit(MyProblemSin())
+        loaded.load(self.file_name)
+        self.assertTrue(loaded.trained)
+        self.assertEqual(loaded.eval_counter, 21)
+        self.assertAlmostEqual(loaded.sigma_threshold, 0.5)
+        self.assertEqual(loaded.x_data.shape, (21, 1))
+        self.assertEqual(loaded.fingerprint(), surrogate.fingerprint())
+        np.testing.assert_allclose(loaded.predict([5.1]), surrogate.predict([5.1]))
+
+        # the model is extended by the new data
+        loaded.add_data([5.1], [5.1 * math.sin(5.1)])
+        self.assertEqual(len(loaded.x_data), 22)
+
+    def test_fingerprint(self):
+        self.trained(MyProblemSin()).save(self.file_name)
+
+        # the same training data
+        surrogate = self.trained(MyProblemSin())
+        surrogate.trained = False
+        surrogate.load(self.file_name)
+        self.assertTrue(surrogate.trained)
+
+        # stale model
+        surrogate = self.trained(MyProblemSin())
+        surrogate.add_data([5.1], [5.1 * math.sin(5.1)])
+        with self.assertRaises(ValueError):
+            surrogate.load(self.file_name)
+
+        # another problem
+        problem = MyProblemSin()
+        problem.options['model_version'] = '2'
+        with self.assertRaises(ValueError):
+            SurrogateModelScikit(problem).load(self.file_name)
+
+    def test_data_store(self):
+        # run and the model trained on the data store
+        database_name = os.path.join(self.directory.name, "data.sqlite")
+        problem = Booth()
+        problem.data_store = SqliteDataStore(problem, database_name=database_name, mode="rewrite")
+        gen = LHSGenerator(problem.parameters)
+        gen.init(20)
+        SweepAlgorithm(problem, generator=gen).run()
+        problem.data_store.flush()
+
+        problem.surrogate = SurrogateModelScikit(problem)
+        problem.surrogate.read_from_data_store()
+        problem.surrogate.init_default_regressor()
+        problem.surrogate.train()
+        self.assertEqual(problem.surrogate.save(), os.path.join(self.directory.name, "data.surrogate"))
+
+        # results session predicts without training
+        results = Booth()
+        results.data_store = SqliteDataStore(results, database_name=database_name, mode="read")
+        results.surrogate = SurrogateModelScikit(results)
+        results.surrogate.read_from_data_store()
+        results.surrogate.load()
+        np.testing.assert_allclose(results.surrogate.predict([1.0, 3.0]), problem.surrogate.predict([1.0, 3.0]))
+
+        with self.assertRaises(ValueError):
+            SurrogateModelScikit(MyProblemSin()).default_file_name()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,5 +1,6 @@
 
 import collections
+import numpy as np
 from numpy.random import normal
 from random import random
 
@@ -285,3 +286,26 @@ class VectorAndNumbers:
             parameters_vector.append(cls.gen_number(bounds, precision))
 
         return parameters_vector.copy()
+
+    @classmethod
+    def quantize(cls, vectors, parameters):
+        """
+        Rounds the vectors to the precision of the parameters (the default precision is 1e-12), the rows of the
+        result can be used as hashable keys of the design points.
+
+        :param vectors: array (n, parameters) or one vector
+        :param parameters: list of the problem parameters
+        :return: list of tuples
+        """
+        vectors = np.asarray(vectors, dtype=float)
+        single = vectors.ndim == 1
+        vectors = np.atleast_2d(vectors)
+
+        steps = np.full(vectors.shape[1], 1e-12)
+        for i, parameter in enumerate(list(parameters)[:vectors.shape[1]]):
+            if isinstance(parameter, dict) and parameter.get('precision'):
+                steps[i] = parameter['precision']
+        keys = list(map(tuple, np.round(vectors / steps).tolist()))
+
+        return keys[0] if single else keys
+
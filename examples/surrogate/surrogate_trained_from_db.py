@@ -62,7 +62,12 @@ trained_problem.data_store = SqliteDataStore(trained_problem, database_name="dat
 trained_problem.surrogate = SurrogateModelSMT(trained_problem)
 trained_problem.surrogate.regressor = MGP(theta0=[1e-2], n_comp=2, print_prediction=False)
 trained_problem.surrogate.read_from_data_store()
-trained_problem.surrogate.train()
+# the model trained on the same data is reused (data.surrogate), the stale one is trained again
+try:
+    trained_problem.surrogate.load()
+except (FileNotFoundError, ValueError):
+    trained_problem.surrogate.train()
+    trained_problem.surrogate.save()
 
 # Tests
 x = [0, 0]